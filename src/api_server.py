@@ -0,0 +1,221 @@
+"""API HTTP/JSON local (sin PyQt) para enviar y vigilar trabajos
+
+Uso:
+    python -m src.api_server --port 8765 --jobs 4
+
+Rutas:
+    POST   /jobs                {"operation": "convert", "params": {"input": "..."}}
+    GET    /jobs                lista de trabajos
+    GET    /jobs/{id}           estado y progreso
+    DELETE /jobs/{id}           cancela el trabajo
+    GET    /events              progreso de todos los trabajos (Server-Sent Events)
+    GET    /jobs/{id}/events    progreso de un trabajo (Server-Sent Events)
+
+Escucha solo en 127.0.0.1 salvo que se indique otro --host.
+"""
+import sys
+import os
+
+# Ensure src is in path if not already
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import asyncio
+import json
+from http import HTTPStatus
+
+from core.job_manager import AsyncJobManager, JobError
+
+
+class APIServer:
+    """Servidor HTTP/1.1 mínimo sobre asyncio.start_server"""
+
+    MAX_BODY = 1024 * 1024
+
+    def __init__(self, manager, host='127.0.0.1', port=8765):
+        self.manager = manager
+        self.host = host
+        self.port = port
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        print(f"API escuchando en http://{self.host}:{self.port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.manager.shutdown()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                keep_alive = await self._dispatch(writer, method, path, body)
+                if not keep_alive or headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await self._send_json(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Lee una petición HTTP. Retorna None si el cliente cerró la conexión"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError("Petición HTTP inválida")
+        method, path, _version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > APIServer.MAX_BODY:
+            raise ValueError("Cuerpo demasiado grande")
+        body = await reader.readexactly(length) if length else b''
+
+        return method.upper(), path.split('?', 1)[0].rstrip('/') or '/', headers, body
+
+    async def _dispatch(self, writer, method, path, body):
+        """Atiende una ruta. Retorna False si la conexión debe cerrarse"""
+        segments = [s for s in path.split('/') if s]
+
+        if segments == ['jobs']:
+            if method == 'GET':
+                return await self._send_json(writer, HTTPStatus.OK, {'jobs': self.manager.list()})
+            if method == 'POST':
+                return await self._submit(writer, body)
+
+        elif segments == ['events'] and method == 'GET':
+            return await self._stream_events(writer)
+
+        elif len(segments) >= 2 and segments[0] == 'jobs':
+            try:
+                job_id = int(segments[1])
+            except ValueError:
+                job_id = None
+            job = self.manager.get(job_id)
+            if job is None:
+                return await self._send_json(writer, HTTPStatus.NOT_FOUND, {'error': "Trabajo no encontrado"})
+
+            if len(segments) == 2 and method == 'GET':
+                return await self._send_json(writer, HTTPStatus.OK, job)
+            if (len(segments) == 2 and method == 'DELETE') or (segments[2:] == ['cancel'] and method == 'POST'):
+                if not self.manager.cancel(job_id):
+                    return await self._send_json(writer, HTTPStatus.CONFLICT, {'error': "El trabajo ya terminó"})
+                return await self._send_json(writer, HTTPStatus.ACCEPTED, self.manager.get(job_id))
+            if segments[2:] == ['events'] and method == 'GET':
+                return await self._stream_events(writer, job_id)
+
+        else:
+            return await self._send_json(writer, HTTPStatus.NOT_FOUND, {'error': "Ruta no encontrada"})
+
+        return await self._send_json(writer, HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Método no permitido"})
+
+    async def _submit(self, writer, body):
+        try:
+            data = json.loads(body or b'{}')
+            if not isinstance(data, dict):
+                raise JobError("Se esperaba un objeto JSON")
+            job = self.manager.submit(data.get('operation'), data.get('params'))
+        except (json.JSONDecodeError, JobError) as e:
+            return await self._send_json(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        return await self._send_json(writer, HTTPStatus.CREATED, job)
+
+    async def _stream_events(self, writer, job_id=None):
+        """Envía eventos como Server-Sent Events hasta que el cliente se desconecte"""
+        queue = self.manager.subscribe()
+        try:
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/event-stream\r\n'
+                b'Cache-Control: no-cache\r\n'
+                b'Connection: close\r\n\r\n'
+            )
+
+            # Estado inicial para que el cliente no dependa del orden de conexión
+            jobs = [self.manager.get(job_id)] if job_id is not None else self.manager.list()
+            for job in jobs:
+                writer.write(APIServer._format_event('snapshot', {'event': 'snapshot', 'job': job}))
+            await writer.drain()
+
+            # Un trabajo ya terminado no emitirá más eventos
+            if job_id is not None and jobs[0]['status'] in AsyncJobManager.FINAL_STATES:
+                return False
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comentario SSE para detectar clientes desconectados
+                    writer.write(b': keep-alive\n\n')
+                    await writer.drain()
+                    continue
+
+                if message is None:
+                    # El gestor desconectó a este cliente por no leer a tiempo
+                    break
+
+                job = message['job']
+                if job_id is not None and job['id'] != job_id:
+                    continue
+
+                writer.write(APIServer._format_event(message['event'], message))
+                await writer.drain()
+
+                if job_id is not None and job['status'] in AsyncJobManager.FINAL_STATES:
+                    break
+        finally:
+            self.manager.unsubscribe(queue)
+        return False
+
+    @staticmethod
+    def _format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    @staticmethod
+    async def _send_json(writer, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+        return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='videotool-api', description="API HTTP/JSON local de trabajos")
+    parser.add_argument('--host', default='127.0.0.1', help="Dirección de escucha (por defecto solo local)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-j', '--jobs', type=int, default=2, help="Trabajos FFmpeg simultáneos")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = APIServer(AsyncJobManager(max_jobs=args.jobs), args.host, args.port)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,583 @@
+"""Interfaz de línea de comandos (sin PyQt) para los módulos de core/
+
+Uso:
+    python -m src.cli convert video.mkv --format mp4 --jobs 4
+    python -m src.cli analyze video.mp4
+
+Todo el progreso se escribe en stdout como JSON (una línea por evento).
+"""
+import sys
+import os
+
+# Ensure src is in path if not already
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.analyzer import VideoAnalyzer
+from core.audio_extractor import AudioExtractor
+from core.compressor import VideoCompressor
+from core.corruption_detector import CorruptionDetector
+from core.crf_optimizer import CRFOptimizer
+from core.device_profiles import DeviceProfiles
+from core.ffmpeg_steps import FFmpegSteps
+from core.folder_watcher import FolderWatcher
+from core.job_history import JobHistory
+from core.job_store import JobStore
+from core.media_probe import MediaProbe
+from core.process_supervisor import ProcessSupervisor
+from core.queue_planner import QueuePlanner
+from core.sample_estimator import SampleEstimator
+from core.segment_encoder import SegmentEncoder
+from core.video_joiner import VideoJoiner
+from models.video_file import VideoFile
+
+
+class CLIRunner:
+    """Ejecuta operaciones de core/ emitiendo eventos JSON por stdout"""
+
+    def __init__(self, jobs=1, stream=None):
+        self.jobs = max(1, jobs)
+        self.stream = stream or sys.stdout
+        self.is_running = True
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._encoders = set()
+        self._active = set()  # entradas en curso en run_many
+        self._overlapped = set()  # entradas que coincidieron con otra
+
+    def emit(self, event, **data):
+        """Escribe un evento JSON en stdout"""
+        data['event'] = event
+        line = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def run_many(self, inputs, task):
+        """Ejecuta task(input) para cada entrada con hasta self.jobs en paralelo"""
+        pool = ThreadPoolExecutor(max_workers=min(self.jobs, max(len(inputs), 1)))
+
+        def tracked(input_file):
+            with self._lock:
+                self._active.add(input_file)
+                if len(self._active) > 1:
+                    self._overlapped.update(self._active)
+            try:
+                return task(input_file)
+            finally:
+                with self._lock:
+                    self._active.discard(input_file)
+                    self._overlapped.discard(input_file)
+
+        try:
+            futures = [pool.submit(tracked, input_file) for input_file in inputs]
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            # Matar los hijos antes de esperar a los workers
+            self.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=True)
+
+        successful = sum(1 for ok in results if ok)
+        self.emit('summary', total=len(inputs), successful=successful)
+        return successful == len(inputs)
+
+    def ran_alone(self, file):
+        """True si la entrada no coincidió con ninguna otra (su tiempo mide su velocidad)"""
+        with self._lock:
+            return file not in self._overlapped
+
+    def follow(self, file, cmd, duration):
+        """Ejecuta un comando FFmpeg bajo el supervisor y emite su progreso. Retorna True si tuvo éxito"""
+        if not self.is_running:
+            return False
+
+        last_percent = -1
+
+        def on_event(event):
+            nonlocal last_percent
+            if event.percent != last_percent:
+                last_percent = event.percent
+                self.emit('progress', file=file, percent=event.percent, speed=event.speed,
+                          eta=round(event.eta, 1) if event.eta is not None else None,
+                          fps=event.fps, bitrate=event.bitrate)
+
+        process = ProcessSupervisor.default().spawn(cmd, duration, on_event=on_event)
+        with self._lock:
+            self._processes.add(process)
+
+        try:
+            # Si se canceló mientras arrancaba, cancel() no alcanzó a verlo
+            if not self.is_running:
+                process.kill()
+            process.wait()
+            if process.error:
+                self.emit('log', file=file, message=f"No se pudo iniciar FFmpeg: {process.error}")
+            return process.returncode == 0 and self.is_running
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    def finish(self, file, success, message, output=None):
+        self.emit('finished', file=file, success=success, message=message, output=output)
+        return success
+
+    def follow_steps(self, file, steps):
+        """Ejecuta en orden una lista de pasos (ver FFmpegSteps), incluidos los que pida 'verify'"""
+        pending = list(steps)
+        while pending:
+            step = pending.pop(0)
+            self.emit('log', file=file, message=step['label'])
+            if not self.follow(file, step['cmd'], step['duration']):
+                return False
+            extra = step['verify']() if step.get('verify') else None
+            if extra:
+                pending.append(extra)
+        return True
+
+    def cancel(self):
+        """Detiene todos los procesos en ejecución"""
+        self.is_running = False
+        with self._lock:
+            processes = list(self._processes)
+            encoders = list(self._encoders)
+        for process in processes:
+            try:
+                process.kill()
+            except:
+                pass
+        for encoder in encoders:
+            encoder.cancel()
+
+
+def _output_path(input_file, args, suffix, extension):
+    """Resuelve el archivo de salida de una entrada"""
+    if getattr(args, 'output', None):
+        return args.output
+
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(input_file))
+    return os.path.join(output_dir, f"{base_name}_{suffix}.{extension}")
+
+
+def cmd_convert(runner, args):
+    if args.plan:
+        return _plan_convert(runner, args)
+
+    def task(input_file):
+        output_file = _output_path(input_file, args, 'converted', args.format)
+        runner.emit('start', file=input_file, output=output_file)
+
+        if args.segments > 1:
+            encoder = SegmentEncoder(
+                input_file, output_file, args.encoder, args.preset, args.crf,
+                workers=args.segments, segment_time=args.segment_time
+            )
+            with runner._lock:
+                runner._encoders.add(encoder)
+            try:
+                success, message = encoder.encode(
+                    progress_callback=lambda p: runner.emit('progress', file=input_file, percent=p),
+                    log_callback=lambda m: runner.emit('log', file=input_file, message=m)
+                )
+            finally:
+                with runner._lock:
+                    runner._encoders.discard(encoder)
+            return runner.finish(input_file, success, message, output_file)
+
+        media_info = MediaProbe.probe(input_file)
+        duration = FFmpegWrapper.get_video_duration(input_file, media_info)
+        crf = args.crf
+        if args.auto_crf:
+            crf = _search_crf(runner, input_file, args, media_info)
+        cmd = FFmpegWrapper.build_convert_command(
+            input_file, output_file, args.encoder, args.preset, crf, media_info, args.stream_copy
+        )
+        started = time.monotonic()
+        success = runner.follow(input_file, cmd, duration)
+        if success:
+            # Si coincidió con otro trabajo solo vale el bitrate, no el tiempo
+            elapsed = time.monotonic() - started if runner.ran_alone(input_file) else None
+            JobHistory.default().record(
+                media_info, output_file, args.encoder, args.preset, crf, elapsed, args.stream_copy
+            )
+        return runner.finish(input_file, success, "Conversión exitosa" if success else "Error en conversión", output_file)
+
+    return runner.run_many(args.inputs, task)
+
+
+def _plan_convert(runner, args):
+    """Simula el lote sin convertir: duración total, orden y espacio en disco (evento 'plan')"""
+    plan = QueuePlanner.plan(
+        [VideoFile(path) for path in args.inputs], args.output_dir, args.encoder, args.preset, args.crf,
+        args.format, runner.jobs, stream_copy=args.stream_copy, auto_crf=args.auto_crf
+    )
+    runner.emit(
+        'plan',
+        makespan=round(plan['makespan'], 1),
+        finish_at=round(plan['finish_at']),
+        fits=plan['fits'],
+        order=[args.inputs[index] for index in plan['order']],
+        items=[{'file': args.inputs[item['index']], 'time': round(item['time'], 1), 'size': item['size'],
+                'remux': item['remux'], 'known': item['known']} for item in plan['items']],
+        devices=[{key: device[key] for key in ('path', 'output', 'scratch', 'required', 'free', 'fits')}
+                 for device in plan['devices']]
+    )
+    return plan['fits']
+
+
+def _search_crf(runner, input_file, args, media_info):
+    """CRF por video con CRFOptimizer (args.crf si no se pudo medir)"""
+    optimizer = CRFOptimizer(
+        input_file, args.encoder, args.preset, metric=args.metric, target=args.quality_target,
+        media_info=media_info
+    )
+    with runner._lock:
+        runner._encoders.add(optimizer)
+    if not runner.is_running:
+        optimizer.cancel()
+    try:
+        result = optimizer.optimize(log_callback=lambda m: runner.emit('log', file=input_file, message=m))
+    finally:
+        with runner._lock:
+            runner._encoders.discard(optimizer)
+    if result is None:
+        return args.crf
+    runner.emit('crf', file=input_file, crf=result['crf'], quality=round(result['quality'], 4),
+                metric=result['metric'], target_met=result['target_met'])
+    return result['crf']
+
+
+def cmd_compress(runner, args):
+    def task(input_file):
+        output_file = _output_path(input_file, args, 'compressed', 'mp4')
+        runner.emit('start', file=input_file, output=output_file)
+
+        media_info = MediaProbe.probe(input_file)
+        if args.size is not None:
+            steps, temp_files = VideoCompressor.prepare_target_size(
+                input_file, output_file, args.size, args.encoder, args.preset, media_info, not args.single_pass
+            )
+            if not steps:
+                return runner.finish(input_file, False, "Error al iniciar compresión")
+            try:
+                success = runner.follow_steps(input_file, steps)
+            finally:
+                FFmpegSteps.remove_temp_files(temp_files)
+            return runner.finish(input_file, success, "Video comprimido" if success else "Error comprimiendo video", output_file)
+        else:
+            cmd = VideoCompressor.build_percentage_command(
+                input_file, output_file, args.percent, args.encoder, args.preset, media_info
+            )
+
+        if not cmd:
+            return runner.finish(input_file, False, "Error al iniciar compresión")
+
+        duration = FFmpegWrapper.get_video_duration(input_file, media_info)
+        success = runner.follow(input_file, cmd, duration)
+        return runner.finish(input_file, success, "Video comprimido" if success else "Error comprimiendo video", output_file)
+
+    return runner.run_many(args.inputs, task)
+
+
+def cmd_join(runner, args):
+    runner.emit('start', file=args.output, inputs=args.inputs)
+
+    if args.force:
+        media_infos = MediaProbe.probe_many(args.inputs)
+    elif args.normalize:
+        media_infos = MediaProbe.probe_many(args.inputs, fields=VideoJoiner.SIGNATURE_PROBE_FIELDS)
+    else:
+        compatible, message, media_infos = VideoJoiner.probe_and_check(args.inputs)
+        if not compatible:
+            return runner.finish(args.output, False, f"Videos incompatibles: {message}")
+
+    steps, temp_files, description = VideoJoiner.prepare_join(
+        args.inputs, args.output, media_infos, args.encoder, args.preset, args.crf,
+        not args.reencode, args.normalize
+    )
+    runner.emit('log', file=args.output, message=description)
+
+    def run_step(step):
+        # Los pasos en paralelo reportan el progreso con su propia entrada
+        file = step.get('input', args.output)
+        runner.emit('log', file=file, message=step['label'])
+        return runner.follow(file, step['cmd'], step['duration'])
+
+    try:
+        success = True
+        for group in FFmpegSteps.groups(steps):
+            if len(group) == 1:
+                success = run_step(group[0])
+            else:
+                workers = min(args.workers or os.cpu_count() or 1, len(group))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(run_step, group))
+                success = all(results)
+            if not success:
+                break
+    finally:
+        FFmpegSteps.remove_temp_files(temp_files)
+
+    return runner.finish(args.output, success, "Videos unidos" if success else "Error uniendo videos", args.output)
+
+
+def cmd_extract_audio(runner, args):
+    def task(input_file):
+        output_file = _output_path(input_file, args, 'audio', args.format)
+        runner.emit('start', file=input_file, output=output_file)
+
+        duration = FFmpegWrapper.get_video_duration(input_file)
+        cmd = AudioExtractor.build_command(input_file, output_file, args.format, args.bitrate)
+        success = runner.follow(input_file, cmd, duration)
+        return runner.finish(input_file, success, "Audio extraído" if success else "Error extrayendo audio", output_file)
+
+    return runner.run_many(args.inputs, task)
+
+
+def cmd_analyze(runner, args):
+    def task(input_file):
+        analysis = VideoAnalyzer.analyze(input_file)
+        if analysis:
+            runner.emit('result', file=input_file, analysis=analysis)
+            if args.measure:
+                _measure(runner, input_file, args)
+        return runner.finish(input_file, analysis is not None,
+                             "Análisis completado" if analysis else "Error en el análisis")
+
+    return runner.run_many(args.inputs, task)
+
+
+def _measure(runner, input_file, args):
+    """Tiempo y tamaño de la conversión medidos codificando muestras (evento 'estimate')"""
+    estimator = SampleEstimator(input_file, args.encoder, args.preset, args.crf, args.format)
+    with runner._lock:
+        runner._encoders.add(estimator)
+    try:
+        result = estimator.measure(log_callback=lambda m: runner.emit('log', file=input_file, message=m))
+    finally:
+        with runner._lock:
+            runner._encoders.discard(estimator)
+    if result is None:
+        runner.emit('log', file=input_file, message="No se pudo medir la conversión")
+        return
+    runner.emit('estimate', file=input_file, encoder=args.encoder, preset=args.preset, crf=args.crf,
+                speed=round(result['speed'], 3),
+                time=round(result['time'], 1), time_low=round(result['time_low'], 1),
+                time_high=round(result['time_high'], 1),
+                size=result['size'], size_low=result['size_low'], size_high=result['size_high'])
+
+
+def cmd_scan(runner, args):
+    def task(input_file):
+        runner.emit('start', file=input_file)
+        result = CorruptionDetector.analyze_video(input_file)
+        runner.emit('result', file=input_file, scan=result)
+        return runner.finish(input_file, result['status'] == 'healthy', result['message'])
+
+    return runner.run_many(args.inputs, task)
+
+
+def cmd_watch(runner, args):
+    """Vigila una carpeta y convierte cada video nuevo a una carpeta espejo"""
+    watch_dir = os.path.abspath(args.watch_dir)
+    output_root = os.path.abspath(args.output_dir)
+
+    settings = {'encoder': 'libx264', 'preset': 'medium', 'crf': 23, 'format': 'mp4'}
+    if args.preset:
+        profile = DeviceProfiles.get_profile(args.preset)
+        settings.update({key: profile[key] for key in settings})
+
+    store = JobStore(args.db or JobStore.WATCH_PATH)
+    pool = ThreadPoolExecutor(max_workers=runner.jobs)
+
+    def convert_job(job_id, input_file, output_file):
+        runner.emit('start', file=input_file, output=output_file, job_id=job_id)
+        store.mark_processing(job_id, output_file)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+        duration = FFmpegWrapper.get_video_duration(input_file)
+        cmd = FFmpegWrapper.build_convert_command(
+            input_file, output_file, settings['encoder'], settings['preset'], settings['crf']
+        )
+        success = runner.follow(input_file, cmd, duration)
+
+        if success:
+            store.mark_completed(job_id)
+        elif not runner.is_running:
+            store.mark_cancelled(job_id)
+        else:
+            store.mark_failed(job_id, "Error en conversión")
+        runner.finish(input_file, success, "Conversión exitosa" if success else "Error en conversión", output_file)
+
+    def mirror_path(input_file):
+        relative_dir = os.path.relpath(os.path.dirname(input_file), watch_dir)
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        return os.path.normpath(os.path.join(
+            output_root, relative_dir, f"{base_name}_converted.{settings['format']}"
+        ))
+
+    def on_file_ready(input_file):
+        job = store.find_job(input_file)
+        if job and job['status'] in ('pending', 'processing', 'completed'):
+            return
+
+        job_id = store.add_job(input_file, dict(settings, preset_name=args.preset))
+        runner.emit('queued', file=input_file, job_id=job_id)
+        pool.submit(convert_job, job_id, input_file, mirror_path(input_file))
+
+    # Reanudar lo que quedó pendiente en una ejecución anterior
+    for job in store.recover():
+        if job['input_path'].startswith(watch_dir + os.sep) and os.path.exists(job['input_path']):
+            pool.submit(convert_job, job['id'], job['input_path'],
+                        job['output_path'] or mirror_path(job['input_path']))
+
+    watcher = FolderWatcher(watch_dir, on_file_ready, settle_time=args.settle)
+    runner.emit('watching', directory=watch_dir, backend=watcher.backend, output_dir=output_root)
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+        runner.cancel()
+        raise
+    finally:
+        # Los trabajos aún no iniciados quedan 'pending' y se reanudan al volver a arrancar
+        pool.shutdown(wait=True, cancel_futures=True)
+        store.close()
+
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='videotool',
+        description="Video Tool Pro sin interfaz gráfica (salida JSON por línea en stdout)"
+    )
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Número de archivos procesados en paralelo (default: 1)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_output(p, single_output=True):
+        if single_output:
+            p.add_argument('-o', '--output', help="Archivo de salida (solo con una entrada)")
+        p.add_argument('--output-dir', help="Carpeta de salida (default: junto al original)")
+
+    def add_encoding(p, crf=True):
+        p.add_argument('--encoder', default='libx264')
+        p.add_argument('--preset', default='medium')
+        if crf:
+            p.add_argument('--crf', type=int, default=23)
+
+    p = sub.add_parser('convert', help="Convertir videos")
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--format', default='mp4')
+    p.add_argument('--segments', type=int, default=1,
+                   help="Procesos paralelos por archivo (codificación por segmentos)")
+    p.add_argument('--segment-time', type=int, default=60)
+    p.add_argument('--auto-crf', action='store_true',
+                   help="Buscar el CRF de cada video codificando muestras (ignora --crf salvo si falla)")
+    p.add_argument('--metric', choices=['ssim', 'psnr'], default='ssim')
+    p.add_argument('--quality-target', type=float, default=None,
+                   help="Calidad mínima con --auto-crf (default: SSIM 0.975 / PSNR 38)")
+    p.add_argument('--stream-copy', action='store_true',
+                   help="Copiar sin recodificar los streams compatibles cuyo bitrate no supere el pedido")
+    p.add_argument('--plan', action='store_true',
+                   help="No convertir: estimar la duración del lote con --jobs, el orden y el espacio en disco")
+    add_encoding(p)
+    add_output(p)
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser('compress', help="Comprimir videos")
+    p.add_argument('inputs', nargs='+')
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument('--size', type=float, help="Tamaño objetivo en MB")
+    target.add_argument('--percent', type=float, help="Porcentaje del bitrate original")
+    p.add_argument('--single-pass', action='store_true',
+                   help="Con --size, codificar en una pasada (por defecto dos pasadas y ajuste del tamaño)")
+    add_encoding(p, crf=False)
+    add_output(p)
+    p.set_defaults(func=cmd_compress)
+
+    p = sub.add_parser('join', help="Unir videos")
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('-o', '--output', required=True)
+    p.add_argument('--force', action='store_true', help="No verificar compatibilidad")
+    p.add_argument('--reencode', action='store_true',
+                   help="Recodificar siempre (por defecto se une sin recodificar si las entradas coinciden)")
+    p.add_argument('--normalize', action='store_true',
+                   help="Adaptar en paralelo las entradas distintas a un formato común en lugar de abortar")
+    p.add_argument('--workers', type=int, default=None,
+                   help="Procesos simultáneos al normalizar (default: núcleos de la CPU)")
+    add_encoding(p)
+    p.set_defaults(func=cmd_join)
+
+    p = sub.add_parser('extract-audio', help="Extraer audio")
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--format', default='mp3', choices=AudioExtractor.SUPPORTED_FORMATS)
+    p.add_argument('--bitrate', default='192k')
+    add_output(p)
+    p.set_defaults(func=cmd_extract_audio)
+
+    p = sub.add_parser('analyze', help="Analizar videos (ffprobe)")
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--measure', action='store_true',
+                   help="Medir tiempo y tamaño de la conversión codificando muestras del archivo")
+    p.add_argument('--format', default='mp4', help="Formato de salida de la conversión a medir")
+    add_encoding(p)
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser('scan', help="Detectar corrupción")
+    p.add_argument('inputs', nargs='+')
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser('watch', help="Vigilar una carpeta y convertir los videos nuevos")
+    p.add_argument('watch_dir')
+    p.add_argument('--output-dir', required=True, help="Carpeta espejo donde se escriben las salidas")
+    p.add_argument('--preset', choices=list(DeviceProfiles.PROFILES.keys()),
+                   help="Perfil de dispositivo a aplicar (default: libx264/medium/CRF 23/mp4)")
+    p.add_argument('--settle', type=float, default=5.0,
+                   help="Segundos sin cambios antes de considerar completo un archivo")
+    p.add_argument('--db', default=None, help="Base de datos de la cola (default: ~/.videotool/watch.db)")
+    p.set_defaults(func=cmd_watch)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if getattr(args, 'output', None) and args.command != 'join' and len(args.inputs) > 1:
+        parser.error("--output solo se permite con una entrada; usa --output-dir")
+
+    if args.command == 'watch':
+        watch_dir = os.path.abspath(args.watch_dir)
+        output_dir = os.path.abspath(args.output_dir)
+        if output_dir == watch_dir or output_dir.startswith(watch_dir + os.sep):
+            parser.error("--output-dir no puede estar dentro de la carpeta vigilada")
+
+    # stdout queda reservado para los eventos JSON; los print() de core/ van a stderr
+    runner = CLIRunner(jobs=args.jobs, stream=sys.stdout)
+    sys.stdout = sys.stderr
+    try:
+        ok = args.func(runner, args)
+    except KeyboardInterrupt:
+        runner.cancel()
+        runner.emit('cancelled')
+        return 130
+    finally:
+        sys.stdout = runner.stream
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""Constantes globales de la aplicación"""
+
+# Frecuencia máxima (por segundo) con la que se repinta el progreso en la UI
+PROGRESS_UPDATE_HZ = 10
+
+# ffprobe simultáneos al sondear listas de archivos (uniones, altas en la cola)
+PROBE_WORKERS = 8
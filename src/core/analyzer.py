@@ -1,37 +1,22 @@
 """Módulo para análisis detallado de videos"""
-import subprocess
-import json
 import re
+from core.media_probe import MediaProbe
 
 class VideoAnalyzer:
     """Analiza videos y extrae información detallada"""
     
     @staticmethod
-    def analyze(file_path):
+    def analyze(file_path, media_info=None):
         """Analiza un video y retorna información completa"""
         try:
-            # Usar ffprobe para obtener información en JSON
-            cmd = [
-                'ffprobe',
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
-                file_path
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode != 0:
+            # El análisis detallado necesita el JSON completo de ffprobe (cacheado)
+            info = media_info
+            if info is None or info.probe_data is None:
+                info = MediaProbe.probe(file_path, timeout=30, fields=('probe_data',))
+            if info is None or info.probe_data is None:
                 return None
             
-            data = json.loads(result.stdout)
-            return VideoAnalyzer._parse_analysis(data, file_path)
+            return VideoAnalyzer._parse_analysis(info.probe_data, file_path)
             
         except Exception as e:
             print(f"Error analizando video: {e}")
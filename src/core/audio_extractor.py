@@ -1,38 +1,45 @@
 """Módulo para extraer audio de videos"""
 import subprocess
 import os
+from core.media_probe import MediaProbe
 
 class AudioExtractor:
     """Extrae audio de archivos de video"""
     
     SUPPORTED_FORMATS = ['mp3', 'aac', 'wav', 'flac', 'ogg', 'm4a']
     
+    @staticmethod
+    def build_command(input_file, output_file, format='mp3', bitrate='192k'):
+        """Construye el comando FFmpeg de extracción de audio"""
+        cmd = [
+            'ffmpeg',
+            '-i', input_file,
+            '-vn',  # No video
+            '-progress', 'pipe:2'
+        ]
+        
+        # Configuración específica por formato
+        if format == 'mp3':
+            cmd.extend(['-codec:a', 'libmp3lame', '-b:a', bitrate])
+        elif format == 'aac':
+            cmd.extend(['-codec:a', 'aac', '-b:a', bitrate])
+        elif format == 'wav':
+            cmd.extend(['-codec:a', 'pcm_s16le'])
+        elif format == 'flac':
+            cmd.extend(['-codec:a', 'flac'])
+        elif format == 'ogg':
+            cmd.extend(['-codec:a', 'libvorbis', '-b:a', bitrate])
+        elif format == 'm4a':
+            cmd.extend(['-codec:a', 'aac', '-b:a', bitrate])
+        
+        cmd.extend([output_file, '-y'])
+        return cmd
+    
     @staticmethod
     def extract(input_file, output_file, format='mp3', bitrate='192k'):
         """Extrae audio del video"""
         try:
-            cmd = [
-                'ffmpeg',
-                '-i', input_file,
-                '-vn',  # No video
-                '-progress', 'pipe:2'
-            ]
-            
-            # Configuración específica por formato
-            if format == 'mp3':
-                cmd.extend(['-codec:a', 'libmp3lame', '-b:a', bitrate])
-            elif format == 'aac':
-                cmd.extend(['-codec:a', 'aac', '-b:a', bitrate])
-            elif format == 'wav':
-                cmd.extend(['-codec:a', 'pcm_s16le'])
-            elif format == 'flac':
-                cmd.extend(['-codec:a', 'flac'])
-            elif format == 'ogg':
-                cmd.extend(['-codec:a', 'libvorbis', '-b:a', bitrate])
-            elif format == 'm4a':
-                cmd.extend(['-codec:a', 'aac', '-b:a', bitrate])
-            
-            cmd.extend([output_file, '-y'])
+            cmd = AudioExtractor.build_command(input_file, output_file, format, bitrate)
             
             process = subprocess.Popen(
                 cmd,
@@ -50,26 +57,23 @@ class AudioExtractor:
             return None
     
     @staticmethod
-    def get_audio_info(input_file):
+    def get_audio_info(input_file, media_info=None):
         """Obtiene información del audio en el video"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'a:0',
-                '-show_entries', 'stream=codec_name,sample_rate,channels,bit_rate',
-                '-of', 'default=noprint_wrappers=1',
-                input_file
-            ]
+            info = MediaProbe.ensure(input_file, media_info, ('audio_codec',))
+            if info is None:
+                return None
+            if not info.has_audio:
+                return ''
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=10
+            # Mismo formato que ffprobe -of default=noprint_wrappers=1
+            values = (
+                ('codec_name', info.audio_codec),
+                ('sample_rate', info.sample_rate),
+                ('channels', info.channels),
+                ('bit_rate', info.audio_bitrate or None),
             )
-            
-            return result.stdout
+            return ''.join(f"{key}={'N/A' if value is None else value}\n" for key, value in values)
             
         except Exception as e:
             print(f"Error obteniendo info de audio: {e}")
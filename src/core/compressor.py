@@ -1,51 +1,234 @@
 """Módulo para compresión inteligente de videos"""
 import subprocess
 import os
+import tempfile
+import uuid
+from core.media_probe import MediaProbe
 
 class VideoCompressor:
     """Comprime videos de manera inteligente"""
     
+    AUDIO_BITRATE = 128 * 1000  # 128 kbps
+    MIN_VIDEO_BITRATE = 100000  # 100 kbps
+    
+    # Desviación admitida respecto al tamaño objetivo antes de repetir la codificación
+    SIZE_TOLERANCE = 0.05
+    MAX_SIZE_RETRIES = 1
+    
+    # Codificadores con dos pasadas en procesos separados (archivo de estadísticas)
+    TWO_PASS_ENCODERS = ('libx264', 'libx265', 'libvpx-vp9')
+    
     @staticmethod
-    def compress_by_target_size(input_file, output_file, target_size_mb, encoder='libx264', preset='medium'):
-        """Comprime un video a un tamaño objetivo específico"""
-        try:
-            # Obtener duración del video
-            duration = VideoCompressor._get_duration(input_file)
-            if duration <= 0:
-                return None
-            
-            # Calcular bitrate necesario (en bits por segundo)
-            # target_size_mb * 8 * 1024 * 1024 / duration - audio_bitrate
-            audio_bitrate = 128 * 1000  # 128 kbps
-            target_bytes = target_size_mb * 1024 * 1024
-            target_bits = target_bytes * 8
-            
-            # Restar el bitrate de audio
-            video_bitrate = int((target_bits / duration) - audio_bitrate)
-            
-            # Asegurar bitrate mínimo
-            if video_bitrate < 100000:  # 100 kbps mínimo
-                video_bitrate = 100000
-            
-            cmd = [
-                'ffmpeg',
-                '-i', input_file
-            ]
-            
-            # Agregar aceleración si es NVENC
-            if 'nvenc' in encoder:
-                cmd.extend(['-hwaccel', 'cuda'])
-            
+    def build_target_size_command(input_file, output_file, target_size_mb, encoder='libx264', preset='medium',
+                                  media_info=None):
+        """Construye el comando para comprimir a un tamaño objetivo (None si no hay duración)"""
+        # Obtener duración del video
+        duration = VideoCompressor._get_duration(input_file, media_info)
+        if duration <= 0:
+            return None
+        
+        video_bitrate = VideoCompressor.target_video_bitrate(target_size_mb, duration)
+        return VideoCompressor._build_bitrate_command(input_file, output_file, video_bitrate, encoder, preset)
+    
+    @staticmethod
+    def target_video_bitrate(target_size_mb, duration):
+        """Bitrate de video (bits/s) para que video + audio ocupen target_size_mb"""
+        # target_size_mb * 8 * 1024 * 1024 / duration - audio_bitrate
+        target_bits = target_size_mb * 1024 * 1024 * 8
+        video_bitrate = int((target_bits / duration) - VideoCompressor.AUDIO_BITRATE)
+        
+        # Asegurar bitrate mínimo
+        return max(video_bitrate, VideoCompressor.MIN_VIDEO_BITRATE)
+    
+    @staticmethod
+    def prepare_target_size(input_file, output_file, target_size_mb, encoder='libx264', preset='medium',
+                            media_info=None, two_pass=True):
+        """
+        Pasos para comprimir a un tamaño objetivo (ver FFmpegSteps): retorna
+        (pasos, temporales) o (None, []) si no se conoce la duración.
+        
+        Con two_pass (y un codificador que lo admita) la primera pasada solo
+        analiza: sin audio, salida nula y ajustes rápidos. La segunda codifica
+        con esas estadísticas. NVENC hace las dos pasadas en un solo proceso
+        (-multipass). El último paso lleva 'verify': al terminar compara el
+        tamaño real con el objetivo y, solo si se sale de SIZE_TOLERANCE,
+        retorna un paso que repite la codificación final con el bitrate
+        corregido (reutilizando las estadísticas de la primera pasada).
+        """
+        duration = VideoCompressor._get_duration(input_file, media_info)
+        if duration <= 0:
+            return None, []
+        video_bitrate = VideoCompressor.target_video_bitrate(target_size_mb, duration)
+        
+        steps = []
+        temp_files = []
+        if two_pass and encoder in VideoCompressor.TWO_PASS_ENCODERS:
+            passlog = os.path.join(tempfile.gettempdir(), f"videotool_pass_{uuid.uuid4().hex}")
+            temp_files = [passlog + suffix for suffix in
+                          ('-0.log', '-0.log.mbtree', '-0.log.temp', '-0.log.mbtree.temp', '.log', '.log.cutree')]
+            steps.append({
+                'cmd': VideoCompressor._build_pass_command(input_file, None, video_bitrate, encoder, preset, 1, passlog),
+                'duration': duration,
+                'label': "Primera pasada (análisis)",
+                # La pasada de análisis es varias veces más rápida que la real
+                'weight': 0.3,
+            })
+            build = lambda bitrate: VideoCompressor._build_pass_command(
+                input_file, output_file, bitrate, encoder, preset, 2, passlog
+            )
+            label = "Segunda pasada"
+        else:
+            if two_pass and 'nvenc' in encoder:
+                build = lambda bitrate: VideoCompressor._build_bitrate_command(
+                    input_file, output_file, bitrate, encoder, preset, multipass=True
+                )
+            else:
+                build = lambda bitrate: VideoCompressor._build_bitrate_command(
+                    input_file, output_file, bitrate, encoder, preset
+                )
+            label = "Comprimiendo"
+        
+        def final_step(bitrate, retries, step_label):
+            def verify():
+                if retries <= 0:
+                    return None
+                corrected = VideoCompressor.corrected_bitrate(output_file, target_size_mb, duration, bitrate)
+                if corrected is None:
+                    return None
+                return final_step(corrected, retries - 1, "Tamaño fuera de tolerancia: repitiendo la codificación final")
+            return {
+                'cmd': build(bitrate),
+                'duration': duration,
+                'label': f"{step_label} ({bitrate // 1000} kbps)",
+                'verify': verify,
+            }
+        
+        steps.append(final_step(video_bitrate, VideoCompressor.MAX_SIZE_RETRIES, label))
+        return steps, temp_files
+    
+    @staticmethod
+    def corrected_bitrate(output_file, target_size_mb, duration, video_bitrate, tolerance=None):
+        """
+        Compara el tamaño de la salida con el objetivo. Retorna None si está
+        dentro de la tolerancia (o no se puede medir); si no, el bitrate de
+        video que corrige la desviación observada.
+        """
+        tolerance = VideoCompressor.SIZE_TOLERANCE if tolerance is None else tolerance
+        if not os.path.exists(output_file) or duration <= 0:
+            return None
+        
+        actual_bytes = os.path.getsize(output_file)
+        target_bytes = target_size_mb * 1024 * 1024
+        if actual_bytes <= 0 or abs(actual_bytes - target_bytes) <= target_bytes * tolerance:
+            return None
+        
+        # Escalar solo la parte de video (el audio es CBR y no cambia)
+        audio_bytes = VideoCompressor.AUDIO_BITRATE * duration / 8
+        actual_video = max(actual_bytes - audio_bytes, 1)
+        target_video = max(target_bytes - audio_bytes, 0)
+        corrected = int(video_bitrate * target_video / actual_video)
+        return max(corrected, VideoCompressor.MIN_VIDEO_BITRATE)
+    
+    @staticmethod
+    def build_percentage_command(input_file, output_file, percentage, encoder='libx264', preset='medium',
+                                 media_info=None):
+        """Construye el comando para comprimir por porcentaje de bitrate (None si no hay bitrate)"""
+        # Obtener bitrate actual
+        current_bitrate = VideoCompressor._get_bitrate(input_file, media_info)
+        if current_bitrate <= 0:
+            return None
+        
+        # Calcular nuevo bitrate
+        new_bitrate = int(current_bitrate * (percentage / 100))
+        
+        # Asegurar bitrate mínimo
+        if new_bitrate < 100000:
+            new_bitrate = 100000
+        
+        return VideoCompressor._build_bitrate_command(input_file, output_file, new_bitrate, encoder, preset)
+    
+    @staticmethod
+    def _build_bitrate_command(input_file, output_file, video_bitrate, encoder, preset, multipass=False):
+        """Comando FFmpeg de compresión a un bitrate de video dado"""
+        cmd = [
+            'ffmpeg',
+            '-i', input_file
+        ]
+        
+        # Agregar aceleración si es NVENC
+        if 'nvenc' in encoder:
+            cmd.extend(['-hwaccel', 'cuda'])
+        
+        cmd.extend([
+            '-c:v', encoder,
+            '-b:v', str(video_bitrate),
+            '-preset', preset,
+        ])
+        
+        if multipass:
+            # Dos pasadas internas de NVENC (primera a resolución completa)
+            cmd.extend(['-rc', 'vbr', '-multipass', 'fullres'])
+        
+        cmd.extend([
+            '-c:a', 'aac',
+            '-b:a', '128k',
+            '-progress', 'pipe:2',
+            output_file,
+            '-y'
+        ])
+        
+        return cmd
+    
+    @staticmethod
+    def _build_pass_command(input_file, output_file, video_bitrate, encoder, preset, pass_number, passlog):
+        """
+        Comando de una pasada de una codificación en dos pasadas. La primera
+        (output_file None) descarta la salida y omite el audio.
+        """
+        cmd = [
+            'ffmpeg',
+            '-i', input_file,
+            '-c:v', encoder,
+            '-b:v', str(video_bitrate),
+        ]
+        
+        if encoder == 'libvpx-vp9':
+            cmd.extend(['-deadline', 'good'])
+            if pass_number == 1:
+                # Análisis rápido; la segunda pasada mantiene la velocidad por defecto
+                cmd.extend(['-cpu-used', '4'])
+        else:
+            # x264/x265 ya aplican ajustes rápidos a la primera pasada por su cuenta
+            cmd.extend(['-preset', preset])
+        
+        if encoder == 'libx265':
+            cmd.extend(['-x265-params', f"pass={pass_number}:stats={passlog}.log"])
+        else:
+            cmd.extend(['-pass', str(pass_number), '-passlogfile', passlog])
+        
+        if pass_number == 1:
+            cmd.extend(['-an', '-f', 'null', '-progress', 'pipe:2', os.devnull, '-y'])
+        else:
             cmd.extend([
-                '-c:v', encoder,
-                '-b:v', str(video_bitrate),
-                '-preset', preset,
                 '-c:a', 'aac',
                 '-b:a', '128k',
                 '-progress', 'pipe:2',
                 output_file,
                 '-y'
             ])
+        
+        return cmd
+    
+    @staticmethod
+    def compress_by_target_size(input_file, output_file, target_size_mb, encoder='libx264', preset='medium',
+                                media_info=None):
+        """Comprime un video a un tamaño objetivo específico"""
+        try:
+            cmd = VideoCompressor.build_target_size_command(
+                input_file, output_file, target_size_mb, encoder, preset, media_info
+            )
+            if cmd is None:
+                return None
             
             process = subprocess.Popen(
                 cmd,
@@ -63,40 +246,16 @@ class VideoCompressor:
             return None
     
     @staticmethod
-    def compress_by_percentage(input_file, output_file, percentage, encoder='libx264', preset='medium'):
+    def compress_by_percentage(input_file, output_file, percentage, encoder='libx264', preset='medium',
+                               media_info=None):
         """Comprime un video reduciendo el bitrate en un porcentaje"""
         try:
-            # Obtener bitrate actual
-            current_bitrate = VideoCompressor._get_bitrate(input_file)
-            if current_bitrate <= 0:
+            cmd = VideoCompressor.build_percentage_command(
+                input_file, output_file, percentage, encoder, preset, media_info
+            )
+            if cmd is None:
                 return None
             
-            # Calcular nuevo bitrate
-            new_bitrate = int(current_bitrate * (percentage / 100))
-            
-            # Asegurar bitrate mínimo
-            if new_bitrate < 100000:
-                new_bitrate = 100000
-            
-            cmd = [
-                'ffmpeg',
-                '-i', input_file
-            ]
-            
-            if 'nvenc' in encoder:
-                cmd.extend(['-hwaccel', 'cuda'])
-            
-            cmd.extend([
-                '-c:v', encoder,
-                '-b:v', str(new_bitrate),
-                '-preset', preset,
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-progress', 'pipe:2',
-                output_file,
-                '-y'
-            ])
-            
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
@@ -113,36 +272,12 @@ class VideoCompressor:
             return None
     
     @staticmethod
-    def _get_duration(input_file):
+    def _get_duration(input_file, media_info=None):
         """Obtiene la duración del video"""
-        try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                input_file
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            return float(result.stdout.strip())
-        except:
-            return 0
+        return MediaProbe.duration(input_file, media_info)
     
     @staticmethod
-    def _get_bitrate(input_file):
+    def _get_bitrate(input_file, media_info=None):
         """Obtiene el bitrate del video"""
-        try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=bit_rate',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                input_file
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            return int(result.stdout.strip())
-        except:
-            return 0
\ No newline at end of file
+        info = MediaProbe.ensure(input_file, media_info, ('video_bitrate',))
+        return info.video_bitrate if info else 0
\ No newline at end of file
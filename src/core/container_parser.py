@@ -0,0 +1,375 @@
+"""Lectura directa de cabeceras MP4/MOV (moov) y Matroska/WebM (EBML)"""
+import array
+import mmap
+import os
+import struct
+import sys
+
+
+class ContainerParser:
+    """
+    Extrae los campos comunes (duración, dimensiones, FPS, codecs, bitrates)
+    leyendo solo las cabeceras del contenedor a través de mmap: no lee los
+    datos de audio/video ni lanza procesos, así que cuesta microsegundos.
+
+    parse() retorna un dict con los argumentos de MediaInfo o None si el
+    contenedor no es MP4/MOV/Matroska o la cabecera no se puede interpretar.
+    Los nombres de codec siguen la nomenclatura de ffprobe.
+    """
+
+    MP4_CODECS = {
+        b'avc1': 'h264', b'avc3': 'h264', b'hvc1': 'hevc', b'hev1': 'hevc',
+        b'vp08': 'vp8', b'vp09': 'vp9', b'av01': 'av1', b'mp4v': 'mpeg4',
+        b'apch': 'prores', b'apcn': 'prores', b'apcs': 'prores', b'apco': 'prores', b'ap4h': 'prores',
+        b'mjpa': 'mjpeg', b'jpeg': 'mjpeg',
+        b'mp4a': 'aac', b'ac-3': 'ac3', b'ec-3': 'eac3', b'Opus': 'opus', b'fLaC': 'flac',
+        b'alac': 'alac', b'.mp3': 'mp3', b'sowt': 'pcm_s16le', b'twos': 'pcm_s16be',
+        b'tx3g': 'mov_text', b'wvtt': 'webvtt',
+    }
+    MATROSKA_CODECS = {
+        'V_MPEG4/ISO/AVC': 'h264', 'V_MPEGH/ISO/HEVC': 'hevc', 'V_VP8': 'vp8', 'V_VP9': 'vp9',
+        'V_AV1': 'av1', 'V_MPEG4/ISO/ASP': 'mpeg4', 'V_MPEG2': 'mpeg2video', 'V_MJPEG': 'mjpeg',
+        'V_PRORES': 'prores',
+        'A_AAC': 'aac', 'A_OPUS': 'opus', 'A_VORBIS': 'vorbis', 'A_AC3': 'ac3', 'A_EAC3': 'eac3',
+        'A_FLAC': 'flac', 'A_MPEG/L3': 'mp3', 'A_DTS': 'dts', 'A_PCM/INT/LIT': 'pcm_s16le',
+        'S_TEXT/UTF8': 'subrip', 'S_TEXT/ASS': 'ass', 'S_TEXT/SSA': 'ass', 'S_TEXT/WEBVTT': 'webvtt',
+        'S_HDMV/PGS': 'hdmv_pgs_subtitle', 'S_VOBSUB': 'dvd_subtitle',
+    }
+
+    # IDs EBML (con su marcador de longitud)
+    EBML_HEADER = 0x1A45DFA3
+    SEGMENT = 0x18538067
+    SEEK_HEAD = 0x114D9B74
+    SEEK = 0x4DBB
+    SEEK_ID = 0x53AB
+    SEEK_POSITION = 0x53AC
+    INFO = 0x1549A966
+    TRACKS = 0x1654AE6B
+    CLUSTER = 0x1F43B675
+    TIMECODE_SCALE = 0x2AD7B1
+    DURATION = 0x4489
+    TRACK_ENTRY = 0xAE
+    TRACK_TYPE = 0x83
+    CODEC_ID = 0x86
+    DEFAULT_DURATION = 0x23E383
+    LANGUAGE = 0x22B59C
+    VIDEO = 0xE0
+    AUDIO = 0xE1
+    PIXEL_WIDTH = 0xB0
+    PIXEL_HEIGHT = 0xBA
+    SAMPLING_FREQUENCY = 0xB5
+    CHANNELS = 0x9F
+
+    @staticmethod
+    def parse(file_path):
+        try:
+            size = os.path.getsize(file_path)
+            if size < 16:
+                return None
+            with open(file_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data[:4] == b'\x1a\x45\xdf\xa3':
+                        result = ContainerParser._parse_matroska(data)
+                    elif data[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                        result = ContainerParser._parse_mp4(data)
+                    else:
+                        return None
+        except (OSError, ValueError, struct.error, IndexError, OverflowError):
+            return None
+
+        if result is None:
+            return None
+        result['size'] = size
+        if result.get('duration'):
+            result['bitrate'] = int(size * 8 / result['duration'])
+        return result
+
+    # ------------------------------------------------------------------
+    # MP4 / MOV
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _boxes(data, start, end):
+        """Itera (tipo, inicio_contenido, fin) de las cajas entre start y end"""
+        offset = start
+        while offset + 8 <= end:
+            size, box_type = struct.unpack_from('>I4s', data, offset)
+            header = 8
+            if size == 1:
+                size = struct.unpack_from('>Q', data, offset + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - offset
+            if size < header or offset + size > end:
+                return
+            yield box_type, offset + header, offset + size
+            offset += size
+
+    @staticmethod
+    def _find_box(data, start, end, box_type):
+        for found, content, box_end in ContainerParser._boxes(data, start, end):
+            if found == box_type:
+                return content, box_end
+        return None
+
+    @staticmethod
+    def _parse_mp4(data):
+        moov = ContainerParser._find_box(data, 0, len(data), b'moov')
+        if moov is None:
+            return None
+
+        result = {'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'subtitle_streams': []}
+        index = 0
+        for box_type, content, box_end in ContainerParser._boxes(data, *moov):
+            if box_type == b'mvhd':
+                version = data[content]
+                if version == 1:
+                    timescale, duration = struct.unpack_from('>IQ', data, content + 20)
+                else:
+                    timescale, duration = struct.unpack_from('>II', data, content + 12)
+                if timescale:
+                    result['duration'] = duration / timescale
+            elif box_type == b'trak':
+                ContainerParser._parse_mp4_track(data, content, box_end, index, result)
+                index += 1
+        return result
+
+    @staticmethod
+    def _parse_mp4_track(data, start, end, index, result):
+        mdia = ContainerParser._find_box(data, start, end, b'mdia')
+        if mdia is None:
+            return
+        timescale = duration = 0
+        handler = None
+        language = 'und'
+        stbl = None
+        for box_type, content, box_end in ContainerParser._boxes(data, *mdia):
+            if box_type == b'mdhd':
+                version = data[content]
+                if version == 1:
+                    timescale, duration, lang = struct.unpack_from('>IQH', data, content + 20)
+                else:
+                    timescale, duration, lang = struct.unpack_from('>IIH', data, content + 12)
+                # Idioma ISO 639-2 empaquetado en 3 x 5 bits
+                language = ''.join(chr(((lang >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+            elif box_type == b'hdlr':
+                handler = bytes(data[content + 8:content + 12])
+            elif box_type == b'minf':
+                stbl = ContainerParser._find_box(data, content, box_end, b'stbl')
+
+        if stbl is None or handler not in (b'vide', b'soun', b'text', b'sbtl', b'subt'):
+            return
+
+        entry = None
+        stts = stsz = None
+        for box_type, content, box_end in ContainerParser._boxes(data, *stbl):
+            if box_type == b'stsd' and box_end - content >= 16:
+                entry = (content + 8, box_end)
+            elif box_type == b'stts':
+                stts = content
+            elif box_type == b'stsz':
+                stsz = content
+        if entry is None:
+            return
+
+        fourcc = bytes(data[entry[0] + 4:entry[0] + 8])
+        codec = ContainerParser.MP4_CODECS.get(fourcc, fourcc.decode('latin-1').strip().lower())
+        seconds = duration / timescale if timescale else 0
+        bitrate = int(ContainerParser._mp4_total_bytes(data, stsz) * 8 / seconds) if stsz and seconds else 0
+
+        if handler == b'vide' and 'video_codec' not in result:
+            width, height = struct.unpack_from('>HH', data, entry[0] + 32)
+            result.update({
+                'video_codec': codec,
+                'width': width,
+                'height': height,
+                'fps': ContainerParser._mp4_frame_rate(data, stts, timescale),
+                'video_bitrate': bitrate,
+            })
+        elif handler == b'soun' and 'audio_codec' not in result:
+            channels = struct.unpack_from('>H', data, entry[0] + 24)[0]
+            sample_rate = struct.unpack_from('>I', data, entry[0] + 32)[0] >> 16
+            result.update({
+                'audio_codec': codec,
+                'channels': channels,
+                'sample_rate': sample_rate,
+                'audio_bitrate': bitrate,
+            })
+        elif handler in (b'text', b'sbtl', b'subt'):
+            result['subtitle_streams'].append((str(index), codec, language))
+
+    @staticmethod
+    def _mp4_frame_rate(data, stts, timescale):
+        """FPS a partir de la duración de cuadro más frecuente (como r_frame_rate)"""
+        if stts is None or not timescale:
+            return None
+        entries = struct.unpack_from('>I', data, stts + 4)[0]
+        best_count = best_delta = 0
+        for i in range(min(entries, 4096)):
+            count, delta = struct.unpack_from('>II', data, stts + 8 + i * 8)
+            if count > best_count and delta:
+                best_count, best_delta = count, delta
+        return round(timescale / best_delta, 3) if best_delta else None
+
+    @staticmethod
+    def _mp4_total_bytes(data, stsz):
+        sample_size, count = struct.unpack_from('>II', data, stsz + 4)
+        if sample_size:
+            return sample_size * count
+        sizes = array.array('I')
+        sizes.frombytes(data[stsz + 12:stsz + 12 + count * 4])
+        if sys.byteorder == 'little':
+            sizes.byteswap()
+        return sum(sizes)
+
+    # ------------------------------------------------------------------
+    # Matroska / WebM
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _read_vint(data, offset, keep_marker):
+        first = data[offset]
+        length = 1
+        mask = 0x80
+        while length <= 8 and not first & mask:
+            length += 1
+            mask >>= 1
+        if length > 8:
+            raise ValueError("vint inválido")
+        value = first if keep_marker else first & (mask - 1)
+        for byte in data[offset + 1:offset + length]:
+            value = (value << 8) | byte
+        unknown = not keep_marker and value == (1 << (7 * length)) - 1
+        return value, offset + length, unknown
+
+    @staticmethod
+    def _elements(data, start, end):
+        """Itera (id, inicio_contenido, fin) de los elementos EBML entre start y end"""
+        offset = start
+        while offset < end:
+            element_id, offset, _ = ContainerParser._read_vint(data, offset, True)
+            size, offset, unknown = ContainerParser._read_vint(data, offset, False)
+            element_end = end if unknown else min(offset + size, end)
+            yield element_id, offset, element_end
+            if unknown and element_id == ContainerParser.SEGMENT:
+                return
+            offset = element_end
+
+    @staticmethod
+    def _uint(data, start, end):
+        return int.from_bytes(data[start:end], 'big')
+
+    @staticmethod
+    def _float(data, start, end):
+        if end - start == 4:
+            return struct.unpack_from('>f', data, start)[0]
+        if end - start == 8:
+            return struct.unpack_from('>d', data, start)[0]
+        return 0.0
+
+    @staticmethod
+    def _parse_matroska(data):
+        segment = None
+        for element_id, content, element_end in ContainerParser._elements(data, 0, len(data)):
+            if element_id == ContainerParser.SEGMENT:
+                segment = (content, element_end)
+                break
+        if segment is None:
+            return None
+
+        sections = {}
+        seek_positions = {}
+        for element_id, content, element_end in ContainerParser._elements(data, *segment):
+            if element_id in (ContainerParser.INFO, ContainerParser.TRACKS):
+                sections.setdefault(element_id, (content, element_end))
+            elif element_id == ContainerParser.SEEK_HEAD:
+                seek_positions.update(ContainerParser._seek_positions(data, content, element_end, segment[0]))
+            elif element_id == ContainerParser.CLUSTER:
+                # Los datos empiezan aquí: lo que falte se busca con SeekHead
+                break
+            if len(sections) == 2:
+                break
+
+        for section_id, position in seek_positions.items():
+            if section_id not in sections and position < len(data):
+                for element_id, content, element_end in ContainerParser._elements(data, position, len(data)):
+                    if element_id == section_id:
+                        sections[section_id] = (content, element_end)
+                    break
+
+        if ContainerParser.TRACKS not in sections:
+            return None
+
+        result = {'format_name': 'matroska,webm', 'subtitle_streams': []}
+        if ContainerParser.INFO in sections:
+            scale = 1000000
+            duration = 0.0
+            for element_id, content, element_end in ContainerParser._elements(data, *sections[ContainerParser.INFO]):
+                if element_id == ContainerParser.TIMECODE_SCALE:
+                    scale = ContainerParser._uint(data, content, element_end)
+                elif element_id == ContainerParser.DURATION:
+                    duration = ContainerParser._float(data, content, element_end)
+            result['duration'] = duration * scale / 1e9
+
+        index = 0
+        for element_id, content, element_end in ContainerParser._elements(data, *sections[ContainerParser.TRACKS]):
+            if element_id == ContainerParser.TRACK_ENTRY:
+                ContainerParser._parse_matroska_track(data, content, element_end, index, result)
+                index += 1
+        return result
+
+    @staticmethod
+    def _seek_positions(data, start, end, segment_start):
+        positions = {}
+        for element_id, content, element_end in ContainerParser._elements(data, start, end):
+            if element_id != ContainerParser.SEEK:
+                continue
+            seek_id = position = None
+            for child_id, child, child_end in ContainerParser._elements(data, content, element_end):
+                if child_id == ContainerParser.SEEK_ID:
+                    seek_id = ContainerParser._uint(data, child, child_end)
+                elif child_id == ContainerParser.SEEK_POSITION:
+                    position = ContainerParser._uint(data, child, child_end)
+            if seek_id in (ContainerParser.INFO, ContainerParser.TRACKS) and position is not None:
+                positions[seek_id] = segment_start + position
+        return positions
+
+    @staticmethod
+    def _parse_matroska_track(data, start, end, index, result):
+        track = {'language': 'eng'}  # valor por defecto de Matroska
+        for element_id, content, element_end in ContainerParser._elements(data, start, end):
+            if element_id == ContainerParser.TRACK_TYPE:
+                track['type'] = ContainerParser._uint(data, content, element_end)
+            elif element_id == ContainerParser.CODEC_ID:
+                track['codec'] = bytes(data[content:element_end]).rstrip(b'\x00').decode('ascii', 'replace')
+            elif element_id == ContainerParser.DEFAULT_DURATION:
+                track['frame_ns'] = ContainerParser._uint(data, content, element_end)
+            elif element_id == ContainerParser.LANGUAGE:
+                track['language'] = bytes(data[content:element_end]).rstrip(b'\x00').decode('ascii', 'replace')
+            elif element_id in (ContainerParser.VIDEO, ContainerParser.AUDIO):
+                for child_id, child, child_end in ContainerParser._elements(data, content, element_end):
+                    if child_id == ContainerParser.PIXEL_WIDTH:
+                        track['width'] = ContainerParser._uint(data, child, child_end)
+                    elif child_id == ContainerParser.PIXEL_HEIGHT:
+                        track['height'] = ContainerParser._uint(data, child, child_end)
+                    elif child_id == ContainerParser.SAMPLING_FREQUENCY:
+                        track['sample_rate'] = int(ContainerParser._float(data, child, child_end))
+                    elif child_id == ContainerParser.CHANNELS:
+                        track['channels'] = ContainerParser._uint(data, child, child_end)
+
+        codec_id = track.get('codec', '')
+        codec = ContainerParser.MATROSKA_CODECS.get(codec_id, codec_id.split('/')[0][2:].lower() or None)
+        if track.get('type') == 1 and 'video_codec' not in result:
+            frame_ns = track.get('frame_ns')
+            result.update({
+                'video_codec': codec,
+                'width': track.get('width'),
+                'height': track.get('height'),
+                'fps': round(1e9 / frame_ns, 3) if frame_ns else None,
+            })
+        elif track.get('type') == 2 and 'audio_codec' not in result:
+            result.update({
+                'audio_codec': codec,
+                'sample_rate': track.get('sample_rate', 8000),
+                'channels': track.get('channels', 1),
+            })
+        elif track.get('type') == 17:
+            result['subtitle_streams'].append((str(index), codec, track['language']))
@@ -0,0 +1,212 @@
+"""Búsqueda del CRF de cada video codificando muestras cortas"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.media_probe import MediaProbe
+
+class CRFOptimizer:
+    """
+    Elige el CRF por video en lugar de usar uno fijo.
+
+    Toma unas pocas muestras repartidas por el video, las codifica en
+    paralelo con varios CRF candidatos y mide su calidad frente al original
+    con los filtros ssim o psnr de FFmpeg. El resultado es el CRF más alto
+    (archivo más pequeño) cuya peor muestra alcanza el objetivo de calidad.
+    """
+
+    # Objetivo por defecto de cada métrica (SSIM 'All' y PSNR 'average' en dB)
+    DEFAULT_TARGETS = {'ssim': 0.975, 'psnr': 38.0}
+
+    # CRF candidatos por codificador (la escala de VP9 es distinta)
+    CANDIDATE_CRFS = {
+        'libvpx-vp9': (24, 28, 31, 34, 37, 40, 43),
+        'default': (18, 20, 22, 24, 26, 28, 30),
+    }
+
+    # Muestras por búsqueda y su duración en segundos (QueuePlanner estima con ellas)
+    SAMPLES = 4
+    SAMPLE_SECONDS = 4
+
+    METRIC_PATTERNS = {
+        'ssim': re.compile(r'All:\s*([\d.]+)'),
+        'psnr': re.compile(r'average:\s*([\d.]+|inf)'),
+    }
+
+    def __init__(self, input_file, encoder='libx264', preset='medium', metric='ssim', target=None,
+                 crfs=None, samples=SAMPLES, sample_seconds=SAMPLE_SECONDS, workers=None, media_info=None):
+        self.input_file = input_file
+        self.media_info = media_info
+        self.encoder = encoder
+        self.preset = preset
+        self.metric = metric if metric in CRFOptimizer.METRIC_PATTERNS else 'ssim'
+        self.target = target if target is not None else CRFOptimizer.DEFAULT_TARGETS[self.metric]
+        self.crfs = tuple(sorted(crfs or CRFOptimizer.CANDIDATE_CRFS.get(
+            encoder, CRFOptimizer.CANDIDATE_CRFS['default']
+        )))
+        self.samples = max(1, int(samples))
+        self.sample_seconds = sample_seconds
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+
+        self.is_running = True
+        self.temp_dir = None
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    def optimize(self, log_callback=None):
+        """
+        Ejecuta la búsqueda. Retorna un dict con 'crf', 'quality', 'bitrate'
+        (bits/s estimados de las muestras) y 'results' (por CRF), o None si
+        no se pudo medir (video sin duración, cancelación o errores).
+        """
+        log = log_callback or (lambda msg: None)
+        # Cancelado antes de empezar (is_running solo se activa al crearlo)
+        if not self.is_running:
+            return None
+
+        duration = MediaProbe.duration(self.input_file, self.media_info)
+        starts = CRFOptimizer.sample_points(duration, self.samples, self.sample_seconds)
+        if not starts:
+            return None
+
+        length = min(self.sample_seconds, duration)
+        log(f"   Buscando CRF: {len(starts)} muestras x {len(self.crfs)} CRF "
+            f"({self.metric.upper()} >= {self.target})")
+
+        self.temp_dir = tempfile.mkdtemp(prefix='videotool_crf_')
+        try:
+            tasks = [(crf, index, start) for crf in self.crfs for index, start in enumerate(starts)]
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+                measures = list(pool.map(lambda task: self._measure(*task, length), tasks))
+
+            if not self.is_running or any(measure is None for measure in measures):
+                return None
+
+            results = []
+            for crf in self.crfs:
+                points = [measure for (task_crf, _, _), measure in zip(tasks, measures) if task_crf == crf]
+                total_bytes = sum(size for size, _ in points)
+                results.append({
+                    'crf': crf,
+                    # Peor muestra: protege las escenas difíciles
+                    'quality': min(quality for _, quality in points),
+                    'bitrate': int(total_bytes * 8 / (length * len(points))),
+                })
+
+            passing = [result for result in results if result['quality'] >= self.target]
+            # Ningún candidato llega al objetivo: el de mayor calidad
+            best = max(passing, key=lambda r: r['crf']) if passing else results[0]
+            for result in results:
+                mark = " <-" if result is best else ""
+                log(f"     CRF {result['crf']}: {self.metric.upper()} {result['quality']:.4f}, "
+                    f"{result['bitrate'] // 1000} kbps{mark}")
+
+            return {
+                'crf': best['crf'],
+                'quality': best['quality'],
+                'bitrate': best['bitrate'],
+                'metric': self.metric,
+                'target_met': bool(passing),
+                'results': results,
+            }
+        finally:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+    def cancel(self):
+        """Cancela la búsqueda y mata los procesos FFmpeg"""
+        self.is_running = False
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except:
+                pass
+
+    @staticmethod
+    def sample_points(duration, count=SAMPLES, length=SAMPLE_SECONDS):
+        """
+        Inicio (s) de count muestras de length segundos repartidas de forma
+        uniforme (centradas en cada tramo, evitando el principio y el final).
+        """
+        if duration <= 0:
+            return []
+        if duration <= length * count:
+            # Video corto: menos muestras, sin solaparse
+            count = max(1, int(duration // length))
+        starts = []
+        for index in range(count):
+            center = duration * (index + 0.5) / count
+            start = min(max(center - length / 2, 0), max(duration - length, 0))
+            starts.append(round(start, 3))
+        return starts
+
+    def _measure(self, crf, index, start, length):
+        """Codifica una muestra con un CRF y la compara con el original. Retorna (bytes, calidad)"""
+        if not self.is_running:
+            return None
+
+        sample = os.path.join(self.temp_dir, f"sample_{index}_crf{crf}.mkv")
+        encode_cmd = [
+            'ffmpeg',
+            '-ss', str(start),
+            '-t', str(length),
+            '-i', self.input_file,
+            '-map', '0:v:0',
+            '-an',
+        ]
+        encode_cmd.extend(FFmpegWrapper.build_video_args(self.encoder, self.preset, crf))
+        encode_cmd.extend([sample, '-y'])
+
+        if self._run(encode_cmd)[0] != 0 or not os.path.exists(sample):
+            return None
+
+        # Misma búsqueda en el original para que los fotogramas coincidan
+        metric_cmd = [
+            'ffmpeg',
+            '-i', sample,
+            '-ss', str(start),
+            '-t', str(length),
+            '-i', self.input_file,
+            '-lavfi', f"[0:v][1:v]{self.metric}",
+            '-f', 'null', '-'
+        ]
+        returncode, stderr = self._run(metric_cmd)
+        if returncode != 0:
+            return None
+
+        matches = CRFOptimizer.METRIC_PATTERNS[self.metric].findall(stderr)
+        if not matches:
+            return None
+        # PSNR 'inf' = idéntico; se limita para poder comparar
+        quality = 100.0 if matches[-1] == 'inf' else float(matches[-1])
+        return os.path.getsize(sample), quality
+
+    def _run(self, cmd):
+        """Ejecuta un comando FFmpeg registrándolo para cancelación. Retorna (código, stderr)"""
+        if not self.is_running:
+            return -1, ''
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace'
+        )
+        with self._lock:
+            self._processes.add(process)
+        # cancel() pudo llegar entre la comprobación y el registro
+        if not self.is_running:
+            process.kill()
+        try:
+            _, stderr = process.communicate()
+            return process.returncode, stderr
+        finally:
+            with self._lock:
+                self._processes.discard(process)
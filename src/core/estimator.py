@@ -1,8 +1,21 @@
 """Módulo para estimar tiempo y tamaño de conversión"""
-import os
+import math
+import threading
+from core.job_history import JobHistory
+from core.sample_estimator import SampleEstimator
 
 class ConversionEstimator:
-    """Estima tiempo y tamaño de archivo para conversiones"""
+    """
+    Estima tiempo y tamaño de archivo para conversiones.
+
+    Si hay conversiones anteriores en JobHistory se ajusta con ellas un
+    modelo por mínimos cuadrados (log-velocidad frente a píxeles por
+    segundo; log-bitrate frente a CRF, píxeles y fps). Las tablas fijas
+    solo se usan cuando no hay datos del codificador y preset pedidos.
+
+    Para un archivo concreto, measure() codifica muestras en lugar de
+    estimar (más lento, pero medido en esta máquina).
+    """
     
     # Velocidades aproximadas de conversión (segundos de video por segundo real)
     # Estos valores son aproximados y dependen del hardware
@@ -40,10 +53,27 @@ class ConversionEstimator:
         }
     }
     
+    # Pendientes supuestas cuando el historial no permite estimarlas:
+    # velocidad inversamente proporcional a los píxeles por segundo, y
+    # bitrate que se duplica cada 6 CRF menos y crece algo menos que los píxeles
+    SPEED_PRIORS = {'log_pixel_rate': -1.0}
+    BITRATE_PRIORS = {'crf': -math.log(2) / 6, 'log_pixels': 0.85, 'log_fps': 0.5}
+    
+    # Conversiones con el mismo codec de origen para usar solo esas
+    MIN_CODEC_SAMPLES = 3
+    
+    _models = {}
+    _models_lock = threading.Lock()
+    
     @staticmethod
-    def estimate_time(duration, encoder='libx264', preset='medium'):
+    def estimate_time(duration, encoder='libx264', preset='medium', resolution=None, fps=None,
+                      source_codec=None, history=None):
         """Estima el tiempo de conversión en segundos"""
         try:
+            speed = ConversionEstimator.learned_speed(encoder, preset, resolution, fps, source_codec, history)
+            if speed:
+                return duration / speed
+            
             if encoder in ConversionEstimator.SPEED_FACTORS:
                 speeds = ConversionEstimator.SPEED_FACTORS[encoder]
                 
@@ -64,12 +94,12 @@ class ConversionEstimator:
             return duration
     
     @staticmethod
-    def estimate_size(duration, bitrate=None, crf=23, resolution=None):
+    def estimate_size(duration, bitrate=None, crf=23, resolution=None, encoder='libx264', fps=None, history=None):
         """Estima el tamaño del archivo de salida en bytes"""
         try:
-            # Si no se especifica bitrate, estimarlo basado en CRF y resolución
+            # Si no se especifica bitrate, el del historial o, sin datos, por CRF y resolución
             if bitrate is None:
-                bitrate = ConversionEstimator._estimate_bitrate(crf, resolution)
+                bitrate = ConversionEstimator.expected_video_bitrate(encoder, crf, resolution, fps, history)
             
             # Tamaño = (bitrate en bits/segundo * duración en segundos) / 8
             estimated_bytes = (bitrate * duration) / 8
@@ -83,6 +113,169 @@ class ConversionEstimator:
             print(f"Error estimando tamaño: {e}")
             return 0
     
+    @staticmethod
+    def measure(input_file, encoder='libx264', preset='medium', crf=23, output_format='mp4',
+                media_info=None, log_callback=None, **options):
+        """
+        Modo "medir": codifica tramos cortos del archivo con la configuración
+        exacta y extrapola tiempo y tamaño con cotas (ver SampleEstimator).
+        Retorna None si no se pudo medir.
+        """
+        estimator = SampleEstimator(
+            input_file, encoder, preset, crf, output_format, media_info=media_info, **options
+        )
+        return estimator.measure(log_callback)
+    
+    @staticmethod
+    def learned_speed(encoder, preset, resolution=None, fps=None, source_codec=None, history=None):
+        """Velocidad (segundos de video por segundo real) según el historial, o None sin datos"""
+        history = history or JobHistory.default()
+        key = ('speed', id(history), history.revision, encoder, preset, source_codec)
+        
+        def fit():
+            rows = [row for row in history.samples(encoder, preset) if row['speed']]
+            # Decodificar HEVC/AV1 cuesta más que H.264: preferir el mismo origen
+            same_codec = [row for row in rows if row['source_codec'] == source_codec]
+            if len(same_codec) >= ConversionEstimator.MIN_CODEC_SAMPLES:
+                rows = same_codec
+            return ConversionEstimator._fit(
+                rows,
+                lambda row: math.log(row['speed']),
+                {'log_pixel_rate': lambda row: math.log(row['width'] * row['height'] * row['fps'])},
+                ConversionEstimator.SPEED_PRIORS
+            )
+        
+        model = ConversionEstimator._cached_model(key, fit)
+        if model is None:
+            return None
+        
+        values = {}
+        if resolution and all(resolution) and fps:
+            values['log_pixel_rate'] = math.log(resolution[0] * resolution[1] * fps)
+        return math.exp(ConversionEstimator._predict(model, values))
+    
+    @staticmethod
+    def learned_bitrate(encoder, crf, resolution=None, fps=None, history=None):
+        """Bitrate de video (bits/s) según el historial del codificador, o None sin datos"""
+        history = history or JobHistory.default()
+        key = ('bitrate', id(history), history.revision, encoder)
+        
+        def fit():
+            # El preset apenas cambia el tamaño con CRF: se usan todos
+            rows = [row for row in history.samples(encoder) if row['crf'] is not None]
+            return ConversionEstimator._fit(
+                rows,
+                lambda row: math.log(max(row['video_bitrate'], 1)),
+                {
+                    'crf': lambda row: row['crf'],
+                    'log_pixels': lambda row: math.log(row['width'] * row['height']),
+                    'log_fps': lambda row: math.log(row['fps']),
+                },
+                ConversionEstimator.BITRATE_PRIORS
+            )
+        
+        model = ConversionEstimator._cached_model(key, fit)
+        if model is None:
+            return None
+        
+        values = {'crf': crf}
+        if resolution and all(resolution):
+            values['log_pixels'] = math.log(resolution[0] * resolution[1])
+        if fps:
+            values['log_fps'] = math.log(fps)
+        return int(math.exp(ConversionEstimator._predict(model, values)))
+    
+    @staticmethod
+    def expected_video_bitrate(encoder, crf, resolution=None, fps=None, history=None):
+        """Bitrate de video (bits/s) que daría el CRF: el del historial o, sin datos, el de la tabla"""
+        return (ConversionEstimator.learned_bitrate(encoder, crf, resolution, fps, history)
+                or ConversionEstimator._estimate_bitrate(crf, resolution))
+    
+    @staticmethod
+    def _cached_model(key, fit):
+        """Modelo ajustado una vez por revisión del historial (None si no hay datos)"""
+        with ConversionEstimator._models_lock:
+            if key in ConversionEstimator._models:
+                return ConversionEstimator._models[key]
+        model = fit()
+        with ConversionEstimator._models_lock:
+            # Las revisiones anteriores ya no se van a pedir
+            stale = [k for k in ConversionEstimator._models if k[:2] == key[:2] and k[2] != key[2]]
+            for k in stale:
+                del ConversionEstimator._models[k]
+            ConversionEstimator._models[key] = model
+        return model
+    
+    @staticmethod
+    def _fit(rows, target, features, priors, fixed=False):
+        """
+        Mínimos cuadrados de target(fila) = a + suma(b_i * (x_i - media_i)).
+
+        Las variables sin variación en los datos, o que no caben por falta
+        de filas (se exige una más que incógnitas), usan la pendiente
+        supuesta de priors (todas con fixed). Retorna None si no hay filas.
+        """
+        if not rows:
+            return None
+        
+        ys = [target(row) for row in rows]
+        xs = {name: [feature(row) for row in rows] for name, feature in features.items()}
+        means = {name: sum(values) / len(values) for name, values in xs.items()}
+        
+        free = [] if fixed else [
+            name for name in features
+            if max(xs[name]) - min(xs[name]) > 1e-6
+        ][:max(0, len(rows) - 2)]
+        slopes = {name: priors[name] for name in features if name not in free}
+        
+        # Quitar la parte de las pendientes fijas y centrar
+        residuals = [
+            y - sum(slope * (xs[name][i] - means[name]) for name, slope in slopes.items())
+            for i, y in enumerate(ys)
+        ]
+        intercept = sum(residuals) / len(residuals)
+        
+        if free:
+            columns = [[x - means[name] for x in xs[name]] for name in free]
+            centered = [r - intercept for r in residuals]
+            # Ecuaciones normales (X'X) b = X'y
+            matrix = [[sum(a * b for a, b in zip(ci, cj)) for cj in columns] for ci in columns]
+            vector = [sum(a * b for a, b in zip(ci, centered)) for ci in columns]
+            solution = ConversionEstimator._solve(matrix, vector)
+            if solution is None:
+                # Variables colineales: pendientes supuestas para todas
+                return ConversionEstimator._fit(rows, target, features, priors, fixed=True)
+            slopes.update(zip(free, solution))
+        
+        return {'intercept': intercept, 'slopes': slopes, 'means': means, 'samples': len(rows)}
+    
+    @staticmethod
+    def _solve(matrix, vector):
+        """Eliminación gaussiana con pivoteo parcial. None si el sistema es singular"""
+        size = len(vector)
+        rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+            if abs(rows[pivot][col]) < 1e-12:
+                return None
+            rows[col], rows[pivot] = rows[pivot], rows[col]
+            for r in range(col + 1, size):
+                factor = rows[r][col] / rows[col][col]
+                for c in range(col, size + 1):
+                    rows[r][c] -= factor * rows[col][c]
+        solution = [0.0] * size
+        for r in range(size - 1, -1, -1):
+            solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+        return solution
+    
+    @staticmethod
+    def _predict(model, values):
+        """Valor del modelo; las variables desconocidas toman la media del historial"""
+        return model['intercept'] + sum(
+            slope * (values.get(name, model['means'][name]) - model['means'][name])
+            for name, slope in model['slopes'].items()
+        )
+    
     @staticmethod
     def _estimate_bitrate(crf, resolution):
         """Estima el bitrate basado en CRF y resolución"""
@@ -0,0 +1,83 @@
+"""Trabajos de FFmpeg en varios pasos (adaptar + unir, dos pasadas...)"""
+import os
+
+
+class FFmpegSteps:
+    """
+    Utilidades para las listas de pasos que retornan VideoJoiner.prepare_join
+    y VideoCompressor.prepare_target_size. Cada paso es un dict con:
+
+    - 'cmd', 'duration', 'label': comando, duración para el progreso y texto para el log
+    - 'parallel' (opcional): puede correr a la vez que los pasos 'parallel' contiguos
+    - 'weight' (opcional): coste relativo por segundo (1 por defecto)
+    - 'verify' (opcional): función que se llama al terminar el paso con éxito
+      y retorna un paso adicional a ejecutar (o None)
+    - 'input' (opcional): archivo de entrada, para reportar el progreso por separado
+    - 'record' (opcional): función que recibe el tiempo real del paso (None si
+      corrió junto a otros trabajos) para guardarlo en JobHistory
+    """
+
+    @staticmethod
+    def groups(steps):
+        """Agrupa los pasos consecutivos marcados como 'parallel' (el resto va solo)"""
+        groups = []
+        for step in steps:
+            if step.get('parallel') and groups and groups[-1][0].get('parallel'):
+                groups[-1].append(step)
+            else:
+                groups.append([step])
+        return groups
+
+    @staticmethod
+    def weights(steps):
+        """Peso de cada paso en el progreso global (duración x coste relativo)"""
+        return [(step['duration'] or 1) * step.get('weight', 1) for step in steps]
+
+    @staticmethod
+    def remove_temp_files(temp_files):
+        """Borra los temporales de un trabajo"""
+        for temp_file in temp_files:
+            if temp_file and os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+
+class StepProgress:
+    """
+    Progreso global (0-100) de una lista de pasos que puede crecer con los
+    reintentos de 'verify' sin retroceder nunca.
+
+    Cada paso con 'verify' reserva de entrada el peso de un reintento. Si
+    llega un paso adicional, el porcentaje ya mostrado se conserva y lo que
+    falta se reparte entre los pasos pendientes (y sus reservas).
+    """
+
+    def __init__(self, steps):
+        self.weights = FFmpegSteps.weights(steps)
+        self._reserves = [weight if step.get('verify') else 0 for step, weight in zip(steps, self.weights)]
+        self._step_progress = {}  # índice -> porcentaje
+        self._first = 0  # primer paso que cuenta en el tramo actual
+        self._base = 0.0  # porcentaje ya consolidado antes de ese paso
+        self._current = 0.0
+
+    def update(self, index, percent):
+        """Anota el porcentaje de un paso y retorna el progreso global (entero, nunca menor)"""
+        self._step_progress[index] = percent
+        pending = sum(self.weights[self._first:]) + sum(self._reserves[self._first:])
+        done = sum(
+            self.weights[i] * value / 100 for i, value in self._step_progress.items() if i >= self._first
+        )
+        value = self._base + (100 - self._base) * done / pending if pending else 100
+        self._current = max(self._current, min(100.0, value))
+        return int(self._current)
+
+    def extend(self, step, after):
+        """Añade el paso que pidió 'verify' del paso after (ya terminados todos hasta él)"""
+        self._reserves[after] = 0
+        weight = FFmpegSteps.weights([step])[0]
+        self.weights.append(weight)
+        self._reserves.append(weight if step.get('verify') else 0)
+        self._base = self._current
+        self._first = after + 1
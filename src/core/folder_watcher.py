@@ -0,0 +1,249 @@
+"""Módulo para vigilar carpetas y detectar videos nuevos"""
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import threading
+import time
+
+class FolderWatcher:
+    """
+    Vigila una carpeta (recursivamente) y avisa cuando aparece un video nuevo
+    que ya terminó de copiarse (su tamaño y fecha no cambian durante
+    settle_time segundos).
+
+    En Linux usa inotify (vía ctypes, sin dependencias extra); en otras
+    plataformas o si inotify falla, sondea solo las carpetas cuya fecha de
+    modificación cambió, sin recorrer todo el árbol en cada ciclo.
+    """
+
+    VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv', '.webm', '.m4v', '.mts', '.m2ts')
+
+    # Constantes de inotify (linux/inotify.h)
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, watch_dir, on_file_ready, extensions=None, settle_time=5.0,
+                 poll_interval=1.0, process_existing=True, use_inotify=True):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.on_file_ready = on_file_ready
+        self.extensions = tuple(ext.lower() for ext in (extensions or FolderWatcher.VIDEO_EXTENSIONS))
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.process_existing = process_existing
+
+        self.is_running = False
+        self.backend = None
+        self._candidates = {}  # ruta -> (size, mtime, instante del último cambio)
+        self._reported = {}  # ruta -> (size, mtime) ya notificado
+        self._dir_mtimes = {}  # carpeta -> mtime (sondeo)
+        self._known_dirs = set()
+        self._inotify_fd = None
+        self._watches = {}  # wd -> carpeta
+        self._libc = None
+
+        if use_inotify and platform.system() == 'Linux':
+            self._init_inotify()
+        if self._inotify_fd is None:
+            self.backend = 'polling'
+
+    def run(self):
+        """Bucle principal (bloqueante) hasta stop()"""
+        self.is_running = True
+
+        # Registrar el árbol inicial
+        for dir_path in self._walk_dirs(self.watch_dir):
+            self._add_directory(dir_path, scan=self.process_existing)
+
+        try:
+            while self.is_running:
+                if self.backend == 'inotify':
+                    self._read_inotify_events()
+                else:
+                    time.sleep(self.poll_interval)
+                    self._poll_directories()
+
+                self._check_candidates()
+        finally:
+            self._close_inotify()
+
+    def start(self):
+        """Ejecuta run() en un hilo en segundo plano"""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.is_running = False
+
+    def _init_inotify(self):
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = self._libc.inotify_init1(FolderWatcher.IN_NONBLOCK | FolderWatcher.IN_CLOEXEC)
+            if fd < 0:
+                return
+            self._inotify_fd = fd
+            self.backend = 'inotify'
+        except (OSError, AttributeError) as e:
+            print(f"inotify no disponible, usando sondeo: {e}")
+
+    def _close_inotify(self):
+        if self._inotify_fd is not None:
+            try:
+                os.close(self._inotify_fd)
+            except OSError:
+                pass
+            self._inotify_fd = None
+
+    def _add_directory(self, dir_path, scan=True):
+        """Empieza a vigilar una carpeta y (opcionalmente) registra sus videos"""
+        if dir_path in self._known_dirs:
+            return
+        self._known_dirs.add(dir_path)
+
+        if self.backend == 'inotify':
+            wd = self._libc.inotify_add_watch(
+                self._inotify_fd, os.fsencode(dir_path), FolderWatcher.WATCH_MASK
+            )
+            if wd < 0:
+                err = ctypes.get_errno()
+                print(f"No se pudo vigilar {dir_path}: {os.strerror(err)}")
+            else:
+                self._watches[wd] = dir_path
+        else:
+            try:
+                self._dir_mtimes[dir_path] = os.stat(dir_path).st_mtime
+            except OSError:
+                return
+
+        if scan:
+            self._scan_directory(dir_path)
+
+    def _scan_directory(self, dir_path):
+        """Registra los videos de una sola carpeta (no recursivo)"""
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        self._touch(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        if entry.path not in self._known_dirs:
+                            # Carpeta nueva (p. ej. copiada de golpe): vigilar y escanear
+                            for sub_dir in self._walk_dirs(entry.path):
+                                self._add_directory(sub_dir)
+        except OSError:
+            pass
+
+    def _read_inotify_events(self):
+        """Procesa los eventos de inotify disponibles (espera hasta poll_interval)"""
+        readable, _, _ = select.select([self._inotify_fd], [], [], self.poll_interval)
+        if not readable:
+            return
+
+        try:
+            data = os.read(self._inotify_fd, 256 * 1024)
+        except BlockingIOError:
+            return
+
+        header_size = FolderWatcher.EVENT_HEADER.size
+        offset = 0
+        while offset + header_size <= len(data):
+            wd, mask, _cookie, length = FolderWatcher.EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + header_size:offset + header_size + length].rstrip(b'\0')
+            offset += header_size + length
+
+            if mask & FolderWatcher.IN_Q_OVERFLOW:
+                # Se perdieron eventos: re-escanear solo las carpetas vigiladas
+                for dir_path in list(self._watches.values()):
+                    self._scan_directory(dir_path)
+                continue
+
+            if mask & FolderWatcher.IN_IGNORED:
+                self._known_dirs.discard(self._watches.pop(wd, None))
+                continue
+
+            dir_path = self._watches.get(wd)
+            if not dir_path or not name:
+                continue
+
+            path = os.path.join(dir_path, os.fsdecode(name))
+            if mask & FolderWatcher.IN_ISDIR:
+                if mask & (FolderWatcher.IN_CREATE | FolderWatcher.IN_MOVED_TO):
+                    for sub_dir in self._walk_dirs(path):
+                        self._add_directory(sub_dir)
+            else:
+                self._touch(path)
+
+    def _poll_directories(self):
+        """Re-escanea solo las carpetas cuyo mtime cambió"""
+        for dir_path, old_mtime in list(self._dir_mtimes.items()):
+            try:
+                mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                del self._dir_mtimes[dir_path]
+                self._known_dirs.discard(dir_path)
+                continue
+
+            if mtime != old_mtime:
+                self._dir_mtimes[dir_path] = mtime
+                self._scan_directory(dir_path)
+
+    def _touch(self, path):
+        """Marca un archivo como candidato (o actualiza su estado)"""
+        if not path.lower().endswith(self.extensions):
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._candidates.pop(path, None)
+            return
+
+        signature = (stat.st_size, stat.st_mtime)
+        if self._reported.get(path) == signature:
+            return
+
+        previous = self._candidates.get(path)
+        if previous is None or previous[:2] != signature:
+            self._candidates[path] = (stat.st_size, stat.st_mtime, time.monotonic())
+
+    def _check_candidates(self):
+        """Notifica los candidatos que dejaron de crecer"""
+        now = time.monotonic()
+        for path, (size, mtime, changed_at) in list(self._candidates.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._candidates[path]
+                continue
+
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self._candidates[path] = (stat.st_size, stat.st_mtime, now)
+                continue
+
+            if size > 0 and now - changed_at >= self.settle_time:
+                del self._candidates[path]
+                self._reported[path] = (size, mtime)
+                try:
+                    self.on_file_ready(path)
+                except Exception as e:
+                    print(f"Error procesando {path}: {e}")
+
+    @staticmethod
+    def _walk_dirs(root):
+        """Lista root y todas sus subcarpetas"""
+        dirs = [root]
+        for dir_path, sub_dirs, _ in os.walk(root):
+            dirs.extend(os.path.join(dir_path, d) for d in sub_dirs)
+        return dirs
@@ -0,0 +1,191 @@
+"""Historial de conversiones terminadas (velocidad y bitrate medidos)"""
+import os
+import sqlite3
+import threading
+import time
+
+from core.stream_planner import StreamPlanner
+from utils.ffmpeg_wrapper import FFmpegWrapper
+
+
+class JobHistory:
+    """
+    Registro persistente de cada conversión terminada con éxito: velocidad
+    medida (segundos de video por segundo real) y bitrate del video de salida,
+    junto con lo que los determina (codificador, preset, CRF, resolución,
+    fps y codec de origen). ConversionEstimator ajusta sus modelos con
+    estos datos en lugar de usar tablas fijas.
+
+    Solo se guarda la velocidad de los trabajos que corrieron solos: con
+    varios a la vez el tiempo depende de la carga y no del archivo.
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.videotool', 'history.db')
+    # Conversiones que se conservan por codificador (el hardware cambia)
+    MAX_ROWS_PER_ENCODER = 500
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Historial compartido por toda la aplicación"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or JobHistory.DEFAULT_PATH
+        # Aumenta con cada registro; invalida los modelos ya ajustados
+        self.revision = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self._open_db()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Historial de conversiones no disponible: {e}")
+            self._conn = None
+
+    def _open_db(self):
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS conversions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    encoder TEXT NOT NULL,
+                    preset TEXT NOT NULL,
+                    crf REAL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    fps REAL NOT NULL,
+                    source_codec TEXT,
+                    duration REAL NOT NULL,
+                    speed REAL,
+                    video_bitrate INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_conversions_encoder ON conversions(encoder, preset)')
+
+    def record(self, media_info, output_file, encoder, preset, crf, elapsed=None, stream_copy=False):
+        """
+        Guarda una conversión terminada. elapsed es el tiempo real en segundos
+        (None si corrió a la vez que otros trabajos: solo se guarda el bitrate).
+        Con stream_copy no se guarda nada si el video se copió sin recodificar.
+        El bitrate guardado es el del video: al total del archivo se le resta
+        el audio (192k si se recodificó, el del original si se copió).
+        Retorna True si se guardó (los errores de la base de datos no se propagan).
+        """
+        if self._conn is None or media_info is None:
+            return False
+        if not (media_info.duration and media_info.width and media_info.height and media_info.fps):
+            return False
+        if not os.path.exists(output_file):
+            return False
+
+        decisions = None
+        if stream_copy:
+            decisions = FFmpegWrapper.plan_streams(media_info.path, output_file, encoder, media_info, crf)
+            if decisions and not StreamPlanner.needs_video_encoder(decisions):
+                return False
+
+        audio_bitrate = JobHistory._audio_bitrate(media_info, decisions)
+        if audio_bitrate is None:
+            return False
+
+        duration = media_info.duration
+        speed = duration / elapsed if elapsed and elapsed > 0 else None
+        video_bitrate = int(os.path.getsize(output_file) * 8 / duration) - audio_bitrate
+        if video_bitrate <= 0:
+            return False
+
+        try:
+            self._insert(encoder, preset, crf, media_info, duration, speed, video_bitrate)
+        except sqlite3.Error as e:
+            # El historial nunca debe hacer fallar una conversión terminada
+            print(f"No se pudo guardar la conversión en el historial: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def _audio_bitrate(media_info, decisions):
+        """
+        Bits/s de audio en la salida, o None si no se puede saber (una pista
+        copiada sin bitrate conocido). Sin plan, el comando recodifica la
+        pista de audio que FFmpeg elige por defecto.
+        """
+        if decisions is None:
+            return FFmpegWrapper.AUDIO_BITRATE if media_info.has_audio else 0
+
+        streams = {
+            stream.get('index'): stream for stream in (media_info.probe_data or {}).get('streams', [])
+        }
+        total = 0
+        for decision in decisions:
+            if decision['type'] != 'audio' or decision['action'] == 'drop':
+                continue
+            if decision['action'] == 'transcode':
+                total += FFmpegWrapper.AUDIO_BITRATE
+                continue
+            copied = StreamPlanner.stream_bitrate(streams.get(decision['index'], {}))
+            if not copied:
+                return None
+            total += copied
+        return total
+
+    def _insert(self, encoder, preset, crf, media_info, duration, speed, video_bitrate):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO conversions (encoder, preset, crf, width, height, fps, source_codec, '
+                'duration, speed, video_bitrate, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (encoder, preset, crf, media_info.width, media_info.height, media_info.fps,
+                 media_info.video_codec, duration, speed, video_bitrate, time.time())
+            )
+            # Desalojo: solo las más recientes de cada codificador
+            self._conn.execute(
+                'DELETE FROM conversions WHERE encoder = ? AND id NOT IN '
+                '(SELECT id FROM conversions WHERE encoder = ? ORDER BY id DESC LIMIT ?)',
+                (encoder, encoder, JobHistory.MAX_ROWS_PER_ENCODER)
+            )
+            self.revision += 1
+
+    def samples(self, encoder, preset=None):
+        """Conversiones registradas de un codificador (y preset), de la más reciente a la más antigua"""
+        if self._conn is None:
+            return []
+        query = 'SELECT * FROM conversions WHERE encoder = ?'
+        params = [encoder]
+        if preset is not None:
+            query += ' AND preset = ?'
+            params.append(preset)
+        query += ' ORDER BY id DESC'
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self):
+        """Total de conversiones registradas"""
+        if self._conn is None:
+            return 0
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM conversions').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            if self._conn:
+                with self._conn:
+                    self._conn.execute('DELETE FROM conversions')
+                self.revision += 1
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,436 @@
+"""Gestor asíncrono de trabajos FFmpeg (sin PyQt)"""
+import asyncio
+import collections
+import itertools
+import os
+import time
+
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.audio_extractor import AudioExtractor
+from core.compressor import VideoCompressor
+from core.crf_optimizer import CRFOptimizer
+from core.ffmpeg_steps import FFmpegSteps, StepProgress
+from core.job_history import JobHistory
+from core.media_probe import MediaProbe
+from core.process_supervisor import ProcessSupervisor, SupervisedProcess
+from core.resolution_changer import ResolutionChanger
+from core.stream_planner import StreamPlanner
+from core.video_joiner import VideoJoiner
+
+
+class JobError(Exception):
+    """Parámetros de trabajo inválidos"""
+
+
+class AsyncJobManager:
+    """
+    Cola de trabajos con la semántica de QueueProcessorThread (FIFO, hasta
+    max_jobs simultáneos, salidas únicas, cancelación que mata el proceso)
+    pero supervisada desde un único event loop de asyncio mediante
+    ProcessSupervisor.run: vigilar decenas de FFmpeg no cuesta un hilo por
+    trabajo.
+
+    Debe usarse desde el hilo del event loop. Las llamadas bloqueantes de
+    core/ (ffprobe) se ejecutan en el executor por defecto.
+
+    Estados: pending, processing, completed, failed, cancelled
+    """
+
+    OPERATIONS = ('convert', 'compress', 'resolution', 'extract_audio', 'join')
+    FINAL_STATES = ('completed', 'failed', 'cancelled')
+    # Eventos sin leer por suscriptor antes de desconectarlo
+    SUBSCRIBER_QUEUE_SIZE = 1000
+
+    def __init__(self, max_jobs=2):
+        self.max_jobs = max(1, int(max_jobs or 1))
+        self.jobs = collections.OrderedDict()  # id -> trabajo
+        self._ids = itertools.count(1)
+        self._pending = collections.deque()
+        self._tasks = {}  # id -> asyncio.Task
+        self._processes = {}  # id -> set de SupervisedProcess en ejecución
+        self._optimizers = {}  # id -> CRFOptimizer en ejecución (corre en el executor)
+        self._overlapped = set()  # ids que corrieron a la vez que otro trabajo
+        self.supervisor = ProcessSupervisor()
+        self._reserved_outputs = set()
+        self._subscribers = set()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def submit(self, operation, params):
+        """Encola un trabajo y lo retorna. Lanza JobError si es inválido"""
+        if operation not in AsyncJobManager.OPERATIONS:
+            raise JobError(f"Operación desconocida: {operation}")
+
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise JobError("'params' debe ser un objeto")
+        params = dict(params)
+        if operation == 'join':
+            inputs = params.get('inputs') or []
+            if not isinstance(inputs, list) or not all(isinstance(f, str) for f in inputs):
+                raise JobError("'inputs' debe ser una lista de rutas")
+            if len(inputs) < 2:
+                raise JobError("Se necesitan al menos 2 videos para unir")
+            if not params.get('output'):
+                raise JobError("Falta 'output'")
+            missing = [f for f in inputs if not os.path.isfile(f)]
+        else:
+            if not params.get('input'):
+                raise JobError("Falta 'input'")
+            if not isinstance(params['input'], str):
+                raise JobError("'input' debe ser una ruta")
+            missing = [params['input']] if not os.path.isfile(params['input']) else []
+
+        if missing:
+            raise JobError(f"No existe: {', '.join(missing)}")
+
+        if operation == 'compress' and params.get('target_size_mb') is None and params.get('percentage') is None:
+            raise JobError("Indique 'target_size_mb' o 'percentage'")
+        if operation == 'resolution' and not params.get('width'):
+            raise JobError("Falta 'width'")
+
+        now = time.time()
+        job = {
+            'id': next(self._ids),
+            'operation': operation,
+            'params': params,
+            'status': 'pending',
+            'progress': 0,
+            'speed': None,
+            'eta': None,
+            'output': None,
+            'message': None,
+            # Lo lee el executor: sigue activo aunque la corrutina ya haya terminado
+            'cancel_requested': False,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.jobs[job['id']] = job
+        self._pending.append(job['id'])
+        self._publish(job, 'queued')
+        self._schedule()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self, statuses=None):
+        return [job for job in self.jobs.values() if not statuses or job['status'] in statuses]
+
+    def cancel(self, job_id):
+        """Cancela un trabajo pendiente o en ejecución. Retorna False si ya terminó"""
+        job = self.jobs.get(job_id)
+        if not job or job['status'] in AsyncJobManager.FINAL_STATES:
+            return False
+
+        if job_id in self._pending:
+            self._pending.remove(job_id)
+            self._set_status(job, 'cancelled', "Cancelado")
+            return True
+
+        if job['status'] == 'pending':
+            # Ya programado pero la corrutina no arrancó: cancelarla no ejecuta su finally
+            self._tasks.pop(job_id).cancel()
+            self._overlapped.discard(job_id)
+            self._set_status(job, 'cancelled', "Cancelado")
+            self._schedule()
+            return True
+
+        job['cancel_requested'] = True
+        optimizer = self._optimizers.get(job_id)
+        if optimizer:
+            optimizer.cancel()
+        for process in list(self._processes.get(job_id, ())):
+            process.kill()
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+        return True
+
+    def subscribe(self):
+        """
+        Retorna una cola que recibe todos los eventos de trabajos. Si el
+        suscriptor se atrasa SUBSCRIBER_QUEUE_SIZE eventos se le desconecta:
+        la cola se vacía y recibe None.
+        """
+        queue = asyncio.Queue(maxsize=AsyncJobManager.SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    async def shutdown(self):
+        """Cancela todo lo pendiente y en ejecución"""
+        for job_id in list(self._pending) + list(self._tasks):
+            self.cancel(job_id)
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+    def _schedule(self):
+        """Arranca trabajos pendientes hasta llenar max_jobs"""
+        while self._pending and len(self._tasks) < self.max_jobs:
+            job_id = self._pending.popleft()
+            self._tasks[job_id] = asyncio.get_running_loop().create_task(self._run_job(self.jobs[job_id]))
+            if len(self._tasks) > 1:
+                self._overlapped.update(self._tasks)
+
+    async def _run_job(self, job):
+        temp_files = []
+        try:
+            job['output'] = self._build_output_path(job)
+            self._set_status(job, 'processing')
+
+            loop = asyncio.get_running_loop()
+            steps, temp_files = await loop.run_in_executor(None, self._prepare, job)
+            if not steps:
+                self._set_status(job, 'failed', "No se pudo construir el comando FFmpeg")
+                return
+
+            # Varios pasos (p. ej. adaptar clips y unir): progreso ponderado por duración
+            steps = list(steps)
+            progress = StepProgress(steps)
+
+            def on_event(index, event):
+                self._on_progress(job, event, progress.update(index, event.percent))
+
+            success = True
+            position = 0
+            for group in FFmpegSteps.groups(steps):
+                indices = range(position, position + len(group))
+                position += len(group)
+                if len(group) == 1:
+                    started = time.monotonic()
+                    success = await self._run_process(job, group[0]['cmd'], group[0]['duration'], indices[0], on_event)
+                    if success and group[0].get('record'):
+                        # Si coincidió con otro trabajo el tiempo no refleja la velocidad real
+                        elapsed = None if job['id'] in self._overlapped else time.monotonic() - started
+                        await loop.run_in_executor(None, group[0]['record'], elapsed)
+                else:
+                    success = await self._run_parallel(job, list(zip(indices, group)), on_event)
+                if not success:
+                    break
+
+            # Comprobación posterior (p. ej. tamaño objetivo): puede pedir repetir el último paso
+            verify = steps[-1].get('verify') if success else None
+            while success and verify:
+                extra = await loop.run_in_executor(None, verify)
+                if not extra:
+                    break
+                progress.update(len(steps) - 1, 100)
+                steps.append(extra)
+                progress.extend(extra, len(steps) - 2)
+                success = await self._run_process(job, extra['cmd'], extra['duration'], len(steps) - 1, on_event)
+                verify = extra.get('verify')
+
+            if success:
+                job['progress'] = 100
+                self._set_status(job, 'completed', "Completado")
+            else:
+                self._set_status(job, 'failed', "Error en FFmpeg")
+
+        except asyncio.CancelledError:
+            self._set_status(job, 'cancelled', "Cancelado")
+        except JobError as e:
+            self._set_status(job, 'failed', str(e))
+        except Exception as e:
+            self._set_status(job, 'failed', f"Error: {str(e)}")
+        finally:
+            self._processes.pop(job['id'], None)
+            self._overlapped.discard(job['id'])
+            FFmpegSteps.remove_temp_files(temp_files)
+            self._reserved_outputs.discard(job['output'])
+            self._tasks.pop(job['id'], None)
+            self._schedule()
+
+    async def _run_process(self, job, cmd, duration, index, on_event):
+        """Lanza FFmpeg y sigue su progreso sin bloquear el loop"""
+        process = SupervisedProcess(cmd, duration, on_event=lambda event: on_event(index, event))
+        processes = self._processes.setdefault(job['id'], set())
+        processes.add(process)
+        try:
+            returncode = await self.supervisor.run(process)
+        finally:
+            processes.discard(process)
+        if process.error:
+            raise OSError(process.error)
+        return returncode == 0
+
+    async def _run_parallel(self, job, indexed_steps, on_event):
+        """Pasos independientes a la vez (como mucho un proceso por núcleo)"""
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        failed = False
+
+        async def run(index, step):
+            nonlocal failed
+            async with semaphore:
+                if failed:
+                    return False
+                success = await self._run_process(job, step['cmd'], step['duration'], index, on_event)
+            if not success and not failed:
+                # Un paso que falla invalida el resto: no seguir gastando CPU
+                failed = True
+                for process in list(self._processes.get(job['id'], ())):
+                    process.kill()
+            return success
+
+        results = await asyncio.gather(*(run(index, step) for index, step in indexed_steps), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return all(results)
+
+    def _on_progress(self, job, event, percent=None):
+        percent = event.percent if percent is None else percent
+        if percent == job['progress'] and not event.finished:
+            return
+        job['progress'] = percent
+        job['speed'] = event.speed
+        job['eta'] = round(event.eta, 1) if event.eta is not None else None
+        job['updated_at'] = time.time()
+        self._publish(job, 'progress')
+
+    def _prepare(self, job):
+        """
+        Construye (pasos, temporales) en el formato de FFmpegSteps.
+        Corre en el executor
+        """
+        params = job['params']
+        output_file = job['output']
+        encoder = params.get('encoder', 'libx264')
+        preset = params.get('preset', 'medium')
+        crf = params.get('crf', 23)
+        operation = job['operation']
+
+        if operation == 'join':
+            # Misma comprobación que la GUI y la CLI salvo con 'force' o 'normalize'
+            inputs = params['inputs']
+            if params.get('force'):
+                media_infos = MediaProbe.probe_many(inputs)
+            elif params.get('normalize'):
+                media_infos = MediaProbe.probe_many(inputs, fields=VideoJoiner.SIGNATURE_PROBE_FIELDS)
+            else:
+                compatible, message, media_infos = VideoJoiner.probe_and_check(inputs)
+                if not compatible:
+                    raise JobError(f"Videos incompatibles: {message}")
+            steps, temp_files, _ = VideoJoiner.prepare_join(
+                inputs, output_file, media_infos, encoder, preset, crf,
+                params.get('stream_copy', False), params.get('normalize', False)
+            )
+            return steps, temp_files
+
+        input_file = params['input']
+        # Un único sondeo por trabajo: duración y bitrate salen del mismo MediaInfo
+        media_info = MediaProbe.probe(input_file)
+        if operation == 'convert':
+            if params.get('auto_crf') and self._needs_crf_search(input_file, output_file, encoder, crf,
+                                                                  media_info, params.get('stream_copy', False)):
+                crf = self._search_crf(job, input_file, encoder, preset, crf, media_info)
+            cmd = FFmpegWrapper.build_convert_command(
+                input_file, output_file, encoder, preset, crf, media_info, params.get('stream_copy', False)
+            )
+        elif operation == 'compress':
+            if params.get('target_size_mb') is not None:
+                return VideoCompressor.prepare_target_size(
+                    input_file, output_file, float(params['target_size_mb']), encoder, preset, media_info,
+                    params.get('two_pass', False)
+                )
+            else:
+                cmd = VideoCompressor.build_percentage_command(
+                    input_file, output_file, float(params['percentage']), encoder, preset, media_info
+                )
+        elif operation == 'resolution':
+            cmd = ResolutionChanger.build_command(
+                input_file, output_file, int(params['width']), int(params.get('height') or -2),
+                encoder, preset, crf, params.get('maintain_aspect', True)
+            )
+        else:
+            cmd = AudioExtractor.build_command(
+                input_file, output_file, params.get('format', 'mp3'), params.get('bitrate', '192k')
+            )
+
+        if cmd is None:
+            return None, []
+        duration = FFmpegWrapper.get_video_duration(input_file, media_info)
+        step = {'cmd': cmd, 'duration': duration, 'label': operation}
+        if operation == 'convert':
+            step['record'] = lambda elapsed: JobHistory.default().record(
+                media_info, output_file, encoder, preset, crf, elapsed, params.get('stream_copy', False)
+            )
+        return [step], []
+
+    def _needs_crf_search(self, input_file, output_file, encoder, crf, media_info, stream_copy):
+        """Si el plan copia el video tal cual no hay CRF que buscar"""
+        if not stream_copy:
+            return True
+        decisions = FFmpegWrapper.plan_streams(input_file, output_file, encoder, media_info, crf)
+        return decisions is None or StreamPlanner.needs_video_encoder(decisions)
+
+    def _search_crf(self, job, input_file, encoder, preset, crf, media_info):
+        """CRF del trabajo con CRFOptimizer, cancelable desde cancel(). Corre en el executor"""
+        params = job['params']
+        optimizer = CRFOptimizer(
+            input_file, encoder, preset, params.get('metric', 'ssim'), params.get('quality_target'),
+            media_info=media_info
+        )
+        self._optimizers[job['id']] = optimizer
+        try:
+            # cancel() pudo llegar antes de registrarlo
+            if job['cancel_requested']:
+                optimizer.cancel()
+            result = optimizer.optimize()
+        finally:
+            self._optimizers.pop(job['id'], None)
+        return result['crf'] if result else crf
+
+    def _build_output_path(self, job):
+        """Genera un nombre de salida único (reservado entre trabajos)"""
+        params = job['params']
+        if params.get('output'):
+            self._reserved_outputs.add(params['output'])
+            return params['output']
+
+        suffix, extension = {
+            'convert': ('converted', params.get('format', 'mp4')),
+            'compress': ('compressed', 'mp4'),
+            'resolution': ('resized', 'mp4'),
+            'extract_audio': ('audio', params.get('format', 'mp3')),
+        }[job['operation']]
+
+        input_file = params['input']
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        output_dir = params.get('output_dir') or os.path.dirname(os.path.abspath(input_file))
+
+        output_file = os.path.join(output_dir, f"{base_name}_{suffix}.{extension}")
+        counter = 1
+        while os.path.exists(output_file) or output_file in self._reserved_outputs:
+            output_file = os.path.join(output_dir, f"{base_name}_{suffix}_{counter}.{extension}")
+            counter += 1
+
+        self._reserved_outputs.add(output_file)
+        return output_file
+
+    # ------------------------------------------------------------------
+    # Eventos
+    # ------------------------------------------------------------------
+    def _set_status(self, job, status, message=None):
+        job['status'] = status
+        job['message'] = message
+        job['updated_at'] = time.time()
+        self._publish(job, status)
+
+    def _publish(self, job, event):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait({'event': event, 'job': dict(job)})
+            except asyncio.QueueFull:
+                # Un cliente lento no debe acumular memoria sin límite
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
@@ -0,0 +1,167 @@
+"""Módulo de persistencia de la cola de trabajos (SQLite)"""
+import sqlite3
+import json
+import os
+import threading
+import time
+
+class JobStore:
+    """
+    Almacén persistente de trabajos de conversión.
+
+    Usa SQLite en modo WAL para que cada cambio de estado quede en disco
+    y una caída o reinicio no pierda la cola ni su progreso.
+    Estados: pending, processing, completed, failed, cancelled
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.videotool', 'jobs.db')
+    # Cola del modo watch de la CLI: recover() no debe tocar la de la GUI ni al revés
+    WATCH_PATH = os.path.join(os.path.expanduser('~'), '.videotool', 'watch.db')
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or JobStore.DEFAULT_PATH
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Compartida entre los workers de la cola; el lock serializa el acceso
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    input_path TEXT NOT NULL,
+                    output_path TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    settings TEXT,
+                    error_message TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_input ON jobs(input_path)')
+
+    def add_job(self, input_path, settings=None):
+        """Agrega un trabajo pendiente y retorna su id"""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (input_path, settings, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                (input_path, json.dumps(settings) if settings else None, now, now)
+            )
+            return cursor.lastrowid
+
+    def get_job(self, job_id):
+        """Obtiene un trabajo como diccionario (o None)"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return JobStore._row_to_dict(row) if row else None
+
+    def find_job(self, input_path):
+        """Obtiene el trabajo más reciente de un archivo de entrada (o None)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM jobs WHERE input_path = ? ORDER BY id DESC LIMIT 1', (input_path,)
+            ).fetchone()
+        return JobStore._row_to_dict(row) if row else None
+
+    def list_jobs(self, statuses=None):
+        """Lista trabajos en orden de creación, opcionalmente filtrados por estado"""
+        query = 'SELECT * FROM jobs'
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        query += ' ORDER BY id'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [JobStore._row_to_dict(row) for row in rows]
+
+    def recover(self):
+        """
+        Prepara la reanudación tras un cierre inesperado: los trabajos que
+        quedaron en 'processing' o 'cancelled' vuelven a 'pending' (conservando
+        su salida). Retorna la lista de trabajos por reanudar.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'pending', progress = 0, updated_at = ? "
+                "WHERE status IN ('processing', 'cancelled')",
+                (time.time(),)
+            )
+        return self.list_jobs(['pending'])
+
+    def set_settings(self, job_ids, settings):
+        """Registra la configuración con la que se procesarán los trabajos"""
+        data = json.dumps(settings)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE jobs SET settings = ?, updated_at = ? WHERE id = ?',
+                [(data, now, job_id) for job_id in job_ids]
+            )
+
+    def requeue_completed(self, job_ids):
+        """
+        Vuelve a 'pending' los trabajos ya completados al relanzar la cola
+        (con otra configuración). Se olvida su salida para no sobrescribirla.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'pending', progress = 0, output_path = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'completed'",
+                [(now, job_id) for job_id in job_ids]
+            )
+
+    def mark_processing(self, job_id, output_path):
+        self._update(job_id, status='processing', output_path=output_path, progress=0, error_message=None)
+
+    def mark_completed(self, job_id):
+        self._update(job_id, status='completed', progress=100)
+
+    def mark_failed(self, job_id, message=None):
+        self._update(job_id, status='failed', error_message=message)
+
+    def mark_cancelled(self, job_id):
+        self._update(job_id, status='cancelled', progress=0)
+
+    def update_progress(self, job_id, progress):
+        self._update(job_id, progress=progress)
+
+    def remove_job(self, job_id):
+        """Elimina un trabajo del almacén"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def remove_jobs(self, job_ids):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in job_ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?',
+                tuple(fields.values()) + (job_id,)
+            )
+
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job['settings'] = json.loads(job['settings']) if job['settings'] else None
+        return job
@@ -0,0 +1,125 @@
+"""Obtención de MediaInfo con el backend más rápido que pueda responder"""
+import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from constants import PROBE_WORKERS
+from core.probe_backends import ContainerHeaderBackend, FFprobeBackend, MediaInfoLibBackend
+
+
+class MediaProbe:
+    """
+    Punto de entrada único para leer los metadatos de un archivo.
+
+    Los backends se prueban del más barato al más caro (cabecera por mmap,
+    libmediainfo en proceso, ffprobe cacheado). Cada llamada indica qué
+    campos necesita y se usa el primer resultado que los tenga todos.
+    """
+
+    backends = [ContainerHeaderBackend(), MediaInfoLibBackend(), FFprobeBackend()]
+
+    DEFAULT_FIELDS = ('duration',)
+
+    @staticmethod
+    def register_backend(backend, position=None):
+        """Agrega un backend (por defecto antes del respaldo ffprobe)"""
+        if position is None:
+            position = len(MediaProbe.backends) - 1
+        MediaProbe.backends.insert(position, backend)
+
+    @staticmethod
+    def probe(file_path, timeout=10, fields=DEFAULT_FIELDS):
+        """
+        Retorna el MediaInfo del archivo o None si no se puede leer.
+        Si ningún backend tiene todos los campos pedidos se retorna el
+        resultado más completo disponible (p. ej. un audio sin 'width').
+        """
+        fallback = None
+        for backend in MediaProbe.backends:
+            if not backend.available() or not backend.provides(fields):
+                continue
+            try:
+                media_info = backend.probe(file_path, timeout)
+            except Exception as e:
+                print(f"Error en backend {backend.name} para {file_path}: {e}")
+                continue
+            if media_info is None:
+                continue
+            if media_info.has_fields(fields):
+                return media_info
+            fallback = fallback or media_info
+        return fallback
+
+    @staticmethod
+    def ensure(file_path, media_info, fields):
+        """Reutiliza media_info si ya tiene los campos; si no, sondea pidiéndolos"""
+        if media_info is not None and media_info.has_fields(fields):
+            return media_info
+        return MediaProbe.probe(file_path, fields=fields) or media_info
+
+    @staticmethod
+    def duration(file_path, media_info=None):
+        """Duración en segundos (0 si se desconoce), sin volver a sondear si ya hay MediaInfo"""
+        info = MediaProbe.ensure(file_path, media_info, ('duration',))
+        return info.duration if info else 0
+
+    @staticmethod
+    def iter_probe(file_paths, max_workers=PROBE_WORKERS, timeout=10, fields=DEFAULT_FIELDS):
+        """
+        Sondea varios archivos en paralelo (como mucho max_workers ffprobe a
+        la vez) y produce (índice, MediaInfo o None) en el orden de entrada.
+
+        Solo se adelantan unos pocos sondeos respecto al consumidor: si este
+        deja de iterar (p. ej. al encontrar una entrada incompatible), los
+        que aún no empezaron se cancelan.
+        """
+        file_paths = list(file_paths)
+        if not file_paths:
+            return
+
+        workers = max(1, min(max_workers, len(file_paths)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='probe')
+        remaining = iter(file_paths)
+        futures = collections.deque(
+            executor.submit(MediaProbe._safe_probe, path, timeout, fields)
+            for path in itertools.islice(remaining, workers * 2)
+        )
+        try:
+            index = 0
+            while futures:
+                media_info = futures.popleft().result()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    futures.append(executor.submit(MediaProbe._safe_probe, next_path, timeout, fields))
+                yield index, media_info
+                index += 1
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def probe_many(file_paths, max_workers=PROBE_WORKERS, timeout=10, stop_when=None, fields=DEFAULT_FIELDS):
+        """
+        Sondea una lista de archivos en paralelo. Retorna los MediaInfo (o
+        None) en el mismo orden. Si stop_when(índice, media_info) retorna
+        True se deja de sondear y la lista termina en ese elemento.
+        """
+        results = []
+        probes = MediaProbe.iter_probe(file_paths, max_workers, timeout, fields)
+        try:
+            for index, media_info in probes:
+                results.append(media_info)
+                if stop_when and stop_when(index, media_info):
+                    break
+        finally:
+            probes.close()
+        return results
+
+    @staticmethod
+    def _safe_probe(file_path, timeout, fields):
+        try:
+            return MediaProbe.probe(file_path, timeout, fields)
+        except Exception as e:
+            print(f"Error leyendo metadatos de {file_path}: {e}")
+            return None
@@ -1,11 +1,79 @@
 """Módulo para convertir a múltiples formatos simultáneamente"""
 import subprocess
 import os
-from threading import Thread
+from utils.ffmpeg_wrapper import FFmpegWrapper
 
 class MultiFormatConverter:
     """Convierte un video a múltiples formatos al mismo tiempo"""
     
+    @staticmethod
+    def build_commands(input_file, output_configs, base_output_name=None):
+        """
+        Construye un comando FFmpeg por formato
+        Retorna lista de diccionarios {'config', 'output_file', 'cmd'}
+        """
+        commands = []
+        
+        for output in MultiFormatConverter._resolve_outputs(input_file, output_configs, base_output_name):
+            cmd = ['ffmpeg']
+            
+            # Agregar aceleración si es NVENC (opción de entrada: va antes de -i)
+            if 'nvenc' in output['config'].get('encoder', 'libx264'):
+                cmd.extend(['-hwaccel', 'cuda'])
+            
+            cmd.extend(['-i', input_file, '-progress', 'pipe:2', '-y'])
+            cmd.extend(MultiFormatConverter._output_args(output['config'], output['output_file']))
+            
+            commands.append(dict(output, cmd=cmd))
+        
+        return commands
+    
+    @staticmethod
+    def build_single_command(input_file, output_configs, base_output_name=None):
+        """
+        Construye un único comando FFmpeg que decodifica la entrada una sola
+        vez y la reparte a todos los codificadores/contenedores (una salida
+        por formato). Retorna {'cmd', 'outputs': [{'config', 'output_file'}]}
+        """
+        outputs = MultiFormatConverter._resolve_outputs(input_file, output_configs, base_output_name)
+        
+        cmd = ['ffmpeg']
+        
+        # La decodificación es compartida: CUDA si algún formato usa NVENC
+        if any('nvenc' in output['config'].get('encoder', 'libx264') for output in outputs):
+            cmd.extend(['-hwaccel', 'cuda'])
+        
+        cmd.extend(['-i', input_file, '-progress', 'pipe:2', '-y'])
+        for output in outputs:
+            cmd.extend(MultiFormatConverter._output_args(output['config'], output['output_file']))
+        
+        return {'cmd': cmd, 'outputs': outputs}
+    
+    @staticmethod
+    def _resolve_outputs(input_file, output_configs, base_output_name=None):
+        if base_output_name is None:
+            base_output_name = os.path.splitext(input_file)[0]
+        
+        return [
+            {'config': config, 'output_file': f"{base_output_name}.{config['format']}"}
+            for config in output_configs
+        ]
+    
+    @staticmethod
+    def _output_args(config, output_file):
+        """Opciones de codificación de una salida, seguidas de su archivo"""
+        args = FFmpegWrapper.build_video_args(
+            config.get('encoder', 'libx264'),
+            config.get('preset', 'medium'),
+            config.get('crf', 23)
+        )
+        args.extend([
+            '-c:a', FFmpegWrapper.get_audio_codec(output_file),
+            '-b:a', '192k',
+            output_file
+        ])
+        return args
+    
     @staticmethod
     def convert_to_formats(input_file, output_configs, base_output_name=None):
         """
@@ -16,38 +84,11 @@ class MultiFormatConverter:
             {'format': 'webm', 'encoder': 'libvpx-vp9', 'crf': 30, 'preset': 'medium'}
         ]
         """
-        if base_output_name is None:
-            base_output_name = os.path.splitext(input_file)[0]
-        
         processes = []
         
-        for config in output_configs:
-            output_file = f"{base_output_name}.{config['format']}"
-            
-            cmd = [
-                'ffmpeg',
-                '-i', input_file
-            ]
-            
-            encoder = config.get('encoder', 'libx264')
-            
-            # Agregar aceleración si es NVENC
-            if 'nvenc' in encoder:
-                cmd.extend(['-hwaccel', 'cuda'])
-            
-            cmd.extend([
-                '-c:v', encoder,
-                '-preset', config.get('preset', 'medium'),
-                '-crf', str(config.get('crf', 23)),
-                '-c:a', 'aac',
-                '-b:a', '192k',
-                '-progress', 'pipe:2',
-                output_file,
-                '-y'
-            ])
-            
+        for command in MultiFormatConverter.build_commands(input_file, output_configs, base_output_name):
             process = subprocess.Popen(
-                cmd,
+                command['cmd'],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
@@ -57,8 +98,8 @@ class MultiFormatConverter:
             
             processes.append({
                 'process': process,
-                'config': config,
-                'output_file': output_file
+                'config': command['config'],
+                'output_file': command['output_file']
             })
         
         return processes
@@ -3,11 +3,21 @@ import subprocess
 import os
 import signal
 import platform
+from core.segment_encoder import SegmentEncoder
 
 class PausableConverter:
-    """Conversor de video con capacidad de pausar/reanudar"""
+    """
+    Conversor de video con capacidad de pausar/reanudar.
     
-    def __init__(self, input_file, output_file, encoder='libx264', preset='medium', crf=23):
+    En modo normal la pausa congela el proceso (SIGSTOP / suspend).
+    En modo reanudable el video se codifica por segmentos con un checkpoint
+    en disco: pausar termina FFmpeg y libera todos los recursos, y la
+    conversión continúa desde el último segmento completado, incluso
+    después de reiniciar la aplicación.
+    """
+    
+    def __init__(self, input_file, output_file, encoder='libx264', preset='medium', crf=23,
+                 resumable=False, segment_time=30):
         self.input_file = input_file
         self.output_file = output_file
         self.encoder = encoder
@@ -16,6 +26,32 @@ class PausableConverter:
         self.process = None
         self.is_paused = False
         self.temp_output = None
+        self.resumable = resumable
+        self.segment_encoder = None
+        
+        if resumable:
+            self.segment_encoder = SegmentEncoder(
+                input_file, output_file, encoder, preset, crf,
+                workers=1,
+                segment_time=segment_time,
+                work_dir=PausableConverter.get_checkpoint_dir(output_file)
+            )
+    
+    @staticmethod
+    def get_checkpoint_dir(output_file):
+        """Carpeta donde se guardan los segmentos y el manifiesto"""
+        return f"{output_file}.parts"
+    
+    def has_checkpoint(self):
+        """Indica si hay una conversión reanudable a medias"""
+        return bool(self.segment_encoder and self.segment_encoder.has_checkpoint())
+    
+    def run_resumable(self, progress_callback=None, log_callback=None):
+        """
+        Codifica (o continúa) en modo reanudable hasta terminar, pausar o detener.
+        Retorna (success, message).
+        """
+        return self.segment_encoder.encode(progress_callback, log_callback)
     
     def start(self):
         """Inicia la conversión"""
@@ -38,19 +74,25 @@ class PausableConverter:
             '-y'
         ])
         
+        # stderr en binario: lo interpreta ProgressParser
         self.process = subprocess.Popen(
             cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
         )
         
         return self.process
     
     def pause(self):
         """Pausa la conversión"""
+        if self.resumable:
+            if self.is_paused:
+                return False
+            # Pausa real: terminar FFmpeg; el checkpoint conserva lo hecho
+            self.is_paused = True
+            self.segment_encoder.cancel()
+            return True
+        
         if self.process and not self.is_paused:
             if platform.system() == 'Windows':
                 # En Windows usamos suspend
@@ -68,6 +110,13 @@ class PausableConverter:
     
     def resume(self):
         """Reanuda la conversión"""
+        if self.resumable:
+            # El llamador vuelve a ejecutar run_resumable()
+            if not self.is_paused:
+                return False
+            self.is_paused = False
+            return True
+        
         if self.process and self.is_paused:
             if platform.system() == 'Windows':
                 # En Windows usamos resume
@@ -84,6 +133,12 @@ class PausableConverter:
     
     def stop(self):
         """Detiene la conversión"""
+        if self.resumable:
+            # El checkpoint se conserva para poder reanudar más tarde
+            self.segment_encoder.cancel()
+            self.is_paused = False
+            return True
+        
         if self.process:
             self.process.kill()
             self.process = None
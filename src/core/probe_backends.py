@@ -0,0 +1,140 @@
+"""Backends intercambiables para leer metadatos de archivos multimedia"""
+from core.container_parser import ContainerParser
+from core.probe_cache import ProbeCache
+from models.media_info import MediaInfo
+
+try:
+    from pymediainfo import MediaInfo as LibMediaInfo
+except ImportError:
+    LibMediaInfo = None
+
+
+class ProbeBackend:
+    """
+    Interfaz de un backend de sondeo.
+
+    probe() retorna un MediaInfo (posiblemente incompleto) o None si no
+    puede leer el archivo. provides() indica si el backend es capaz de
+    responder a un conjunto de campos, para no intentarlo en vano.
+    """
+
+    name = 'base'
+    # Campos que este backend nunca rellena
+    unsupported_fields = ()
+
+    def available(self):
+        return True
+
+    def provides(self, fields):
+        return not any(field in self.unsupported_fields for field in fields)
+
+    def probe(self, file_path, timeout=10):
+        raise NotImplementedError
+
+
+class ContainerHeaderBackend(ProbeBackend):
+    """Lectura de cabeceras MP4/MOV y Matroska/WebM por mmap (sin procesos)"""
+
+    name = 'container'
+    unsupported_fields = ('probe_data', 'pix_fmt')
+
+    def probe(self, file_path, timeout=10):
+        values = ContainerParser.parse(file_path)
+        if values is None:
+            return None
+        return MediaInfo(file_path, source=self.name, **values)
+
+
+class MediaInfoLibBackend(ProbeBackend):
+    """libmediainfo en el mismo proceso a través de pymediainfo (opcional)"""
+
+    name = 'mediainfo'
+    unsupported_fields = ('probe_data', 'pix_fmt')
+
+    # Nombres de formato de MediaInfo -> nombres de codec de ffprobe
+    CODECS = {
+        'AVC': 'h264', 'HEVC': 'hevc', 'VP8': 'vp8', 'VP9': 'vp9', 'AV1': 'av1',
+        'MPEG-4 Visual': 'mpeg4', 'MPEG Video': 'mpeg2video', 'ProRes': 'prores', 'JPEG': 'mjpeg',
+        'AAC': 'aac', 'Opus': 'opus', 'Vorbis': 'vorbis', 'AC-3': 'ac3', 'E-AC-3': 'eac3',
+        'FLAC': 'flac', 'MPEG Audio': 'mp3', 'DTS': 'dts', 'PCM': 'pcm_s16le', 'ALAC': 'alac',
+        'UTF-8': 'subrip', 'ASS': 'ass', 'SSA': 'ass', 'Timed Text': 'mov_text', 'PGS': 'hdmv_pgs_subtitle',
+        'VobSub': 'dvd_subtitle', 'WebVTT': 'webvtt',
+    }
+
+    def __init__(self):
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            # pymediainfo instalado no implica que exista la biblioteca nativa
+            try:
+                self._available = LibMediaInfo is not None and LibMediaInfo.can_parse()
+            except Exception:
+                self._available = False
+        return self._available
+
+    def probe(self, file_path, timeout=10):
+        try:
+            parsed = LibMediaInfo.parse(file_path)
+        except Exception as e:
+            print(f"Error leyendo {file_path} con MediaInfo: {e}")
+            return None
+
+        general = video = audio = None
+        subtitles = []
+        for track in parsed.tracks:
+            if track.track_type == 'General' and general is None:
+                general = track
+            elif track.track_type == 'Video' and video is None:
+                video = track
+            elif track.track_type == 'Audio' and audio is None:
+                audio = track
+            elif track.track_type == 'Text':
+                subtitles.append((
+                    str(track.stream_identifier or len(subtitles)),
+                    self._codec(track.format),
+                    track.language or 'unknown'
+                ))
+        if general is None:
+            return None
+
+        values = {
+            'size': MediaInfo._to_int(general.file_size),
+            'duration': MediaInfo._to_float(general.duration) / 1000,
+            'format_name': general.format,
+            'bitrate': MediaInfo._to_int(general.overall_bit_rate),
+            'subtitle_streams': subtitles,
+        }
+        if video is not None:
+            values.update({
+                'video_codec': self._codec(video.format),
+                'width': MediaInfo._to_int(video.width) or None,
+                'height': MediaInfo._to_int(video.height) or None,
+                'fps': MediaInfo._to_float(video.frame_rate) or None,
+                'video_bitrate': MediaInfo._to_int(video.bit_rate),
+            })
+        if audio is not None:
+            values.update({
+                'audio_codec': self._codec(audio.format),
+                'audio_bitrate': MediaInfo._to_int(audio.bit_rate),
+                'sample_rate': MediaInfo._to_int(audio.sampling_rate) or None,
+                'channels': MediaInfo._to_int(audio.channel_s) or None,
+            })
+        return MediaInfo(file_path, source=self.name, **values)
+
+    def _codec(self, format_name):
+        if not format_name:
+            return None
+        return self.CODECS.get(format_name, format_name.lower())
+
+
+class FFprobeBackend(ProbeBackend):
+    """ffprobe (JSON completo, cacheado en disco). Respaldo que responde a todo"""
+
+    name = 'ffprobe'
+
+    def probe(self, file_path, timeout=10):
+        data = ProbeCache.default().probe(file_path, timeout=timeout)
+        if data is None:
+            return None
+        return MediaInfo.from_probe(file_path, data)
@@ -0,0 +1,216 @@
+"""Caché persistente de metadatos de ffprobe"""
+import collections
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+
+class ProbeCache:
+    """
+    Caché de la salida JSON completa de ffprobe (-show_format -show_streams).
+
+    Clave: (ruta, tamaño, mtime, versión de ffprobe). Dos niveles: un LRU en
+    memoria delante de una tabla SQLite en disco con desalojo LRU, así que
+    repetir un lote sobre una biblioteca sin cambios no lanza ningún ffprobe.
+    La "versión" es la identidad del ejecutable (ruta, tamaño, mtime) para
+    no tener que ejecutar `ffprobe -version` en cada arranque.
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.videotool', 'probe_cache.db')
+    MEMORY_ENTRIES = 512
+    DISK_ENTRIES = 20000
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Caché compartida por toda la aplicación"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self, db_path=None, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.db_path = db_path or ProbeCache.DEFAULT_PATH
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.probe_count = 0  # ffprobe lanzados (para diagnóstico)
+
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()
+        self._tool_version = None
+        self._conn = None
+        try:
+            self._open_db()
+        except (sqlite3.Error, OSError) as e:
+            # Sin disco (p. ej. home de solo lectura): solo memoria
+            print(f"Caché de metadatos solo en memoria: {e}")
+            self._conn = None
+
+    def _open_db(self):
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS probes (
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    tool_version TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (path, size, mtime_ns, tool_version)
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_probes_last_used ON probes(last_used)')
+
+    def probe(self, file_path, timeout=30):
+        """
+        Retorna el JSON de ffprobe (dict con 'format' y 'streams') o None si
+        el archivo no existe o ffprobe falla. Los fallos no se guardan.
+        """
+        key = self._make_key(file_path)
+        if key is None:
+            return None
+
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+        data = self._load(key)
+        if data is None:
+            data = self._run_ffprobe(key[0], timeout)
+            if data is None:
+                return None
+            self._store(key, data)
+
+        self._remember(key, data)
+        return data
+
+    def invalidate(self, file_path):
+        """Olvida todas las entradas de un archivo"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == path]:
+                del self._memory[key]
+            if self._conn:
+                with self._conn:
+                    self._conn.execute('DELETE FROM probes WHERE path = ?', (path,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                with self._conn:
+                    self._conn.execute('DELETE FROM probes')
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def first_stream(data, codec_type):
+        """Primer stream de un tipo ('video', 'audio', 'subtitle') o None"""
+        for stream in (data or {}).get('streams', []):
+            if stream.get('codec_type') == codec_type:
+                return stream
+        return None
+
+    def _make_key(self, file_path):
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_size, stat.st_mtime_ns, self._get_tool_version())
+
+    def _get_tool_version(self):
+        if self._tool_version is None:
+            tool = shutil.which('ffprobe')
+            if tool:
+                stat = os.stat(tool)
+                self._tool_version = f"{os.path.realpath(tool)}:{stat.st_size}:{stat.st_mtime_ns}"
+            else:
+                self._tool_version = 'ffprobe'
+        return self._tool_version
+
+    def _load(self, key):
+        with self._lock:
+            if not self._conn:
+                return None
+            row = self._conn.execute(
+                'SELECT data FROM probes WHERE path = ? AND size = ? AND mtime_ns = ? AND tool_version = ?',
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE probes SET last_used = ? WHERE path = ? AND size = ? AND mtime_ns = ? AND tool_version = ?',
+                    (time.time(),) + key
+                )
+        return json.loads(row[0])
+
+    def _store(self, key, data):
+        with self._lock:
+            if not self._conn:
+                return
+            with self._conn:
+                # Las versiones anteriores del mismo archivo ya no sirven
+                self._conn.execute('DELETE FROM probes WHERE path = ?', (key[0],))
+                self._conn.execute(
+                    'INSERT INTO probes (path, size, mtime_ns, tool_version, data, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    key + (json.dumps(data), time.time())
+                )
+                # Desalojo LRU
+                self._conn.execute(
+                    'DELETE FROM probes WHERE rowid IN ('
+                    'SELECT rowid FROM probes ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                    (self.disk_entries,)
+                )
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _run_ffprobe(self, path, timeout):
+        cmd = [
+            'ffprobe',
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            path
+        ]
+        with self._lock:
+            self.probe_count += 1
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error ejecutando ffprobe: {e}")
+            return None
+
+        if result.returncode != 0:
+            return None
+        try:
+            data = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return None
+        data.setdefault('format', {})
+        data.setdefault('streams', [])
+        return data
@@ -0,0 +1,211 @@
+"""Supervisor de procesos FFmpeg sobre un único event loop de asyncio"""
+import asyncio
+import threading
+
+from core.progress_parser import ProgressParser
+
+
+class SupervisedProcess:
+    """
+    Proceso FFmpeg vigilado por ProcessSupervisor.
+
+    Imita lo necesario de subprocess.Popen (pid, returncode, poll, wait,
+    kill) y puede usarse desde cualquier hilo.
+    """
+
+    def __init__(self, cmd, duration=0, on_progress=None, on_event=None, on_exit=None):
+        self.cmd = cmd
+        self.duration = duration
+        self.on_progress = on_progress
+        self.on_event = on_event
+        self.on_exit = on_exit
+
+        self.pid = None
+        self.returncode = None
+        self.progress = 0
+        self.last_event = None  # último ProgressEvent
+        self.error = None
+        self._process = None
+        self._loop = None
+        self._kill_requested = False
+        self._done = threading.Event()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        """Espera a que termine. Retorna el código de salida (None si vence timeout)"""
+        self._done.wait(timeout)
+        return self.returncode
+
+    def kill(self):
+        """Mata el proceso (o evita que arranque si aún no lo hizo)"""
+        self._kill_requested = True
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            self._kill_now()
+        else:
+            try:
+                loop.call_soon_threadsafe(self._kill_now)
+            except RuntimeError:
+                # El loop ya se cerró
+                pass
+
+    def _kill_now(self):
+        if self._process and self._process.returncode is None:
+            try:
+                self._process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class ProcessSupervisor:
+    """
+    Dueño de todos los procesos FFmpeg de la aplicación.
+
+    Un hilo en segundo plano ejecuta un event loop de asyncio (un selector
+    sobre todos los pipes) que lee el stderr de cada hijo en cuanto tiene
+    datos, lo interpreta con ProgressParser
+    y entrega el progreso por callbacks, así un proceso silencioso no retrasa a los demás y no hace
+    falta un hilo bloqueado por proceso. Los callbacks se invocan desde el
+    hilo del supervisor: deben ser rápidos (emitir una señal de Qt es
+    seguro entre hilos).
+
+    Desde código que ya corre en un event loop propio (p. ej. la API HTTP)
+    basta con `await supervisor.run(handle)`.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Supervisor compartido por toda la aplicación"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._handles = set()
+
+    def spawn(self, cmd, duration=0, on_progress=None, on_event=None, on_exit=None):
+        """
+        Lanza un comando bajo supervisión y retorna su SupervisedProcess.
+        on_progress(percent) se llama solo cuando el porcentaje cambia;
+        on_event(ProgressEvent) con cada bloque de -progress;
+        on_exit(returncode) al terminar.
+        """
+        handle = SupervisedProcess(cmd, duration, on_progress, on_event, on_exit)
+        loop = self._ensure_loop()
+        asyncio.run_coroutine_threadsafe(self.run(handle), loop)
+        return handle
+
+    def active_count(self):
+        with self._lock:
+            return len(self._handles)
+
+    def kill_all(self):
+        with self._lock:
+            handles = list(self._handles)
+        for handle in handles:
+            handle.kill()
+
+    async def run(self, handle):
+        """Ejecuta y vigila un proceso en el loop actual. Retorna su código de salida"""
+        handle._loop = asyncio.get_running_loop()
+        with self._lock:
+            self._handles.add(handle)
+
+        try:
+            if handle._kill_requested:
+                handle.returncode = -9
+                return handle.returncode
+
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *handle.cmd,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except OSError as e:
+                handle.error = str(e)
+                handle.returncode = -1
+                return handle.returncode
+
+            handle._process = process
+            handle.pid = process.pid
+            if handle._kill_requested:
+                handle._kill_now()
+
+            try:
+                await self._read_stderr(handle, process.stderr)
+                handle.returncode = await process.wait()
+            finally:
+                # Cancelación de la tarea: no dejar huérfanos
+                if process.returncode is None:
+                    handle._kill_now()
+                    handle.returncode = await process.wait()
+
+            return handle.returncode
+        finally:
+            with self._lock:
+                self._handles.discard(handle)
+            # Notificar antes de liberar wait() para conservar el orden de eventos
+            if handle.on_exit:
+                try:
+                    handle.on_exit(handle.returncode)
+                except Exception as e:
+                    print(f"Error en callback de salida: {e}")
+            handle._done.set()
+
+    async def _read_stderr(self, handle, stream):
+        parser = ProgressParser(handle.duration)
+        while True:
+            # Lee lo disponible (hasta READ_SIZE): un despertar por ráfaga, no por línea
+            chunk = await stream.read(ProgressParser.READ_SIZE)
+            if not chunk:
+                break
+            for event in parser.feed(chunk):
+                self._handle_event(handle, event)
+        for event in parser.flush():
+            self._handle_event(handle, event)
+
+    def _handle_event(self, handle, event):
+        handle.last_event = event
+        if handle.on_event:
+            handle.on_event(event)
+
+        if event.percent != handle.progress and handle.duration > 0:
+            handle.progress = event.percent
+            if handle.on_progress:
+                handle.on_progress(event.percent)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(ready,), name='ffmpeg-supervisor', daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def _run_loop(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        ready.set()
+        loop.run_forever()
@@ -0,0 +1,192 @@
+"""Intérprete del progreso estructurado de FFmpeg (-progress pipe:2)"""
+import re
+import time
+
+
+class ProgressEvent:
+    """Estado de una codificación en un instante"""
+
+    __slots__ = ('out_time', 'duration', 'percent', 'fps', 'speed', 'bitrate',
+                 'total_size', 'eta', 'finished')
+
+    def __init__(self, out_time=0.0, duration=0, percent=0, fps=None, speed=None, bitrate=None,
+                 total_size=None, eta=None, finished=False):
+        self.out_time = out_time  # segundos procesados
+        self.duration = duration
+        self.percent = percent
+        self.fps = fps
+        self.speed = speed  # múltiplo de tiempo real (1.0 = tiempo real)
+        self.bitrate = bitrate  # kbit/s
+        self.total_size = total_size  # bytes escritos
+        self.eta = eta  # segundos restantes estimados
+        self.finished = finished
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in ProgressEvent.__slots__}
+
+    def __repr__(self):
+        return f"ProgressEvent({self.percent}%, speed={self.speed}, eta={self.eta})"
+
+
+class ProgressParser:
+    """
+    Acumula los bloques key=value que FFmpeg escribe con -progress y emite
+    un ProgressEvent al cerrar cada bloque (progress=continue|end).
+
+    Trabaja sobre bytes y solo parte cada línea en el primer '=' (sin
+    expresiones regulares por línea). Las líneas de estadísticas clásicas
+    (frame=... time=...) se ignoran salvo que el proceso no use -progress,
+    en cuyo caso se usa su time= como respaldo.
+    """
+
+    LINE_SEPARATOR = re.compile(rb'[\r\n]')
+    # Tope de la línea incompleta retenida por proceso (las de progreso son cortas)
+    MAX_PENDING = 64 * 1024
+    READ_SIZE = 64 * 1024
+    LEGACY_TIME = re.compile(rb'time=(\d+):(\d+):(\d+\.\d+)')
+    LEGACY_SPEED = re.compile(rb'speed=\s*([\d.]+)x')
+
+    def __init__(self, duration=0):
+        self.duration = duration
+        self.structured = False
+        self.last_event = None
+        self._values = {}
+        self._buffer = b''
+        self._started_at = time.monotonic()
+
+    def feed(self, chunk):
+        """Procesa un bloque de bytes de stderr. Retorna los eventos completos"""
+        lines = ProgressParser.LINE_SEPARATOR.split(self._buffer + chunk)
+        self._buffer = lines.pop()
+        if len(self._buffer) > ProgressParser.MAX_PENDING:
+            # Salida sin saltos de línea (p. ej. volcado binario): descartarla
+            self._buffer = b''
+
+        events = []
+        for line in lines:
+            if line:
+                event = self.feed_line(line)
+                if event:
+                    events.append(event)
+        return events
+
+    def flush(self):
+        """Procesa lo que quede en el búfer al cerrarse el stream"""
+        line, self._buffer = self._buffer, b''
+        event = self.feed_line(line) if line else None
+        return [event] if event else []
+
+    def feed_line(self, line):
+        """Procesa una línea completa (bytes). Retorna un evento o None"""
+        key, sep, value = line.partition(b'=')
+        if not sep:
+            return None
+
+        if key == b'progress':
+            self.structured = True
+            return self._build_event(value.strip() == b'end')
+
+        if key in (b'frame', b'size') and b' time=' in value:
+            # Línea de estadísticas: solo útil si no hay -progress
+            if not self.structured:
+                return self._legacy_event(line)
+            return None
+
+        self._values[key] = value.strip()
+        return None
+
+    def _build_event(self, finished):
+        values = self._values
+        self._values = {}
+
+        out_time = ProgressParser._parse_out_time(values)
+        if out_time is None:
+            out_time = self.last_event.out_time if self.last_event else 0.0
+
+        event = ProgressEvent(
+            out_time=out_time,
+            duration=self.duration,
+            fps=ProgressParser._to_float(values.get(b'fps')),
+            speed=ProgressParser._to_float(values.get(b'speed', b'').rstrip(b'x')),
+            bitrate=ProgressParser._to_float(values.get(b'bitrate', b'').replace(b'kbits/s', b'')),
+            total_size=ProgressParser._to_int(values.get(b'total_size')),
+            finished=finished
+        )
+        return self._complete(event)
+
+    def _legacy_event(self, line):
+        time_match = ProgressParser.LEGACY_TIME.search(line)
+        if not time_match:
+            return None
+        hours = int(time_match.group(1))
+        minutes = int(time_match.group(2))
+        seconds = float(time_match.group(3))
+        speed_match = ProgressParser.LEGACY_SPEED.search(line)
+        event = ProgressEvent(
+            out_time=hours * 3600 + minutes * 60 + seconds,
+            duration=self.duration,
+            speed=ProgressParser._to_float(speed_match.group(1)) if speed_match else None
+        )
+        return self._complete(event)
+
+    def _complete(self, event):
+        """Calcula porcentaje y ETA"""
+        if self.duration > 0:
+            event.percent = 100 if event.finished else min(int(event.out_time / self.duration * 100), 100)
+
+            speed = event.speed
+            if not speed and event.out_time > 0:
+                # Sin speed= (p. ej. N/A): estimar con el reloj
+                elapsed = time.monotonic() - self._started_at
+                speed = event.out_time / elapsed if elapsed > 0 else None
+            if event.finished:
+                event.eta = 0
+            elif speed:
+                event.eta = max(self.duration - event.out_time, 0) / speed
+
+        self.last_event = event
+        return event
+
+    @staticmethod
+    def _parse_out_time(values):
+        # out_time_ms también está en microsegundos (particularidad de FFmpeg)
+        for key in (b'out_time_us', b'out_time_ms'):
+            micros = ProgressParser._to_int(values.get(key))
+            if micros is not None and micros >= 0:
+                return micros / 1_000_000
+        return None
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None  # N/A
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def pump(stream, parser, on_event, should_stop=None):
+        """
+        Lee un stream binario (stderr de un Popen sin text=True) hasta EOF y
+        entrega los eventos a on_event. Se detiene antes si should_stop()
+        retorna True. Retorna False si se detuvo por should_stop.
+        """
+        read = getattr(stream, 'read1', stream.read)
+        while True:
+            chunk = read(ProgressParser.READ_SIZE)
+            if not chunk:
+                break
+            for event in parser.feed(chunk):
+                on_event(event)
+            if should_stop and should_stop():
+                return False
+
+        for event in parser.flush():
+            on_event(event)
+        return True
@@ -0,0 +1,284 @@
+"""Planificación de la cola: orden, duración total y espacio en disco"""
+import heapq
+import os
+import shutil
+import tempfile
+import time
+
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.crf_optimizer import CRFOptimizer
+from core.estimator import ConversionEstimator
+from core.media_probe import MediaProbe
+from core.stream_planner import StreamPlanner
+
+
+class QueuePlanner:
+    """
+    Simula la cola antes de lanzarla con la misma configuración que
+    QueueProcessorThread: estima cada trabajo (ConversionEstimator, con el
+    historial si lo hay), elige el orden, reparte los trabajos entre los
+    workers y calcula cuándo terminaría el lote y cuánto disco ocupará en
+    cada dispositivo de destino frente al espacio libre.
+
+    Los trabajos simultáneos se reparten la máquina: cada uno avanza a su
+    velocidad en solitario multiplicada por el rendimiento de compartir
+    (ver PARALLEL_GAIN), que se recalcula cada vez que uno termina.
+    """
+
+    # Rendimiento extra de cada trabajo simultáneo adicional: con k trabajos
+    # la máquina rinde (1 + (k - 1) * gain) veces lo de uno solo
+    PARALLEL_GAIN = {'software': 0.25, 'hardware': 0.8}
+    HARDWARE_ENCODERS = ('nvenc', 'qsv', 'amf')
+
+    # Un cambio de contenedor va a velocidad de disco
+    REMUX_BYTES_PER_SECOND = 150 * 1024 * 1024
+
+    # Margen sobre el tamaño estimado al comparar con el espacio libre
+    SIZE_MARGIN = 1.15
+
+    @staticmethod
+    def plan(video_files, output_folder, encoder, preset, crf, output_format, workers=1,
+             stream_copy=False, auto_crf=False, history=None):
+        """
+        video_files: VideoFile de la cola (con su MediaInfo si ya se sondeó).
+        Retorna un dict con:
+        - 'order': índices de la cola en el orden en que se procesarán
+        - 'items': por trabajo, en ese orden: 'index', 'name', 'time', 'size',
+          'remux', 'known' (False sin metadatos), 'start', 'end'
+        - 'makespan': segundos hasta terminar el lote; 'finish_at': timestamp
+        - 'devices': por dispositivo 'path', 'output', 'scratch', 'required',
+          'free' (None si no se pudo leer) y 'fits'
+        - 'fits': True si todo cabe en disco
+        """
+        workers = max(1, int(workers or 1))
+        output_format = output_format.lower().lstrip('.')
+        media_infos = QueuePlanner._media_infos(video_files, stream_copy)
+        items = [
+            QueuePlanner._estimate_item(
+                index, video_file, media_info, output_folder, encoder, preset, crf, output_format,
+                stream_copy, auto_crf, history
+            )
+            for index, (video_file, media_info) in enumerate(zip(video_files, media_infos))
+        ]
+
+        # Varios workers: los trabajos largos primero (LPT) para que ninguno
+        # se quede solo al final. Con uno el orden no cambia la duración total
+        ordered = sorted(items, key=lambda item: -item['time']) if workers > 1 else list(items)
+
+        makespan, scratch_peak = QueuePlanner._simulate(ordered, workers, encoder)
+        devices = QueuePlanner._disk_usage(ordered, scratch_peak)
+
+        return {
+            'order': [item['index'] for item in ordered],
+            'items': ordered,
+            'makespan': makespan,
+            'finish_at': time.time() + makespan,
+            'workers': workers,
+            'devices': devices,
+            'fits': all(device['fits'] for device in devices),
+        }
+
+    @staticmethod
+    def describe(plan, limit=10):
+        """Resumen legible del plan (confirmación y log)"""
+        fmt_time, fmt_size = ConversionEstimator.format_time, ConversionEstimator.format_size
+        items = plan['items']
+        finish = time.strftime('%d/%m %H:%M', time.localtime(plan['finish_at']))
+        lines = [f"Duración estimada del lote: {fmt_time(plan['makespan'])} (terminaría el {finish})"]
+
+        unknown = sum(1 for item in items if not item['known'])
+        if unknown:
+            lines.append(f"⚠️ {unknown} archivo(s) sin metadatos no cuentan en la estimación")
+
+        for device in plan['devices']:
+            mark = "✅" if device['fits'] else "❌ NO CABE"
+            free = fmt_size(device['free']) if device['free'] is not None else "desconocido"
+            lines.append(f"{mark} {device['path']}: necesita {fmt_size(device['required'])}, libre {free}")
+
+        if plan['workers'] > 1 and len(items) > 1:
+            lines.append("Orden (los más largos primero):")
+        elif len(items) > 1:
+            lines.append("Orden:")
+        for position, item in enumerate(items[:limit], 1):
+            kind = " (sin recodificar)" if item['remux'] else ""
+            lines.append(f"  {position}. {item['name']}: {fmt_time(item['time'])}, "
+                         f"{fmt_size(item['size'])}{kind}")
+        if len(items) > limit:
+            lines.append(f"  ... y {len(items) - limit} más")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _media_infos(video_files, stream_copy):
+        """
+        MediaInfo de cada archivo, sondeando en paralelo solo los que no
+        tienen lo necesario (el JSON de ffprobe para planificar los streams).
+        Quedan en la caché de ffprobe, así que la cola no vuelve a lanzarlo.
+        """
+        fields = ('duration', 'probe_data') if stream_copy else ('duration',)
+        media_infos = [video_file.media_info for video_file in video_files]
+        missing = [
+            index for index, media_info in enumerate(media_infos)
+            if media_info is None or not media_info.has_fields(fields)
+        ]
+        if missing:
+            probed = MediaProbe.probe_many([video_files[index].path for index in missing], fields=fields)
+            for index, media_info in zip(missing, probed):
+                media_infos[index] = media_info or media_infos[index]
+        return media_infos
+
+    @staticmethod
+    def _estimate_item(index, video_file, media_info, output_folder, encoder, preset, crf, output_format,
+                       stream_copy, auto_crf, history):
+        """Tiempo en solitario, tamaño de salida y temporales de un elemento de la cola"""
+        output_dir = output_folder or video_file.directory
+        item = {
+            'index': index,
+            'name': video_file.name,
+            'output_dir': output_dir,
+            'time': 0.0,
+            'size': 0,
+            'scratch': 0,
+            'scratch_time': 0.0,
+            'remux': False,
+            'known': bool(media_info and media_info.duration),
+        }
+        if not item['known']:
+            return item
+
+        duration = media_info.duration
+        resolution = (media_info.width, media_info.height) if media_info.width else None
+        output_file = os.path.join(output_dir, f"plan.{output_format}")
+
+        decisions = None
+        if stream_copy:
+            decisions = FFmpegWrapper.plan_streams(video_file.path, output_file, encoder, media_info, crf)
+
+        if decisions and not StreamPlanner.needs_video_encoder(decisions):
+            # Video copiado: la salida ocupa más o menos lo mismo que la entrada
+            source_size = media_info.size or video_file.size or 0
+            item['remux'] = StreamPlanner.is_remux(decisions)
+            item['size'] = source_size
+            if item['remux']:
+                item['time'] = source_size / QueuePlanner.REMUX_BYTES_PER_SECOND
+            else:
+                # Solo se recodifica el audio: dominado por la lectura del archivo
+                item['time'] = max(source_size / QueuePlanner.REMUX_BYTES_PER_SECOND, duration / 50)
+            return item
+
+        item['time'] = ConversionEstimator.estimate_time(
+            duration, encoder, preset, resolution, media_info.fps, media_info.video_codec, history
+        )
+        item['size'] = ConversionEstimator.estimate_size(
+            duration, crf=crf, resolution=resolution, encoder=encoder, fps=media_info.fps, history=history
+        )
+
+        if auto_crf:
+            # Búsqueda de CRF: cada candidato codifica y compara sus muestras
+            crfs = CRFOptimizer.CANDIDATE_CRFS.get(encoder, CRFOptimizer.CANDIDATE_CRFS['default'])
+            samples = len(CRFOptimizer.sample_points(duration))
+            sample_seconds = samples * min(CRFOptimizer.SAMPLE_SECONDS, duration) * len(crfs)
+            item['scratch_time'] = 2 * ConversionEstimator.estimate_time(
+                sample_seconds, encoder, preset, resolution, media_info.fps, media_info.video_codec, history
+            )
+            item['scratch'] = ConversionEstimator.estimate_size(
+                sample_seconds, crf=min(crfs), resolution=resolution, encoder=encoder,
+                fps=media_info.fps, history=history
+            )
+            item['time'] += item['scratch_time']
+        return item
+
+    @staticmethod
+    def _simulate(items, workers, encoder):
+        """
+        Reparte los trabajos en orden entre los workers y simula su avance
+        compartiendo la máquina. Rellena 'start' y 'end' de cada trabajo y
+        retorna (duración total, pico de temporales simultáneos en bytes).
+        """
+        kind = 'hardware' if any(name in encoder for name in QueuePlanner.HARDWARE_ENCODERS) else 'software'
+        gain = QueuePlanner.PARALLEL_GAIN[kind]
+
+        pending = list(items)
+        active = []  # (trabajo en solitario restante, orden, item)
+        now = 0.0
+        scratch_events = []
+        counter = 0
+
+        while pending or active:
+            while pending and len(active) < workers:
+                item = pending.pop(0)
+                item['start'] = now
+                heapq.heappush(active, (item['time'], counter, item))
+                counter += 1
+                if item['scratch']:
+                    scratch_events.append((item, now))
+
+            # Con k trabajos a la vez cada uno avanza a esta fracción de su velocidad sola
+            k = len(active)
+            rate = (1 + (k - 1) * gain) / k
+            remaining, _, _ = active[0]
+            step = remaining / rate
+            now += step
+            active = [(left - remaining, order, item) for left, order, item in active]
+            heapq.heapify(active)
+            while active and active[0][0] <= 1e-9:
+                _, _, item = heapq.heappop(active)
+                item['end'] = now
+
+        # Los temporales de la búsqueda de CRF existen desde el inicio hasta el
+        # final de la búsqueda (se estima proporcional a la duración del trabajo)
+        intervals = []
+        for item, start in scratch_events:
+            share = item['scratch_time'] / item['time'] if item['time'] else 0
+            intervals.append((start, start + (item['end'] - start) * share, item['scratch']))
+        scratch_peak = 0
+        for start, _, _ in intervals:
+            current = sum(size for s, e, size in intervals if s <= start < e)
+            scratch_peak = max(scratch_peak, current)
+        return now, scratch_peak
+
+    @staticmethod
+    def _disk_usage(items, scratch_peak):
+        """
+        Espacio necesario por dispositivo: todas las salidas (las entradas no
+        se borran, así que el pico es el final del lote) más el pico de
+        temporales en el dispositivo de tempfile.
+        """
+        devices = {}
+
+        def device_for(path):
+            existing = QueuePlanner._existing_parent(path)
+            try:
+                device_id = os.stat(existing).st_dev
+            except OSError:
+                device_id = existing
+            if device_id not in devices:
+                try:
+                    free = shutil.disk_usage(existing).free
+                except OSError:
+                    free = None
+                devices[device_id] = {'path': existing, 'output': 0, 'scratch': 0, 'free': free}
+            return devices[device_id]
+
+        for item in items:
+            device_for(item['output_dir'])['output'] += item['size']
+        if scratch_peak:
+            device_for(tempfile.gettempdir())['scratch'] += scratch_peak
+
+        result = []
+        for device in devices.values():
+            device['required'] = int((device['output'] + device['scratch']) * QueuePlanner.SIZE_MARGIN)
+            # Sin poder leer el espacio libre no se bloquea el lote
+            device['fits'] = device['free'] is None or device['required'] <= device['free']
+            result.append(device)
+        return result
+
+    @staticmethod
+    def _existing_parent(path):
+        """Primera carpeta existente subiendo desde path (la salida puede no existir aún)"""
+        path = os.path.abspath(path or os.getcwd())
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return path
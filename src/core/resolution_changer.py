@@ -1,5 +1,6 @@
 """Módulo para cambiar resolución de videos"""
 import subprocess
+from core.media_probe import MediaProbe
 
 class ResolutionChanger:
     """Cambia la resolución de videos"""
@@ -13,38 +14,48 @@ class ResolutionChanger:
         '360p': (640, 360)
     }
     
+    @staticmethod
+    def build_command(input_file, output_file, width, height, encoder='libx264',
+                      preset='medium', crf=23, maintain_aspect=True):
+        """Construye el comando FFmpeg de cambio de resolución"""
+        cmd = [
+            'ffmpeg',
+            '-i', input_file
+        ]
+        
+        # Agregar aceleración por hardware si es NVENC
+        if 'nvenc' in encoder:
+            cmd.extend(['-hwaccel', 'cuda'])
+        
+        # Filtro de escala
+        if maintain_aspect:
+            # Mantener aspect ratio, escalar al ancho especificado
+            scale_filter = f"scale={width}:-2"
+        else:
+            # Escalar a dimensiones exactas
+            scale_filter = f"scale={width}:{height}"
+        
+        cmd.extend([
+            '-vf', scale_filter,
+            '-c:v', encoder,
+            '-preset', preset,
+            '-crf', str(crf),
+            '-c:a', 'copy',  # Copiar audio sin re-encodear
+            '-progress', 'pipe:2',
+            output_file,
+            '-y'
+        ])
+        
+        return cmd
+    
     @staticmethod
     def change_resolution(input_file, output_file, width, height, encoder='libx264', 
                          preset='medium', crf=23, maintain_aspect=True):
         """Cambia la resolución del video"""
         try:
-            cmd = [
-                'ffmpeg',
-                '-i', input_file
-            ]
-            
-            # Agregar aceleración por hardware si es NVENC
-            if 'nvenc' in encoder:
-                cmd.extend(['-hwaccel', 'cuda'])
-            
-            # Filtro de escala
-            if maintain_aspect:
-                # Mantener aspect ratio, escalar al ancho especificado
-                scale_filter = f"scale={width}:-2"
-            else:
-                # Escalar a dimensiones exactas
-                scale_filter = f"scale={width}:{height}"
-            
-            cmd.extend([
-                '-vf', scale_filter,
-                '-c:v', encoder,
-                '-preset', preset,
-                '-crf', str(crf),
-                '-c:a', 'copy',  # Copiar audio sin re-encodear
-                '-progress', 'pipe:2',
-                output_file,
-                '-y'
-            ])
+            cmd = ResolutionChanger.build_command(
+                input_file, output_file, width, height, encoder, preset, crf, maintain_aspect
+            )
             
             process = subprocess.Popen(
                 cmd,
@@ -62,28 +73,13 @@ class ResolutionChanger:
             return None
     
     @staticmethod
-    def get_current_resolution(input_file):
+    def get_current_resolution(input_file, media_info=None):
         """Obtiene la resolución actual del video"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height',
-                '-of', 'csv=p=0',
-                input_file
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            info = MediaProbe.ensure(input_file, media_info, ('width', 'height'))
             
-            if result.returncode == 0:
-                width, height = result.stdout.strip().split(',')
-                return int(width), int(height)
+            if info and info.width and info.height:
+                return info.width, info.height
             
             return None, None
             
@@ -0,0 +1,170 @@
+"""Estimación de tiempo y tamaño codificando muestras del propio archivo"""
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.crf_optimizer import CRFOptimizer
+from core.media_probe import MediaProbe
+
+class SampleEstimator:
+    """
+    Modo "medir" de ConversionEstimator: codifica unos pocos tramos cortos
+    repartidos por el archivo con el mismo comando que la conversión real
+    (codificador, preset, CRF y plan de streams) y extrapola la velocidad y
+    el tamaño de salida a todo el video, con un intervalo de confianza.
+
+    Los tramos se codifican en paralelo. La velocidad es la de todo el lote
+    (segundos de muestra / tiempo real), que equivale a la de una única
+    conversión que ocupa todos los núcleos.
+    """
+
+    # t de Student bilateral al 90% por grados de libertad (n - 1)
+    T_VALUES = {1: 6.314, 2: 2.920, 3: 2.353, 4: 2.132, 5: 2.015, 6: 1.943, 7: 1.895, 8: 1.860}
+    T_DEFAULT = 1.645
+
+    def __init__(self, input_file, encoder='libx264', preset='medium', crf=23, output_format='mp4',
+                 stream_copy=False, samples=4, sample_seconds=5, workers=None, media_info=None):
+        self.input_file = input_file
+        self.media_info = media_info
+        self.encoder = encoder
+        self.preset = preset
+        self.crf = crf
+        self.output_format = output_format.lower().lstrip('.')
+        self.stream_copy = stream_copy
+        self.samples = max(1, int(samples))
+        self.sample_seconds = sample_seconds
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+
+        self.is_running = True
+        self.temp_dir = None
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    def measure(self, log_callback=None):
+        """
+        Ejecuta la medición. Retorna un dict con 'speed' (x tiempo real),
+        'time' y 'size' estimados para todo el video, sus cotas 'time_low',
+        'time_high', 'size_low', 'size_high', 'bitrate' (bits/s) y
+        'samples'; o None si no se pudo medir (sin duración, cancelación
+        o errores de FFmpeg).
+        """
+        log = log_callback or (lambda msg: None)
+        # cancel() puede llegar antes de empezar: is_running solo se activa en __init__
+        if not self.is_running:
+            return None
+
+        duration = MediaProbe.duration(self.input_file, self.media_info)
+        starts = CRFOptimizer.sample_points(duration, self.samples, self.sample_seconds)
+        if not starts:
+            return None
+
+        length = min(self.sample_seconds, duration)
+        workers = min(self.workers, len(starts))
+        log(f"   Midiendo {self.encoder} {self.preset} CRF {self.crf}: "
+            f"{len(starts)} muestras de {length:g}s")
+
+        self.temp_dir = tempfile.mkdtemp(prefix='videotool_estimate_')
+        try:
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                measures = list(pool.map(
+                    lambda task: self._encode_sample(task[0], task[1], length), enumerate(starts)
+                ))
+            wall = time.monotonic() - started
+
+            if not self.is_running or any(measure is None for measure in measures) or wall <= 0:
+                return None
+        finally:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+        # Velocidad de cada muestra como si tuviera la máquina para ella sola
+        speeds = [workers * length / elapsed for _, elapsed in measures]
+        bitrates = [size * 8 / length for size, _ in measures]
+
+        speed = len(starts) * length / wall
+        speed_error = SampleEstimator._relative_error(speeds)
+        bitrate = sum(bitrates) / len(bitrates)
+        bitrate_error = SampleEstimator._relative_error(bitrates)
+
+        slowest = max(speed * (1 - speed_error), speed * 0.1)
+        fastest = speed * (1 + speed_error)
+        result = {
+            'speed': speed,
+            'time': duration / speed,
+            'time_low': duration / fastest,
+            'time_high': duration / slowest,
+            'bitrate': int(bitrate),
+            'size': int(bitrate * duration / 8),
+            'size_low': int(max(bitrate * (1 - bitrate_error), 0) * duration / 8),
+            'size_high': int(bitrate * (1 + bitrate_error) * duration / 8),
+            'samples': len(starts),
+        }
+        log(f"     {speed:.2f}x tiempo real, {result['bitrate'] // 1000} kbps")
+        return result
+
+    def cancel(self):
+        """Cancela la medición y mata los procesos FFmpeg"""
+        self.is_running = False
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except:
+                pass
+
+    @staticmethod
+    def _relative_error(values):
+        """Semiancho relativo del intervalo de confianza al 90% de la media (0 con una muestra)"""
+        count = len(values)
+        mean = sum(values) / count
+        if count < 2 or mean <= 0:
+            return 0.0
+        variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+        t = SampleEstimator.T_VALUES.get(count - 1, SampleEstimator.T_DEFAULT)
+        return t * math.sqrt(variance / count) / mean
+
+    def _encode_sample(self, index, start, length):
+        """Codifica un tramo con el comando de la conversión. Retorna (bytes, segundos) o None"""
+        if not self.is_running:
+            return None
+
+        sample = os.path.join(self.temp_dir, f"sample_{index}.{self.output_format}")
+        cmd = FFmpegWrapper.build_convert_command(
+            self.input_file, sample, self.encoder, self.preset, self.crf, self.media_info, self.stream_copy
+        )
+        # Mismo comando, limitado al tramo (búsqueda rápida antes de la entrada)
+        position = cmd.index('-i')
+        cmd[position:position] = ['-ss', str(start), '-t', str(length)]
+
+        started = time.monotonic()
+        if self._run(cmd) != 0 or not os.path.exists(sample):
+            return None
+        return os.path.getsize(sample), max(time.monotonic() - started, 1e-3)
+
+    def _run(self, cmd):
+        """Ejecuta un comando FFmpeg registrándolo para cancelación. Retorna el código de salida"""
+        if not self.is_running:
+            return -1
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        with self._lock:
+            self._processes.add(process)
+        # cancel() pudo llegar entre la comprobación y el registro
+        if not self.is_running:
+            process.kill()
+        try:
+            return process.wait()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
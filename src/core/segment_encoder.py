@@ -0,0 +1,376 @@
+"""Módulo para codificación paralela por segmentos de un solo video"""
+import subprocess
+import os
+import json
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.media_probe import MediaProbe
+from core.progress_parser import ProgressParser
+from core.video_joiner import VideoJoiner
+
+class SegmentEncoder:
+    """
+    Divide un video largo en segmentos (en keyframes), codifica los segmentos
+    en procesos FFmpeg paralelos y los une con stream copy.
+
+    El video se segmenta y codifica sin audio; el audio se codifica una sola
+    vez en paralelo para evitar huecos en las uniones y se mezcla al final.
+
+    Con work_dir el trabajo es reanudable: los segmentos y un manifiesto de
+    checkpoint se conservan en esa carpeta, y una nueva llamada a encode()
+    tras una cancelación o caída continúa desde el último segmento completado.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, input_file, output_file, encoder='libx264', preset='medium', crf=23,
+                 workers=None, segment_time=60, max_retries=2, work_dir=None, media_info=None):
+        self.input_file = input_file
+        self.media_info = media_info
+        self.output_file = output_file
+        self.encoder = encoder
+        self.preset = preset
+        self.crf = crf
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.segment_time = segment_time
+        self.max_retries = max_retries
+        self.work_dir = work_dir
+
+        self.is_running = True
+        self.temp_dir = None
+        self.manifest = None
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._segment_done = {}  # índice -> segundos codificados
+        self._progress_callback = None
+        self.total_duration = 1
+
+    def encode(self, progress_callback=None, log_callback=None):
+        """
+        Ejecuta la codificación completa. Retorna (success, message).
+        progress_callback(percent) recibe el progreso agregado de todos los segmentos.
+        """
+        log = log_callback or (lambda msg: None)
+        self._progress_callback = progress_callback
+        # cancel() puede llegar antes de empezar: is_running solo se activa en __init__
+        if not self.is_running:
+            return False, "Conversión cancelada"
+        success = False
+
+        if self.work_dir:
+            self.temp_dir = self.work_dir
+            os.makedirs(self.temp_dir, exist_ok=True)
+            self.manifest = self._load_manifest()
+        else:
+            self.temp_dir = tempfile.mkdtemp(
+                prefix='segments_',
+                dir=os.path.dirname(os.path.abspath(self.output_file))
+            )
+            self.manifest = self._new_manifest()
+
+        try:
+            # 1. Dividir en keyframes (stream copy)
+            segments = self.manifest['segments']
+            if segments and all(os.path.exists(seg['source']) for seg in segments):
+                log(f"♻️ Reanudando: {len(self.manifest['completed'])}/{len(segments)} segmentos ya codificados")
+            else:
+                log(f"✂️ Dividiendo video en segmentos de ~{self.segment_time}s...")
+                segments = self._split()
+                if not self.is_running:
+                    return False, "Conversión cancelada"
+                if not segments:
+                    return False, "❌ Error dividiendo el video"
+                self.manifest['segments'] = segments
+                self.manifest['completed'] = []
+                self._save_manifest()
+
+            self.total_duration = sum(seg['duration'] for seg in segments) or 1
+            log(f"   {len(segments)} segmentos, {self.workers} procesos en paralelo")
+
+            # 2. Codificar segmentos + audio en paralelo
+            has_audio = self._has_audio()
+            audio_file = os.path.join(self.temp_dir, 'audio.mka') if has_audio else None
+            audio_done = has_audio and self.manifest.get('audio_done') and os.path.exists(audio_file)
+
+            pending = []
+            for seg in segments:
+                if seg['index'] in self.manifest['completed'] and os.path.exists(seg['encoded']):
+                    self._segment_done[seg['index']] = seg['duration']
+                else:
+                    pending.append(seg)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                audio_future = None
+                if has_audio and not audio_done:
+                    audio_future = pool.submit(self._encode_audio, audio_file)
+                futures = [pool.submit(self._encode_segment, seg, log) for seg in pending]
+                results = [future.result() for future in futures]
+                audio_ok = audio_future.result() if audio_future else True
+
+            if not self.is_running:
+                return False, "Conversión cancelada"
+
+            failed = [seg['index'] for seg, ok in zip(pending, results) if not ok]
+            if failed:
+                return False, f"❌ Fallaron {len(failed)} segmento(s): {failed[:10]}"
+            if not audio_ok:
+                return False, "❌ Error codificando el audio"
+
+            # 3. Unir con stream copy
+            log("🔗 Uniendo segmentos (stream copy)...")
+            if not self._concat([seg['encoded'] for seg in segments], audio_file):
+                if not self.is_running:
+                    return False, "Conversión cancelada"
+                return False, "❌ Error uniendo los segmentos"
+
+            self._emit_progress(100)
+            success = True
+            return True, "✅ Conversión por segmentos completada exitosamente"
+
+        finally:
+            # En modo reanudable el checkpoint se conserva hasta terminar
+            if success or not self.work_dir:
+                self._cleanup()
+
+    def has_checkpoint(self):
+        """Indica si existe un checkpoint reanudable para esta conversión"""
+        if not self.work_dir:
+            return False
+        return os.path.exists(os.path.join(self.work_dir, SegmentEncoder.MANIFEST_NAME))
+
+    def discard_checkpoint(self):
+        """Elimina el checkpoint y los segmentos guardados"""
+        if self.work_dir and os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def cancel(self):
+        """Cancela la codificación y mata todos los procesos FFmpeg"""
+        self.is_running = False
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except:
+                pass
+
+    def _split(self):
+        """Divide la pista de video en segmentos por keyframe sin recodificar"""
+        list_file = os.path.join(self.temp_dir, 'segments.csv')
+        pattern = os.path.join(self.temp_dir, 'src_%05d.mkv')
+
+        cmd = [
+            'ffmpeg',
+            '-i', self.input_file,
+            '-map', '0:v:0',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', str(self.segment_time),
+            '-segment_list', list_file,
+            '-segment_list_type', 'csv',
+            '-reset_timestamps', '1',
+            pattern,
+            '-y'
+        ]
+
+        if self._run(cmd) != 0 or not os.path.exists(list_file):
+            return []
+
+        segments = []
+        with open(list_file, 'r', encoding='utf-8') as f:
+            for index, line in enumerate(f):
+                parts = line.strip().split(',')
+                if len(parts) < 3:
+                    continue
+                source = os.path.join(self.temp_dir, os.path.basename(parts[0]))
+                segments.append({
+                    'index': index,
+                    'source': source,
+                    'encoded': os.path.join(self.temp_dir, f"enc_{index:05d}.mkv"),
+                    'duration': max(float(parts[2]) - float(parts[1]), 0)
+                })
+
+        return segments
+
+    def _encode_segment(self, segment, log):
+        """Codifica un segmento, reintentando si falla"""
+        cmd = ['ffmpeg']
+        if 'nvenc' in self.encoder:
+            cmd.extend(['-hwaccel', 'cuda'])
+        cmd.extend(['-i', segment['source']])
+        cmd.extend(FFmpegWrapper.build_video_args(self.encoder, self.preset, self.crf))
+        cmd.extend(['-an', '-progress', 'pipe:2', segment['encoded'], '-y'])
+
+        for attempt in range(1, self.max_retries + 2):
+            if not self.is_running:
+                return False
+
+            self._update_segment(segment['index'], 0)
+            returncode = self._run(
+                cmd,
+                on_time=lambda t: self._update_segment(segment['index'], min(t, segment['duration']))
+            )
+
+            if returncode == 0:
+                self._update_segment(segment['index'], segment['duration'])
+                with self._lock:
+                    self.manifest['completed'].append(segment['index'])
+                self._save_manifest()
+                return True
+
+            if self.is_running and attempt <= self.max_retries:
+                log(f"⚠️ Segmento {segment['index']} falló, reintentando ({attempt}/{self.max_retries})...")
+
+        return False
+
+    def _encode_audio(self, audio_file):
+        """Codifica el audio completo en una sola pasada"""
+        cmd = [
+            'ffmpeg',
+            '-i', self.input_file,
+            '-vn',
+            '-map', '0:a:0',
+            '-c:a', FFmpegWrapper.get_audio_codec(self.output_file),
+            '-b:a', '192k',
+            audio_file,
+            '-y'
+        ]
+        if self._run(cmd) != 0:
+            return False
+
+        with self._lock:
+            self.manifest['audio_done'] = True
+        self._save_manifest()
+        return True
+
+    def _concat(self, encoded_files, audio_file):
+        """Une los segmentos codificados (y el audio) con stream copy"""
+        list_file = VideoJoiner._create_concat_list(encoded_files)
+
+        try:
+            cmd = [
+                'ffmpeg',
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_file
+            ]
+
+            if audio_file:
+                cmd.extend(['-i', audio_file, '-map', '0:v:0', '-map', '1:a:0'])
+
+            cmd.extend(['-c', 'copy', self.output_file, '-y'])
+
+            return self._run(cmd) == 0
+        finally:
+            try:
+                os.remove(list_file)
+            except:
+                pass
+
+    def _new_manifest(self):
+        """Manifiesto vacío que identifica la entrada y la configuración"""
+        stat = os.stat(self.input_file) if os.path.exists(self.input_file) else None
+        return {
+            'input_file': os.path.abspath(self.input_file),
+            'input_size': stat.st_size if stat else 0,
+            'input_mtime': stat.st_mtime if stat else 0,
+            'settings': {
+                'encoder': self.encoder,
+                'preset': self.preset,
+                'crf': self.crf,
+                'segment_time': self.segment_time
+            },
+            'segments': [],
+            'completed': [],
+            'audio_done': False
+        }
+
+    def _load_manifest(self):
+        """Carga el checkpoint si corresponde a la misma entrada y configuración"""
+        fresh = self._new_manifest()
+        path = os.path.join(self.temp_dir, SegmentEncoder.MANIFEST_NAME)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return fresh
+
+        keys = ('input_file', 'input_size', 'input_mtime', 'settings')
+        if any(manifest.get(key) != fresh[key] for key in keys):
+            # La entrada o la configuración cambiaron: empezar de cero
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            os.makedirs(self.temp_dir, exist_ok=True)
+            return fresh
+
+        return manifest
+
+    def _save_manifest(self):
+        """Escribe el manifiesto de forma atómica"""
+        if not self.work_dir:
+            return
+
+        path = os.path.join(self.temp_dir, SegmentEncoder.MANIFEST_NAME)
+        with self._lock:
+            data = json.dumps(self.manifest, indent=2)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+
+    def _has_audio(self):
+        """Indica si el video tiene al menos una pista de audio"""
+        info = MediaProbe.ensure(self.input_file, self.media_info, ('audio_codec',))
+        return info is not None and info.has_audio
+
+    def _run(self, cmd, on_time=None):
+        """Ejecuta un comando FFmpeg registrándolo para cancelación"""
+        if not self.is_running:
+            return -1
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+
+        with self._lock:
+            self._processes.add(process)
+        # cancel() pudo llegar entre la comprobación y el registro
+        if not self.is_running:
+            process.kill()
+
+        try:
+            # Drenar stderr siempre para que FFmpeg no se bloquee
+            ProgressParser.pump(
+                process.stderr, ProgressParser(),
+                lambda event: on_time(event.out_time) if on_time else None
+            )
+
+            process.wait()
+            return process.returncode
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    def _update_segment(self, index, seconds_done):
+        """Actualiza el progreso de un segmento y emite el progreso agregado"""
+        with self._lock:
+            self._segment_done[index] = seconds_done
+            done = sum(self._segment_done.values())
+
+        self._emit_progress(min(int(done / self.total_duration * 100), 99))
+
+    def _emit_progress(self, percent):
+        if self._progress_callback:
+            self._progress_callback(percent)
+
+    def _cleanup(self):
+        """Elimina los segmentos temporales"""
+        if self.temp_dir and os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.temp_dir = None
@@ -0,0 +1,248 @@
+"""Planificación por stream: copiar, recodificar o descartar"""
+
+
+class StreamPlanner:
+    """
+    Compara los streams de la entrada (JSON de ffprobe) con el formato y
+    codificador pedidos y decide para cada uno si se copia tal cual, se
+    recodifica o se descarta. Todos los streams se mapean de forma
+    explícita (-map 0:N), incluidos subtítulos, datos y adjuntos.
+
+    Si ningún stream necesita recodificarse el trabajo es un simple cambio
+    de contenedor y termina a velocidad de disco.
+    """
+
+    # Codec de salida de cada codificador de video
+    ENCODER_CODECS = {
+        'libx264': 'h264', 'h264_nvenc': 'h264', 'h264_qsv': 'h264', 'h264_amf': 'h264',
+        'libx265': 'hevc', 'hevc_nvenc': 'hevc', 'hevc_qsv': 'hevc', 'hevc_amf': 'hevc',
+        'libvpx-vp9': 'vp9', 'libvpx': 'vp8', 'libaom-av1': 'av1', 'libsvtav1': 'av1',
+    }
+
+    # Codecs que cada contenedor acepta por tipo de stream (None = cualquiera)
+    CONTAINERS = {
+        'mp4': {
+            'video': {'h264', 'hevc', 'mpeg4', 'av1', 'vp9'},
+            'audio': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus'},
+            'subtitle': {'mov_text'},
+            'data': {'bin_data', 'none'},
+            'attachment': set(),
+        },
+        'mov': {
+            'video': {'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg'},
+            'audio': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'pcm_s16le', 'pcm_s16be', 'pcm_s24le'},
+            'subtitle': {'mov_text'},
+            'data': {'bin_data', 'none'},
+            'attachment': set(),
+        },
+        'mkv': {
+            'video': None,
+            'audio': None,
+            # mov_text y otros se convierten a srt (ver SUBTITLE_TARGETS)
+            'subtitle': {'subrip', 'ass', 'ssa', 'webvtt', 'hdmv_pgs_subtitle', 'dvd_subtitle', 'dvb_subtitle'},
+            'data': set(),
+            'attachment': None,
+        },
+        'webm': {
+            'video': {'vp8', 'vp9', 'av1'},
+            'audio': {'opus', 'vorbis'},
+            'subtitle': {'webvtt'},
+            'data': set(),
+            'attachment': set(),
+        },
+        'avi': {
+            'video': {'h264', 'mpeg4', 'mjpeg'},
+            'audio': {'mp3', 'ac3', 'aac', 'pcm_s16le'},
+            'subtitle': set(),
+            'data': set(),
+            'attachment': set(),
+        },
+        'mp3': {'video': set(), 'audio': {'mp3'}, 'subtitle': set(), 'data': set(), 'attachment': set()},
+    }
+
+    # Formato desconocido: se recodifica video y audio y se descarta el resto
+    UNKNOWN_CONTAINER = {'video': None, 'audio': None, 'subtitle': set(), 'data': set(), 'attachment': set()}
+
+    # Subtítulos de texto: se pueden convertir al formato del contenedor
+    TEXT_SUBTITLES = {'subrip', 'ass', 'ssa', 'mov_text', 'webvtt', 'text'}
+    SUBTITLE_TARGETS = {'mp4': 'mov_text', 'mov': 'mov_text', 'webm': 'webvtt', 'mkv': 'srt'}
+
+    AUDIO_ENCODERS = {'mp3': 'libmp3lame', 'webm': 'libvorbis'}
+
+    # Letra del especificador de stream de FFmpeg por tipo
+    SPECIFIERS = {'video': 'v', 'audio': 'a', 'subtitle': 's', 'data': 'd', 'attachment': 't'}
+
+    # Margen sobre el bitrate pedido con el que todavía se copia un stream
+    BITRATE_TOLERANCE = 1.1
+
+    @staticmethod
+    def plan(probe_data, output_format, encoder='libx264', copy_video=True, copy_audio=True,
+             max_video_bitrate=None, max_audio_bitrate=None):
+        """
+        Retorna una lista de decisiones, una por stream de la entrada:
+        {'index', 'type', 'codec', 'action': 'copy'|'transcode'|'drop', 'reason'}
+
+        max_video_bitrate / max_audio_bitrate (bits/s): bitrate que tendría
+        el stream recodificado con la calidad pedida. Un stream compatible
+        solo se copia si no lo supera (si no, copiarlo no reduciría el
+        tamaño); con bitrate desconocido se recodifica.
+        """
+        output_format = output_format.lower().lstrip('.')
+        container = StreamPlanner.CONTAINERS.get(output_format)
+        if container is None:
+            # Sin saber qué admite el contenedor no se copia nada
+            container = StreamPlanner.UNKNOWN_CONTAINER
+            copy_video = copy_audio = False
+        source_format = (probe_data.get('format') or {}).get('format_name', '')
+        # El bitrate total acota el de cada stream si este no figura
+        total_bitrate = StreamPlanner._to_int((probe_data.get('format') or {}).get('bit_rate'))
+        target_video = StreamPlanner.ENCODER_CODECS.get(encoder)
+
+        decisions = []
+        has_video = False
+        for stream in probe_data.get('streams', []):
+            stream_type = stream.get('codec_type')
+            codec = stream.get('codec_name') or 'none'
+            accepted = container.get(stream_type, set())
+            fits = accepted is None or codec in accepted
+
+            if stream_type == 'video':
+                if (stream.get('disposition') or {}).get('attached_pic'):
+                    action, reason = 'drop', "carátula"
+                elif has_video or accepted == set():
+                    action, reason = 'drop', "el formato no admite más video"
+                elif copy_video and fits and codec == target_video:
+                    action, reason = StreamPlanner._copy_if_within(
+                        stream, max_video_bitrate, total_bitrate, f"ya es {codec}"
+                    )
+                else:
+                    action, reason = 'transcode', f"{codec} -> {target_video or encoder}"
+                has_video = has_video or action != 'drop'
+
+            elif stream_type == 'audio':
+                if accepted == set():
+                    action, reason = 'drop', "el formato no admite audio"
+                elif copy_audio and fits:
+                    action, reason = StreamPlanner._copy_if_within(
+                        stream, max_audio_bitrate, total_bitrate, f"{codec} compatible con {output_format}"
+                    )
+                else:
+                    action, reason = 'transcode', f"{codec} no compatible con {output_format}"
+
+            elif stream_type == 'subtitle':
+                if fits:
+                    action, reason = 'copy', f"{codec} compatible con {output_format}"
+                elif codec in StreamPlanner.TEXT_SUBTITLES and output_format in StreamPlanner.SUBTITLE_TARGETS:
+                    action, reason = 'transcode', f"{codec} -> {StreamPlanner.SUBTITLE_TARGETS[output_format]}"
+                else:
+                    action, reason = 'drop', f"{codec} no se puede guardar en {output_format}"
+
+            elif stream_type == 'data':
+                # Pistas de timecode/telemetría: solo entre contenedores MOV/MP4
+                if fits and 'mov' in source_format:
+                    action, reason = 'copy', "datos"
+                else:
+                    action, reason = 'drop', "datos no admitidos"
+
+            elif stream_type == 'attachment':
+                action, reason = ('copy', "adjunto") if fits else ('drop', "adjuntos no admitidos")
+
+            else:
+                action, reason = 'drop', f"tipo {stream_type} desconocido"
+
+            decisions.append({
+                'index': stream.get('index', len(decisions)),
+                'type': stream_type,
+                'codec': codec,
+                'action': action,
+                'reason': reason,
+            })
+        return decisions
+
+    @staticmethod
+    def is_remux(decisions):
+        """True si no hay que recodificar nada (solo cambia el contenedor)"""
+        return not any(decision['action'] == 'transcode' for decision in decisions)
+
+    @staticmethod
+    def needs_video_encoder(decisions):
+        return any(d['type'] == 'video' and d['action'] == 'transcode' for d in decisions)
+
+    @staticmethod
+    def build_args(decisions, output_format, video_args, audio_bitrate='192k'):
+        """
+        Argumentos de mapeo y codecs (entre -i y la salida). video_args son
+        los parámetros del codificador de video (FFmpegWrapper.build_video_args).
+        """
+        output_format = output_format.lower().lstrip('.')
+        args = []
+        counters = {}
+        for decision in decisions:
+            if decision['action'] == 'drop':
+                continue
+            stream_type = decision['type']
+            specifier = StreamPlanner.SPECIFIERS[stream_type]
+            position = counters.get(stream_type, 0)
+            counters[stream_type] = position + 1
+            target = f"{specifier}:{position}"
+
+            args.extend(['-map', f"0:{decision['index']}"])
+            if decision['action'] == 'copy':
+                args.extend([f"-c:{target}", 'copy'])
+                if stream_type == 'video' and decision['codec'] == 'hevc' and output_format in ('mp4', 'mov'):
+                    # Etiqueta que esperan los reproductores de Apple
+                    args.extend([f"-tag:{target}", 'hvc1'])
+            elif stream_type == 'video':
+                args.extend(StreamPlanner._retarget(video_args, target))
+            elif stream_type == 'audio':
+                encoder = StreamPlanner.AUDIO_ENCODERS.get(output_format, 'aac')
+                args.extend([f"-c:{target}", encoder, f"-b:{target}", audio_bitrate])
+            elif stream_type == 'subtitle':
+                args.extend([f"-c:{target}", StreamPlanner.SUBTITLE_TARGETS[output_format]])
+        return args
+
+    @staticmethod
+    def describe(decisions):
+        """Resumen legible del plan para el log"""
+        return ", ".join(
+            f"#{d['index']} {d['type']} {d['codec']}: {d['action']}" for d in decisions
+        )
+
+    @staticmethod
+    def stream_bitrate(stream):
+        """Bitrate de un stream de ffprobe en bits/s (Matroska lo guarda en la etiqueta BPS). 0 si se desconoce"""
+        tags = stream.get('tags') or {}
+        for value in (stream.get('bit_rate'), tags.get('BPS'), tags.get('BPS-eng')):
+            bitrate = StreamPlanner._to_int(value)
+            if bitrate:
+                return bitrate
+        return 0
+
+    @staticmethod
+    def _copy_if_within(stream, max_bitrate, total_bitrate, reason):
+        """('copy', motivo) si el stream no supera el bitrate pedido; si no, ('transcode', motivo)"""
+        if max_bitrate is None:
+            return 'copy', reason
+        bitrate = StreamPlanner.stream_bitrate(stream) or total_bitrate
+        if not bitrate:
+            return 'transcode', "bitrate desconocido"
+        if bitrate > max_bitrate * StreamPlanner.BITRATE_TOLERANCE:
+            return 'transcode', f"{bitrate // 1000} kbps > {max_bitrate // 1000} kbps pedidos"
+        return 'copy', f"{reason}, {bitrate // 1000} kbps"
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _retarget(video_args, target):
+        """Aplica los parámetros de video solo al stream de salida indicado"""
+        retargeted = []
+        for arg in video_args:
+            if arg in ('-c:v', '-b:v'):
+                arg = f"{arg[:3]}{target}"
+            retargeted.append(arg)
+        return retargeted
@@ -1,6 +1,7 @@
 """Módulo para manejo de subtítulos"""
 import subprocess
 import os
+from core.media_probe import MediaProbe
 
 class SubtitleHandler:
     """Maneja subtítulos en videos"""
@@ -29,13 +30,11 @@ class SubtitleHandler:
                 '-y'
             ])
             
+            # stderr en binario: lo interpreta ProgressParser
             process = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
             )
             
             return process
@@ -70,13 +69,11 @@ class SubtitleHandler:
                 '-y'
             ])
             
+            # stderr en binario: lo interpreta ProgressParser
             process = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
             )
             
             return process
@@ -111,32 +108,17 @@ class SubtitleHandler:
             return False
     
     @staticmethod
-    def get_subtitle_streams(input_video):
+    def get_subtitle_streams(input_video, media_info=None):
         """Obtiene información de los streams de subtítulos"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 's',
-                '-show_entries', 'stream=index,codec_name:stream_tags=language',
-                '-of', 'csv=p=0',
-                input_video
-            ]
+            info = MediaProbe.ensure(input_video, media_info, ('subtitle_streams',))
+            if info is None:
+                return []
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            streams = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        streams.append({
-                            'index': parts[0],
-                            'codec': parts[1],
-                            'language': parts[2] if len(parts) > 2 else 'unknown'
-                        })
-            
-            return streams
+            return [
+                {'index': index, 'codec': codec, 'language': language}
+                for index, codec, language in info.subtitle_streams
+            ]
             
         except Exception as e:
             print(f"Error obteniendo streams de subtítulos: {e}")
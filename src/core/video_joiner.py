@@ -2,10 +2,327 @@
 import subprocess
 import os
 import tempfile
+from collections import Counter
+from core.ffmpeg_steps import FFmpegSteps
+from core.media_probe import MediaProbe
+from core.stream_planner import StreamPlanner
+from utils.ffmpeg_wrapper import FFmpegWrapper
 
 class VideoJoiner:
     """Une múltiples videos en uno solo"""
     
+    # Campos necesarios para comprobar la compatibilidad
+    INFO_FIELDS = ('width', 'height', 'fps')
+    
+    # Las firmas salen del JSON completo de ffprobe
+    SIGNATURE_PROBE_FIELDS = ('probe_data',)
+    
+    # Parámetros que deben coincidir para unir con -c copy
+    SIGNATURE_FIELDS = ('video_codec', 'profile', 'pix_fmt', 'width', 'height', 'frame_rate',
+                        'time_base', 'audio_codec', 'sample_rate', 'channels')
+    
+    # Codificador por defecto para adaptar un clip a un codec dado
+    VIDEO_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'vp9': 'libvpx-vp9'}
+    AUDIO_ENCODERS = {'aac': 'aac', 'mp3': 'libmp3lame', 'opus': 'libopus', 'vorbis': 'libvorbis',
+                      'ac3': 'ac3', 'pcm_s16le': 'pcm_s16le'}
+    
+    @staticmethod
+    def build_join_command(list_file, output_file, encoder='libx264', preset='medium', crf=23):
+        """Construye el comando FFmpeg de unión a partir de una lista concat"""
+        cmd = [
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', list_file
+        ]
+        
+        if 'nvenc' in encoder:
+            cmd.extend(['-hwaccel', 'cuda'])
+        
+        cmd.extend([
+            '-c:v', encoder,
+            '-preset', preset,
+            '-crf', str(crf),
+            '-c:a', 'aac',
+            '-b:a', '192k',
+            '-progress', 'pipe:2',
+            output_file,
+            '-y'
+        ])
+        
+        return cmd
+    
+    @staticmethod
+    def build_copy_join_command(list_file, output_file):
+        """Unión sin recodificar (todas las entradas con los mismos parámetros)"""
+        return [
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', list_file,
+            '-c', 'copy',
+            '-progress', 'pipe:2',
+            output_file,
+            '-y'
+        ]
+    
+    @staticmethod
+    def build_conform_command(input_file, output_file, reference, source, encoder='libx264', preset='medium', crf=23):
+        """
+        Recodifica un clip (firma source) para que coincida con la firma de
+        referencia: codec, perfil, pix_fmt, resolución, FPS, timebase y audio.
+        Retorna None si no hay codificador para los codecs de referencia.
+        """
+        if StreamPlanner.ENCODER_CODECS.get(encoder) != reference['video_codec']:
+            encoder = VideoJoiner.VIDEO_ENCODERS.get(reference['video_codec'])
+        audio_encoder = VideoJoiner.AUDIO_ENCODERS.get(reference['audio_codec'])
+        if encoder is None or (reference['audio_codec'] and audio_encoder is None):
+            return None
+        
+        cmd = ['ffmpeg', '-i', input_file]
+        if reference['audio_codec'] and not source['audio_codec']:
+            # Clip sin audio: pista silenciosa para que la unión no se desfase
+            layout = 'mono' if reference['channels'] == 1 else 'stereo'
+            cmd.extend(['-f', 'lavfi', '-i', f"anullsrc=r={reference['sample_rate']}:cl={layout}"])
+            cmd.extend(['-map', '0:v:0', '-map', '1:a:0', '-shortest'])
+        else:
+            cmd.extend(['-map', '0:v:0', '-map', '0:a:0?'])
+        
+        width, height = reference['width'], reference['height']
+        cmd.extend(FFmpegWrapper.build_video_args(encoder, preset, crf))
+        cmd.extend([
+            '-vf', f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                   f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={reference['frame_rate']}"
+        ])
+        if reference['profile']:
+            cmd.extend(['-profile:v', VideoJoiner._profile_arg(reference['profile'])])
+        if reference['pix_fmt']:
+            cmd.extend(['-pix_fmt', reference['pix_fmt']])
+        if reference['time_base'] and output_file.lower().endswith(('.mp4', '.mov')):
+            cmd.extend(['-video_track_timescale', reference['time_base'].split('/')[-1]])
+        
+        if reference['audio_codec']:
+            cmd.extend([
+                '-c:a', audio_encoder,
+                '-ar', str(reference['sample_rate']),
+                '-ac', str(reference['channels']),
+            ])
+        else:
+            cmd.append('-an')
+        
+        cmd.extend(['-progress', 'pipe:2', output_file, '-y'])
+        return cmd
+    
+    @staticmethod
+    def prepare_join(input_files, output_file, media_infos=None, encoder='libx264', preset='medium', crf=23,
+                     stream_copy=True, normalize=False):
+        """
+        Decide cómo unir las entradas y retorna (pasos, temporales, descripción).
+        Cada paso es un dict {'cmd', 'duration', 'label'} y se ejecutan en orden,
+        salvo los marcados con 'parallel', que pueden correr a la vez entre sí
+        (ver FFmpegSteps). Los temporales se borran al terminar.
+        
+        Con stream_copy, si todas las entradas tienen la misma firma se unen con
+        -c copy. Si solo algunas difieren se recodifican esas para que coincidan
+        con la mayoría y después se une todo sin recodificar.
+        Con normalize, si no hay mayoría (p. ej. resoluciones distintas) todas
+        las entradas se adaptan en paralelo a un formato común y se unen sin
+        recodificar. En otro caso se recodifica la unión completa.
+        """
+        media_infos = list(media_infos or [None] * len(input_files))
+        
+        if stream_copy or normalize:
+            signatures = VideoJoiner._signatures(input_files, media_infos)
+            
+            reference = VideoJoiner._majority_signature(signatures) if stream_copy else None
+            if reference is not None:
+                extension = os.path.splitext(input_files[signatures.index(reference)])[1] or '.mp4'
+                plan = VideoJoiner._conform_plan(
+                    input_files, output_file, media_infos, signatures, reference, extension, encoder, preset, crf
+                )
+                if plan:
+                    steps, temp_files = plan
+                    adapted = len(steps) - 1
+                    description = (f"Unión sin recodificar ({adapted} de {len(input_files)} videos adaptados)"
+                                   if adapted else "Unión sin recodificar (todos los videos coinciden)")
+                    return steps, temp_files, description
+            
+            target = VideoJoiner._normalize_target(signatures, encoder) if normalize else None
+            if target is not None:
+                extension = os.path.splitext(output_file)[1] or '.mp4'
+                plan = VideoJoiner._conform_plan(
+                    input_files, output_file, media_infos, signatures, target, extension, encoder, preset, crf
+                )
+                if plan:
+                    steps, temp_files = plan
+                    fields = dict(zip(VideoJoiner.SIGNATURE_FIELDS, target))
+                    description = (f"Normalizando {len(steps) - 1} videos en paralelo a "
+                                   f"{fields['width']}x{fields['height']} y uniendo sin recodificar")
+                    return steps, temp_files, description
+        
+        list_file = VideoJoiner._create_concat_list(input_files)
+        steps = [{
+            'cmd': VideoJoiner.build_join_command(list_file, output_file, encoder, preset, crf),
+            'duration': VideoJoiner._total_duration(media_infos),
+            'label': "Uniendo y recodificando",
+        }]
+        return steps, [list_file], "Unión recodificando todos los videos"
+    
+    @staticmethod
+    def _conform_plan(input_files, output_file, media_infos, signatures, reference, extension,
+                      encoder, preset, crf):
+        """
+        Pasos para adaptar a reference las entradas con otra firma (en paralelo)
+        y unir todo con -c copy. Retorna (pasos, temporales) o None si alguna
+        entrada no se puede adaptar.
+        """
+        steps = []
+        temp_files = []
+        join_inputs = list(input_files)
+        reference_fields = dict(zip(VideoJoiner.SIGNATURE_FIELDS, reference))
+        
+        for index, signature in enumerate(signatures):
+            if signature == reference:
+                continue
+            fd, conformed = tempfile.mkstemp(suffix=extension)
+            os.close(fd)
+            temp_files.append(conformed)
+            cmd = VideoJoiner.build_conform_command(
+                input_files[index], conformed, reference_fields,
+                dict(zip(VideoJoiner.SIGNATURE_FIELDS, signature)), encoder, preset, crf
+            )
+            if cmd is None:
+                FFmpegSteps.remove_temp_files(temp_files)
+                return None
+            join_inputs[index] = conformed
+            steps.append({
+                'cmd': cmd,
+                'duration': media_infos[index].duration if media_infos[index] else 0,
+                'label': f"Adaptando video {index + 1} ({VideoJoiner._differences(signature, reference)})",
+                'input': input_files[index],
+                'parallel': True,
+            })
+        
+        list_file = VideoJoiner._create_concat_list(join_inputs)
+        temp_files.append(list_file)
+        steps.append({
+            'cmd': VideoJoiner.build_copy_join_command(list_file, output_file),
+            'duration': VideoJoiner._total_duration(media_infos),
+            'label': "Uniendo sin recodificar",
+        })
+        return steps, temp_files
+    
+    @staticmethod
+    def stream_signature(media_info):
+        """
+        Tupla con los parámetros de SIGNATURE_FIELDS leídos del JSON de
+        ffprobe. None si no hay datos o no tiene video.
+        """
+        if media_info is None or not media_info.probe_data:
+            return None
+        video = audio = None
+        for stream in media_info.probe_data.get('streams', []):
+            if stream.get('codec_type') == 'video' and video is None:
+                if not (stream.get('disposition') or {}).get('attached_pic'):
+                    video = stream
+            elif stream.get('codec_type') == 'audio' and audio is None:
+                audio = stream
+        if video is None:
+            return None
+        audio = audio or {}
+        return (
+            video.get('codec_name'),
+            video.get('profile'),
+            video.get('pix_fmt'),
+            video.get('width'),
+            video.get('height'),
+            video.get('r_frame_rate'),
+            video.get('time_base'),
+            audio.get('codec_name'),
+            audio.get('sample_rate'),
+            audio.get('channels'),
+        )
+    
+    @staticmethod
+    def _signatures(input_files, media_infos):
+        """Firma de cada entrada (sondea en paralelo las que no tienen el JSON de ffprobe)"""
+        missing = [index for index, info in enumerate(media_infos) if info is None or not info.probe_data]
+        if missing:
+            probed = MediaProbe.probe_many(
+                [input_files[index] for index in missing], fields=VideoJoiner.SIGNATURE_PROBE_FIELDS
+            )
+            for index, media_info in zip(missing, probed):
+                media_infos[index] = media_info or media_infos[index]
+        return [VideoJoiner.stream_signature(media_info) for media_info in media_infos]
+    
+    @staticmethod
+    def _majority_signature(signatures):
+        """
+        Firma compartida por al menos dos entradas y la mitad de ellas (la del
+        primer video en caso de empate). None si alguna no se pudo leer o no
+        hay mayoría.
+        """
+        if not signatures or None in signatures:
+            return None
+        counts = Counter(signatures)
+        best = max(counts.values())
+        if best < 2 or best * 2 < len(signatures):
+            return None
+        if counts[signatures[0]] == best:
+            return signatures[0]
+        return next(signature for signature in signatures if counts[signature] == best)
+    
+    @staticmethod
+    def _normalize_target(signatures, encoder='libx264'):
+        """
+        Firma común a la que se adaptan todas las entradas cuando no hay
+        mayoría: la resolución y los FPS más frecuentes (los del primer video
+        en caso de empate), el codec del codificador elegido, yuv420p y AAC
+        48 kHz estéreo si alguna entrada tiene audio. Sin perfil ni timebase
+        fijos, así que ninguna entrada coincide y todas se recodifican con el
+        mismo comando. None si alguna firma no se pudo leer.
+        """
+        if not signatures or None in signatures:
+            return None
+        fields = [dict(zip(VideoJoiner.SIGNATURE_FIELDS, signature)) for signature in signatures]
+        width, height = Counter((f['width'], f['height']) for f in fields).most_common(1)[0][0]
+        frame_rate = Counter(f['frame_rate'] for f in fields).most_common(1)[0][0]
+        has_audio = any(f['audio_codec'] for f in fields)
+        target = {
+            'video_codec': StreamPlanner.ENCODER_CODECS.get(encoder, 'h264'),
+            'profile': None,
+            'pix_fmt': 'yuv420p',
+            # Dimensiones pares (requisito de yuv420p)
+            'width': int(width) // 2 * 2,
+            'height': int(height) // 2 * 2,
+            'frame_rate': frame_rate,
+            'time_base': None,
+            'audio_codec': 'aac' if has_audio else None,
+            'sample_rate': 48000 if has_audio else None,
+            'channels': 2 if has_audio else None,
+        }
+        return tuple(target[field] for field in VideoJoiner.SIGNATURE_FIELDS)
+    
+    @staticmethod
+    def _differences(signature, reference):
+        """Nombres de los parámetros que difieren (para el log)"""
+        return ", ".join(
+            field for field, value, expected in zip(VideoJoiner.SIGNATURE_FIELDS, signature, reference)
+            if value != expected
+        )
+    
+    @staticmethod
+    def _profile_arg(profile):
+        """Perfil de ffprobe ('High', 'Main 10', 'Constrained Baseline') -> valor de -profile:v"""
+        value = profile.lower().replace(' ', '').replace(':', '')
+        if value.startswith('profile'):
+            return value[len('profile'):]
+        return {'constrainedbaseline': 'baseline', 'high444predictive': 'high444'}.get(value, value)
+    
+    @staticmethod
+    def _total_duration(media_infos):
+        return sum(info.duration for info in media_infos if info)
+    
     @staticmethod
     def join_videos(input_files, output_file, encoder='libx264', preset='medium', crf=23):
         """Une múltiples videos en uno solo"""
@@ -13,26 +330,7 @@ class VideoJoiner:
             # Crear archivo de lista temporal
             list_file = VideoJoiner._create_concat_list(input_files)
             
-            cmd = [
-                'ffmpeg',
-                '-f', 'concat',
-                '-safe', '0',
-                '-i', list_file
-            ]
-            
-            if 'nvenc' in encoder:
-                cmd.extend(['-hwaccel', 'cuda'])
-            
-            cmd.extend([
-                '-c:v', encoder,
-                '-preset', preset,
-                '-crf', str(crf),
-                '-c:a', 'aac',
-                '-b:a', '192k',
-                '-progress', 'pipe:2',
-                output_file,
-                '-y'
-            ])
+            cmd = VideoJoiner.build_join_command(list_file, output_file, encoder, preset, crf)
             
             process = subprocess.Popen(
                 cmd,
@@ -64,62 +362,83 @@ class VideoJoiner:
         return list_file
     
     @staticmethod
-    def check_compatibility(input_files):
-        """Verifica si los videos son compatibles para unir"""
+    def check_compatibility(input_files, media_infos=None):
+        """
+        Verifica si los videos son compatibles para unir.
+        media_infos: MediaInfo ya obtenidos, en el mismo orden (evita sondear de nuevo)
+        """
+        if media_infos is None:
+            compatible, message, _ = VideoJoiner.probe_and_check(input_files)
+            return compatible, message
+        
         if not input_files or len(input_files) < 2:
             return False, "Se necesitan al menos 2 videos"
         
-        # Obtener información del primer video
-        first_info = VideoJoiner._get_video_info(input_files[0])
-        if not first_info:
-            return False, "No se pudo leer el primer video"
+        media_infos = (
+            MediaProbe.ensure(file, media_info, VideoJoiner.INFO_FIELDS)
+            for file, media_info in zip(input_files, media_infos)
+        )
+        compatible, message, _ = VideoJoiner._check_sequence(enumerate(media_infos))
+        return compatible, message
+    
+    @staticmethod
+    def probe_and_check(input_files):
+        """
+        Sondea las entradas en paralelo y verifica su compatibilidad en orden,
+        deteniéndose en la primera incompatible (no se sondea el resto).
+        Retorna (compatible, mensaje, media_infos sondeados hasta ese punto).
+        """
+        if not input_files or len(input_files) < 2:
+            return False, "Se necesitan al menos 2 videos", []
+        
+        probes = MediaProbe.iter_probe(input_files, fields=VideoJoiner.INFO_FIELDS)
+        try:
+            return VideoJoiner._check_sequence(probes)
+        finally:
+            probes.close()
+    
+    @staticmethod
+    def _check_sequence(probes):
+        """Compara cada (índice, MediaInfo) con el primero. Retorna (compatible, mensaje, media_infos)"""
+        media_infos = []
+        first_info = None
         
-        # Comparar con los demás
-        for i, file in enumerate(input_files[1:], 2):
-            info = VideoJoiner._get_video_info(file)
+        for index, media_info in probes:
+            media_infos.append(media_info)
+            info = VideoJoiner._video_info(media_info)
+            
+            # Obtener información del primer video
+            if index == 0:
+                if not info:
+                    return False, "No se pudo leer el primer video", media_infos
+                first_info = info
+                continue
+            
+            # Comparar con los demás
             if not info:
-                return False, f"No se pudo leer el video {i}"
+                return False, f"No se pudo leer el video {index + 1}", media_infos
             
             # Verificar dimensiones
             if info['width'] != first_info['width'] or info['height'] != first_info['height']:
-                return False, f"Video {i} tiene diferente resolución"
+                return False, f"Video {index + 1} tiene diferente resolución", media_infos
             
             # Verificar FPS (con tolerancia)
             if abs(info['fps'] - first_info['fps']) > 1:
-                return False, f"Video {i} tiene diferente FPS"
+                return False, f"Video {index + 1} tiene diferente FPS", media_infos
         
-        return True, "Videos compatibles"
+        return True, "Videos compatibles", media_infos
     
     @staticmethod
-    def _get_video_info(file_path):
+    def _get_video_info(file_path, media_info=None):
         """Obtiene información básica del video"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,r_frame_rate',
-                '-of', 'csv=p=0',
-                file_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            parts = result.stdout.strip().split(',')
-            
-            if len(parts) >= 3:
-                width = int(parts[0])
-                height = int(parts[1])
-                fps_str = parts[2]
-                
-                # Parse FPS
-                if '/' in fps_str:
-                    num, den = fps_str.split('/')
-                    fps = float(num) / float(den)
-                else:
-                    fps = float(fps_str)
-                
-                return {'width': width, 'height': height, 'fps': fps}
-            
-            return None
+            return VideoJoiner._video_info(MediaProbe.ensure(file_path, media_info, VideoJoiner.INFO_FIELDS))
         except:
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def _video_info(media_info):
+        """Ancho, alto y FPS de un MediaInfo (None si falta alguno)"""
+        if media_info and media_info.width and media_info.height and media_info.fps:
+            return {'width': media_info.width, 'height': media_info.height, 'fps': media_info.fps}
+        return None
\ No newline at end of file
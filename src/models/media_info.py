@@ -0,0 +1,144 @@
+"""Modelo inmutable con los metadatos de un archivo multimedia"""
+import os
+
+
+class MediaInfo:
+    """
+    Metadatos de un archivo obtenidos de un único sondeo (cabecera del
+    contenedor, MediaInfo o el JSON completo de ffprobe; ver `source`).
+
+    Es inmutable: se crea una vez por entrada y se pasa a lo largo del
+    pipeline (threads, core/, cola) para no volver a sondear.
+    Los valores desconocidos quedan en 0 / None.
+    """
+
+    __slots__ = ('path', 'size', 'duration', 'format_name', 'bitrate',
+                 'video_codec', 'width', 'height', 'fps', 'video_bitrate', 'pix_fmt',
+                 'audio_codec', 'audio_bitrate', 'sample_rate', 'channels',
+                 'subtitle_streams', 'probe_data', 'source')
+
+    def __init__(self, path, size=0, duration=0.0, format_name=None, bitrate=0,
+                 video_codec=None, width=None, height=None, fps=None, video_bitrate=0, pix_fmt=None,
+                 audio_codec=None, audio_bitrate=0, sample_rate=None, channels=None,
+                 subtitle_streams=(), probe_data=None, source='ffprobe'):
+        values = {
+            'path': path,
+            'size': size,
+            'duration': duration,
+            'format_name': format_name,
+            'bitrate': bitrate,  # bits/s del contenedor
+            'video_codec': video_codec,
+            'width': width,
+            'height': height,
+            'fps': fps,
+            'video_bitrate': video_bitrate,  # bits/s del primer stream de video
+            'pix_fmt': pix_fmt,
+            'audio_codec': audio_codec,
+            'audio_bitrate': audio_bitrate,
+            'sample_rate': sample_rate,
+            'channels': channels,
+            # Tuplas (índice, codec, idioma)
+            'subtitle_streams': tuple(subtitle_streams),
+            # JSON original de ffprobe (solo lectura, para el análisis detallado)
+            'probe_data': probe_data,
+            # Backend que lo produjo: 'container', 'mediainfo' o 'ffprobe'
+            'source': source,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MediaInfo es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("MediaInfo es inmutable")
+
+    @property
+    def has_video(self):
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self):
+        return self.audio_codec is not None
+
+    @property
+    def resolution(self):
+        """(ancho, alto) o (None, None)"""
+        return self.width, self.height
+
+    def has_fields(self, fields):
+        """True si todos los campos indicados tienen un valor conocido (no vacío ni 0)"""
+        return all(getattr(self, field) for field in fields)
+
+    @staticmethod
+    def from_probe(path, data):
+        """Crea un MediaInfo a partir del JSON de ffprobe (-show_format -show_streams)"""
+        format_info = data.get('format', {})
+        video = audio = None
+        subtitles = []
+        for stream in data.get('streams', []):
+            codec_type = stream.get('codec_type')
+            if codec_type == 'video' and video is None:
+                video = stream
+            elif codec_type == 'audio' and audio is None:
+                audio = stream
+            elif codec_type == 'subtitle':
+                subtitles.append((
+                    str(stream.get('index', '')),
+                    stream.get('codec_name', ''),
+                    stream.get('tags', {}).get('language', 'unknown')
+                ))
+
+        size = MediaInfo._to_int(format_info.get('size'))
+        if not size and os.path.exists(path):
+            size = os.path.getsize(path)
+
+        video = video or {}
+        audio = audio or {}
+        return MediaInfo(
+            path,
+            size=size,
+            duration=MediaInfo._to_float(format_info.get('duration')),
+            format_name=format_info.get('format_name'),
+            bitrate=MediaInfo._to_int(format_info.get('bit_rate')),
+            video_codec=video.get('codec_name'),
+            width=MediaInfo._to_int(video.get('width')) or None,
+            height=MediaInfo._to_int(video.get('height')) or None,
+            fps=MediaInfo._parse_rate(video.get('r_frame_rate')),
+            video_bitrate=MediaInfo._to_int(video.get('bit_rate')),
+            pix_fmt=video.get('pix_fmt'),
+            audio_codec=audio.get('codec_name'),
+            audio_bitrate=MediaInfo._to_int(audio.get('bit_rate')),
+            sample_rate=MediaInfo._to_int(audio.get('sample_rate')) or None,
+            channels=MediaInfo._to_int(audio.get('channels')) or None,
+            subtitle_streams=subtitles,
+            probe_data=data
+        )
+
+    @staticmethod
+    def _parse_rate(value):
+        """'30000/1001' -> 29.97. None si no es válido"""
+        try:
+            if '/' in value:
+                num, den = value.split('/')
+                return float(num) / float(den) if float(den) else None
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
+
+    def __repr__(self):
+        return f"MediaInfo({os.path.basename(self.path)}, {self.width}x{self.height}, {self.duration:.2f}s)"
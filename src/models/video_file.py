@@ -4,29 +4,46 @@ import os
 class VideoFile:
     """Representa un archivo de video con su información"""
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, read_size=True):
         self.path = file_path
         self.name = os.path.basename(file_path)
         self.directory = os.path.dirname(file_path)
         self.extension = os.path.splitext(file_path)[1]
-        self.size = 0
+        self.size = None  # None hasta conocerlo (ver MetadataLoader)
         self.duration = 0
         self.codec = None
         self.resolution = None
         self.fps = None
         self.bitrate = None
+        self.media_info = None  # MediaInfo (un solo sondeo por archivo)
         self.status = 'Pendiente'
+        self.job_id = None  # id en JobStore (cola persistente)
         
-        # Calcular tamaño
-        if os.path.exists(file_path):
-            self.size = os.path.getsize(file_path)
+        # Calcular tamaño (read_size=False lo deja para un hilo en segundo plano)
+        if read_size:
+            self.size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    
+    def apply_metadata(self, size, media_info):
+        """Completa los campos con un MediaInfo ya obtenido (se reutiliza en los trabajos)"""
+        self.size = size
+        self.media_info = media_info
+        if media_info is None:
+            return
+        self.duration = media_info.duration
+        self.codec = media_info.video_codec
+        if media_info.width and media_info.height:
+            self.resolution = f"{media_info.width}x{media_info.height}"
+        self.fps = media_info.fps
+        self.bitrate = media_info.bitrate or None
     
     def get_size_mb(self):
         """Retorna el tamaño en MB"""
-        return self.size / (1024 * 1024)
+        return (self.size or 0) / (1024 * 1024)
     
     def get_size_formatted(self):
         """Retorna el tamaño formateado"""
+        if self.size is None:
+            return "…"
         mb = self.get_size_mb()
         if mb < 1024:
             return f"{mb:.2f} MB"
@@ -34,5 +51,25 @@ class VideoFile:
             gb = mb / 1024
             return f"{gb:.2f} GB"
     
+    def get_duration_formatted(self):
+        """Retorna la duración como H:MM:SS o M:SS"""
+        total = int(round(self.duration or 0))
+        hours, remainder = divmod(total, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes}:{seconds:02d}"
+    
+    def get_info_formatted(self):
+        """Resumen para la cola: tamaño · duración · resolución · codec"""
+        parts = [self.get_size_formatted()]
+        if self.duration:
+            parts.append(self.get_duration_formatted())
+        if self.resolution:
+            parts.append(self.resolution)
+        if self.codec:
+            parts.append(self.codec)
+        return " · ".join(parts)
+    
     def __repr__(self):
         return f"VideoFile({self.name})"
\ No newline at end of file
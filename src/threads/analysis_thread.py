@@ -2,15 +2,17 @@
 from PyQt6.QtCore import pyqtSignal
 from threads.base_thread import BaseThread
 from core.analyzer import VideoAnalyzer
+from core.media_probe import MediaProbe
 
 class AnalysisThread(BaseThread):
     """Thread para analizar videos sin bloquear UI"""
     
     analysis_complete = pyqtSignal(object)  # Envía el análisis completo
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, media_info=None):
         super().__init__()
         self.file_path = file_path
+        self.media_info = media_info
     
     def run(self):
         """Ejecuta el análisis"""
@@ -18,7 +20,10 @@ class AnalysisThread(BaseThread):
             self.emit_log(f"🔍 Analizando: {self.file_path}")
             self.emit_progress(10)
             
-            analysis = VideoAnalyzer.analyze(self.file_path)
+            # Se conserva el sondeo para reutilizarlo (p. ej. en la medición)
+            if self.media_info is None or self.media_info.probe_data is None:
+                self.media_info = MediaProbe.probe(self.file_path, timeout=30, fields=('probe_data',))
+            analysis = VideoAnalyzer.analyze(self.file_path, self.media_info)
             
             self.emit_progress(90)
             
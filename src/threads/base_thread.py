@@ -1,5 +1,8 @@
 """Thread base para todas las operaciones"""
 from PyQt6.QtCore import QThread, pyqtSignal
+from core.crf_optimizer import CRFOptimizer
+from core.ffmpeg_steps import StepProgress
+from core.process_supervisor import ProcessSupervisor
 
 class BaseThread(QThread):
     """Clase base para todos los threads"""
@@ -11,10 +14,91 @@ class BaseThread(QThread):
     def __init__(self):
         super().__init__()
         self.is_running = True
+        self.process = None
+        self._crf_optimizers = set()
     
     def stop(self):
         """Detiene el thread"""
         self.is_running = False
+        if self.process:
+            self.process.kill()
+        for optimizer in list(self._crf_optimizers):
+            optimizer.cancel()
+    
+    def optimize_crf(self, input_file, encoder, preset, fallback_crf, media_info=None, quality_target=None):
+        """
+        Busca el CRF del video codificando muestras (ver CRFOptimizer).
+        Retorna el CRF elegido o fallback_crf si no se pudo medir.
+        """
+        if not self.is_running:
+            return fallback_crf
+        
+        optimizer = CRFOptimizer(input_file, encoder, preset, target=quality_target, media_info=media_info)
+        self._crf_optimizers.add(optimizer)
+        # stop() pudo llegar entre la comprobación anterior y el registro
+        if not self.is_running:
+            optimizer.cancel()
+        try:
+            result = optimizer.optimize(log_callback=self.emit_log)
+        finally:
+            self._crf_optimizers.discard(optimizer)
+        
+        if result is None:
+            if self.is_running:
+                self.emit_log(f"   ⚠️ No se pudo medir la calidad, se usa CRF {fallback_crf}")
+            return fallback_crf
+        if not result['target_met']:
+            self.emit_log("   ⚠️ Ningún CRF alcanza el objetivo, se usa el de mayor calidad")
+        self.emit_log(f"   CRF elegido: {result['crf']} (configurado: {fallback_crf})")
+        return result['crf']
+    
+    def run_ffmpeg(self, cmd, duration=0, on_progress=None):
+        """
+        Ejecuta un comando FFmpeg bajo el supervisor compartido y espera a que
+        termine. El progreso llega por emit_progress (u on_progress) sin leer
+        stderr en este hilo. Retorna el código de salida.
+        """
+        self.process = ProcessSupervisor.default().spawn(
+            cmd, duration, on_progress=on_progress or self.emit_progress
+        )
+        # Si se canceló mientras arrancaba, stop() no alcanzó a verlo
+        if not self.is_running:
+            self.process.kill()
+        returncode = self.process.wait()
+        if self.process.error:
+            self.emit_log(f"❌ No se pudo iniciar FFmpeg: {self.process.error}")
+        return returncode
+    
+    def run_steps(self, steps):
+        """
+        Ejecuta en orden una lista de pasos (ver FFmpegSteps), incluidos los
+        que pida 'verify' al terminar, con el progreso ponderado entre todos.
+        Retorna True si todos terminaron bien.
+        """
+        steps = list(steps)
+        progress = StepProgress(steps)
+        index = 0
+        while index < len(steps) and self.is_running:
+            step = steps[index]
+            self.emit_log(f"   {step['label']}...")
+            returncode = self.run_ffmpeg(
+                step['cmd'],
+                step['duration'],
+                on_progress=lambda percent, index=index: self.emit_progress(progress.update(index, percent))
+            )
+            if returncode != 0:
+                return False
+            progress.update(index, 100)
+            
+            extra = step['verify']() if step.get('verify') and self.is_running else None
+            if extra:
+                steps.append(extra)
+                progress.extend(extra, index)
+            index += 1
+        if self.is_running:
+            # La reserva para un reintento que no hizo falta
+            self.emit_progress(100)
+        return self.is_running
     
     def emit_log(self, message):
         """Emite mensaje de log"""
@@ -26,4 +110,4 @@ class BaseThread(QThread):
     
     def emit_finished(self, success, message):
         """Emite señal de finalización"""
-        self.finished_signal.emit(success, message)
\ No newline at end of file
+        self.finished_signal.emit(success, message)
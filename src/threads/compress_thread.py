@@ -1,76 +1,83 @@
 """Thread para compresión de videos"""
 from threads.base_thread import BaseThread
-from utils.ffmpeg_wrapper import FFmpegWrapper
 from core.compressor import VideoCompressor
-import re
+from core.ffmpeg_steps import FFmpegSteps
+from core.media_probe import MediaProbe
 
 class CompressThread(BaseThread):
     """Thread para comprimir videos sin bloquear UI"""
     
-    def __init__(self, input_file, output_file, compression_mode, target_value, encoder='libx264', preset='medium'):
+    def __init__(self, input_file, output_file, compression_mode, target_value, encoder='libx264', preset='medium',
+                 media_info=None, two_pass=True):
         super().__init__()
         self.input_file = input_file
+        self.media_info = media_info
         self.output_file = output_file
         self.compression_mode = compression_mode  # 'size' o 'percentage'
         self.target_value = target_value
         self.encoder = encoder
         self.preset = preset
+        # Solo en modo 'size': primera pasada de análisis + comprobación del tamaño final
+        self.two_pass = two_pass
     
     def run(self):
         """Ejecuta la compresión"""
         try:
             self.emit_log(f"🗜️ Comprimiendo video...")
             
+            # Un único sondeo: sirve para el bitrate objetivo y para el progreso
+            fields = ('duration',) if self.compression_mode == 'size' else ('duration', 'video_bitrate')
+            media_info = MediaProbe.ensure(self.input_file, self.media_info, fields)
+            
             if self.compression_mode == 'size':
                 self.emit_log(f"   Tamaño objetivo: {self.target_value} MB")
-                process = VideoCompressor.compress_by_target_size(
+                steps, temp_files = VideoCompressor.prepare_target_size(
                     self.input_file,
                     self.output_file,
                     self.target_value,
                     self.encoder,
-                    self.preset
+                    self.preset,
+                    media_info,
+                    self.two_pass
                 )
+                if not steps:
+                    self.emit_finished(False, "Error al iniciar compresión")
+                    return
+                try:
+                    success = self.run_steps(steps)
+                finally:
+                    FFmpegSteps.remove_temp_files(temp_files)
+                self._finish(success)
+                return
             else:  # percentage
                 self.emit_log(f"   Reducción: {self.target_value}% del tamaño original")
-                process = VideoCompressor.compress_by_percentage(
+                cmd = VideoCompressor.build_percentage_command(
                     self.input_file,
                     self.output_file,
                     self.target_value,
                     self.encoder,
-                    self.preset
+                    self.preset,
+                    media_info
                 )
             
-            if not process:
+            if not cmd:
                 self.emit_finished(False, "Error al iniciar compresión")
                 return
             
-            # Obtener duración para progreso
-            duration = FFmpegWrapper.get_video_duration(self.input_file)
-            
-            # Monitorear progreso
-            for line in process.stderr:
-                if not self.is_running:
-                    process.kill()
-                    self.emit_finished(False, "Compresión cancelada")
-                    return
-                
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
+            duration = media_info.duration if media_info else 0
             
-            process.wait()
-            
-            if process.returncode == 0:
-                self.emit_progress(100)
-                self.emit_finished(True, "✅ Video comprimido exitosamente")
-            else:
-                self.emit_finished(False, "❌ Error comprimiendo video")
+            # El supervisor reporta el progreso
+            returncode = self.run_ffmpeg(cmd, duration)
+            self._finish(returncode == 0)
                 
         except Exception as e:
-            self.emit_finished(False, f"❌ Error: {str(e)}")
\ No newline at end of file
+            self.emit_finished(False, f"❌ Error: {str(e)}")
+    
+    def _finish(self, success):
+        if not self.is_running:
+            self.emit_finished(False, "Compresión cancelada")
+        elif success:
+            self.emit_progress(100)
+            self.emit_finished(True, "✅ Video comprimido exitosamente")
+        else:
+            self.emit_finished(False, "❌ Error comprimiendo video")
@@ -1,15 +1,25 @@
 """Thread para conversión de videos"""
 from threads.base_thread import BaseThread
 from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.media_probe import MediaProbe
+from core.segment_encoder import SegmentEncoder
+from core.job_history import JobHistory
 import os
-import re
+import time
 
 class ConversionThread(BaseThread):
     """Thread para ejecutar conversión sin bloquear la UI"""
     
-    def __init__(self, conversion_job):
+    def __init__(self, conversion_job, segment_workers=1, segment_time=60, auto_crf=False, quality_target=None):
         super().__init__()
         self.job = conversion_job
+        # segment_workers > 1 activa la codificación paralela por segmentos
+        self.segment_workers = segment_workers
+        self.segment_time = segment_time
+        self.segment_encoder = None
+        # Elegir el CRF por video con muestras en lugar del CRF fijo del trabajo
+        self.auto_crf = auto_crf
+        self.quality_target = quality_target
     
     def run(self):
         """Ejecuta la conversión"""
@@ -19,49 +29,83 @@ class ConversionThread(BaseThread):
             self.emit_log(f"   Codificador: {self.job.encoder}")
             self.emit_log(f"   Preset: {self.job.preset}")
             
-            # Obtener duración total del video
-            duration = FFmpegWrapper.get_video_duration(self.job.input_file.path)
+            # Obtener duración total del video (reutiliza el MediaInfo del archivo si ya existe)
+            video_file = self.job.input_file
+            if video_file.media_info is None:
+                video_file.media_info = MediaProbe.probe(video_file.path)
+            duration = FFmpegWrapper.get_video_duration(video_file.path, video_file.media_info)
             if duration > 0:
                 self.emit_log(f"   Duración: {duration:.2f} segundos")
             
-            # Iniciar conversión
-            process = FFmpegWrapper.convert_video(
+            if self.auto_crf:
+                self.job.crf = self.optimize_crf(
+                    video_file.path, self.job.encoder, self.job.preset, self.job.crf,
+                    video_file.media_info, self.quality_target
+                )
+                if not self.is_running:
+                    self.emit_finished(False, "Conversión cancelada")
+                    return
+            
+            if self.segment_workers > 1:
+                self._run_segmented()
+                return
+            
+            # Iniciar conversión (el supervisor reporta el progreso)
+            cmd = FFmpegWrapper.build_convert_command(
                 self.job.input_file.path,
                 self.job.output_file,
                 self.job.encoder,
                 self.job.preset,
                 self.job.crf
             )
+            started = time.monotonic()
+            returncode = self.run_ffmpeg(cmd, duration)
             
-            if not process:
-                self.emit_finished(False, "Error al iniciar FFmpeg")
-                return
-            
-            # Leer progreso
-            for line in process.stderr:
-                if not self.is_running:
-                    process.kill()
-                    self.emit_finished(False, "Conversión cancelada")
-                    return
-                
-                # Buscar tiempo actual en la salida de FFmpeg
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
-            
-            process.wait()
-            
-            if process.returncode == 0:
+            if not self.is_running:
+                self.emit_finished(False, "Conversión cancelada")
+            elif returncode == 0:
+                self._record_history(time.monotonic() - started)
                 self.emit_progress(100)
                 self.emit_finished(True, "✅ Conversión completada exitosamente")
             else:
                 self.emit_finished(False, "❌ Error durante la conversión")
                 
         except Exception as e:
-            self.emit_finished(False, f"❌ Error: {str(e)}")
\ No newline at end of file
+            self.emit_finished(False, f"❌ Error: {str(e)}")
+    
+    def _record_history(self, elapsed):
+        """Guarda velocidad y bitrate medidos para calibrar ConversionEstimator"""
+        JobHistory.default().record(
+            self.job.input_file.media_info, self.job.output_file,
+            self.job.encoder, self.job.preset, self.job.crf, elapsed
+        )
+    
+    def _run_segmented(self):
+        """Conversión dividiendo el video en segmentos codificados en paralelo"""
+        self.segment_encoder = SegmentEncoder(
+            self.job.input_file.path,
+            self.job.output_file,
+            self.job.encoder,
+            self.job.preset,
+            self.job.crf,
+            workers=self.segment_workers,
+            segment_time=self.segment_time,
+            media_info=self.job.input_file.media_info
+        )
+        
+        # Cancelado antes de crear el codificador
+        if not self.is_running:
+            self.emit_finished(False, "Conversión cancelada")
+            return
+        
+        success, message = self.segment_encoder.encode(
+            progress_callback=self.emit_progress,
+            log_callback=self.emit_log
+        )
+        self.emit_finished(success, message)
+    
+    def stop(self):
+        """Detiene la conversión (incluidos todos los segmentos)"""
+        super().stop()
+        if self.segment_encoder:
+            self.segment_encoder.cancel()
@@ -0,0 +1,52 @@
+"""Thread para medir tiempo y tamaño de conversión con muestras"""
+from PyQt6.QtCore import pyqtSignal
+from threads.base_thread import BaseThread
+from core.sample_estimator import SampleEstimator
+
+class SampleEstimateThread(BaseThread):
+    """Codifica muestras del archivo con cada configuración (ver SampleEstimator)"""
+    
+    estimate_ready = pyqtSignal(str, object)  # nombre de la configuración, resultado o None
+    
+    def __init__(self, file_path, configs, media_info=None, output_format='mp4'):
+        super().__init__()
+        self.file_path = file_path
+        # Tuplas (nombre, codificador, preset, CRF)
+        self.configs = configs
+        self.media_info = media_info
+        self.output_format = output_format
+        self.estimator = None
+    
+    def run(self):
+        """Mide cada configuración por turno (cada una ya usa todos los núcleos)"""
+        try:
+            self.emit_log("⏱️ Midiendo velocidad y tamaño con muestras...")
+            measured = 0
+            for position, (name, encoder, preset, crf) in enumerate(self.configs):
+                if not self.is_running:
+                    break
+                self.estimator = SampleEstimator(
+                    self.file_path, encoder, preset, crf, self.output_format, media_info=self.media_info
+                )
+                # stop() pudo cancelar el estimador anterior justo antes de crear este
+                if not self.is_running:
+                    break
+                result = self.estimator.measure(log_callback=self.emit_log)
+                if result is None and self.is_running:
+                    self.emit_log(f"   ⚠️ {name}: no se pudo medir")
+                measured += result is not None
+                self.estimate_ready.emit(name, result)
+                self.emit_progress(int((position + 1) * 100 / len(self.configs)))
+            
+            if not self.is_running:
+                self.emit_finished(False, "Medición cancelada")
+            else:
+                self.emit_finished(measured > 0, f"✅ Medición completada ({measured}/{len(self.configs)})")
+        except Exception as e:
+            self.emit_finished(False, f"❌ Error: {str(e)}")
+    
+    def stop(self):
+        """Detiene la medición en curso"""
+        super().stop()
+        if self.estimator:
+            self.estimator.cancel()
@@ -1,75 +1,103 @@
 """Thread para unir videos"""
 from PyQt6.QtCore import pyqtSignal
 from threads.base_thread import BaseThread
-from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.ffmpeg_steps import FFmpegSteps
 from core.video_joiner import VideoJoiner
-import re
+from core.media_probe import MediaProbe
+from core.process_supervisor import ProcessSupervisor
 import os
+import queue
+import threading
 
 class JoinThread(BaseThread):
     """Thread para unir videos sin bloquear UI"""
     
-    def __init__(self, input_files, output_file, encoder='libx264', preset='medium', crf=23):
+    def __init__(self, input_files, output_file, encoder='libx264', preset='medium', crf=23, media_infos=None,
+                 stream_copy=True, normalize=True, workers=None):
         super().__init__()
         self.input_files = input_files
+        self.media_infos = media_infos
         self.output_file = output_file
         self.encoder = encoder
         self.preset = preset
         self.crf = crf
-        self.temp_list_file = None
+        # Unir sin recodificar cuando las entradas lo permitan
+        self.stream_copy = stream_copy
+        # Si las entradas no son compatibles, adaptarlas en paralelo en lugar de abortar
+        self.normalize = normalize
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.temp_files = []
+        
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._step_progress = {}  # índice de paso -> porcentaje
+        self._weights = []
+        self._total_weight = 1
+    
+    def stop(self):
+        """Detiene el thread y todos los procesos en paralelo"""
+        super().stop()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
     
     def run(self):
         """Ejecuta la unión"""
         try:
             self.emit_log(f"🔗 Uniendo {len(self.input_files)} videos...")
             
-            # Verificar compatibilidad
-            compatible, message = VideoJoiner.check_compatibility(self.input_files)
-            if not compatible:
+            # Un sondeo por entrada (en paralelo): compatibilidad y duración total salen de él
+            if self.media_infos:
+                compatible, message = VideoJoiner.check_compatibility(self.input_files, self.media_infos)
+                media_infos = self.media_infos
+            elif self.normalize:
+                # Se normaliza igual: hacen falta todas las entradas, no cortar en la primera distinta
+                media_infos = MediaProbe.probe_many(self.input_files, fields=VideoJoiner.SIGNATURE_PROBE_FIELDS)
+                compatible, message = VideoJoiner.check_compatibility(self.input_files, media_infos)
+            else:
+                compatible, message, media_infos = VideoJoiner.probe_and_check(self.input_files)
+            if not compatible and not self.normalize:
                 self.emit_finished(False, f"❌ Videos incompatibles: {message}")
                 return
             
-            self.emit_log(f"✅ {message}")
+            self.emit_log(f"✅ {message}" if compatible else f"⚠️ {message}: se normalizarán")
             
-            # Unir videos
-            process, self.temp_list_file = VideoJoiner.join_videos(
+            steps, self.temp_files, description = VideoJoiner.prepare_join(
                 self.input_files,
                 self.output_file,
+                media_infos,
                 self.encoder,
                 self.preset,
-                self.crf
+                self.crf,
+                self.stream_copy,
+                self.normalize
             )
+            self.emit_log(f"   {description}")
             
-            if not process:
-                self.emit_finished(False, "Error al iniciar unión")
-                return
-            
-            # Calcular duración total aproximada
-            total_duration = sum(FFmpegWrapper.get_video_duration(f) for f in self.input_files)
+            # Progreso global ponderado por la duración de cada paso
+            self._weights = FFmpegSteps.weights(steps)
+            self._total_weight = sum(self._weights)
             
-            # Monitorear progreso
-            for line in process.stderr:
+            success = True
+            position = 0
+            for group in FFmpegSteps.groups(steps):
                 if not self.is_running:
-                    process.kill()
-                    self._cleanup()
-                    self.emit_finished(False, "Unión cancelada")
-                    return
-                
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and total_duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / total_duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
-            
-            process.wait()
+                    break
+                indices = range(position, position + len(group))
+                position += len(group)
+                if len(group) == 1:
+                    success = self._run_step(indices[0], group[0])
+                else:
+                    success = self._run_parallel(list(zip(indices, group)))
+                if not success:
+                    break
             
             self._cleanup()
             
-            if process.returncode == 0:
+            if not self.is_running:
+                self.emit_finished(False, "Unión cancelada")
+            elif success:
                 self.emit_progress(100)
                 self.emit_finished(True, "✅ Videos unidos exitosamente")
             else:
@@ -79,10 +107,68 @@ class JoinThread(BaseThread):
             self._cleanup()
             self.emit_finished(False, f"❌ Error: {str(e)}")
     
+    def _run_step(self, index, step):
+        """Ejecuta un paso y espera a que termine"""
+        self.emit_log(f"   {step['label']}...")
+        returncode = self.run_ffmpeg(
+            step['cmd'],
+            step['duration'],
+            on_progress=lambda percent: self._report_progress(index, percent)
+        )
+        self._report_progress(index, 100 if returncode == 0 else 0)
+        return returncode == 0
+    
+    def _run_parallel(self, indexed_steps):
+        """Ejecuta pasos independientes con como mucho self.workers procesos a la vez"""
+        self.emit_log(f"   {len(indexed_steps)} videos a adaptar, {min(self.workers, len(indexed_steps))} en paralelo")
+        pending = list(reversed(indexed_steps))
+        finished = queue.Queue()
+        active = {}
+        success = True
+        
+        while pending or active:
+            while success and self.is_running and pending and len(active) < self.workers:
+                index, step = pending.pop()
+                self.emit_log(f"   {step['label']}...")
+                process = ProcessSupervisor.default().spawn(
+                    step['cmd'],
+                    step['duration'],
+                    on_progress=lambda percent, index=index: self._report_progress(index, percent),
+                    on_exit=lambda returncode, index=index: finished.put((index, returncode))
+                )
+                with self._lock:
+                    self._processes.add(process)
+                active[index] = process
+                # Si se canceló mientras arrancaba, stop() no alcanzó a verlo
+                if not self.is_running:
+                    process.kill()
+            
+            if not active:
+                break
+            
+            index, returncode = finished.get()
+            process = active.pop(index)
+            with self._lock:
+                self._processes.discard(process)
+            if returncode == 0:
+                self._report_progress(index, 100)
+            elif success:
+                success = False
+                if process.error:
+                    self.emit_log(f"❌ No se pudo iniciar FFmpeg: {process.error}")
+                # Un video que falla invalida la unión: no seguir con el resto
+                for other in active.values():
+                    other.kill()
+        
+        return success and self.is_running
+    
+    def _report_progress(self, index, percent):
+        with self._lock:
+            self._step_progress[index] = percent
+            done = sum(self._weights[i] * p / 100 for i, p in self._step_progress.items())
+        self.emit_progress(min(100, int(done * 100 / self._total_weight)))
+    
     def _cleanup(self):
         """Limpia archivos temporales"""
-        if self.temp_list_file and os.path.exists(self.temp_list_file):
-            try:
-                os.remove(self.temp_list_file)
-            except:
-                pass
\ No newline at end of file
+        FFmpegSteps.remove_temp_files(self.temp_files)
+        self.temp_files = []
@@ -0,0 +1,55 @@
+"""Carga en segundo plano de los metadatos de los videos en cola"""
+from PyQt6.QtCore import QObject, pyqtSignal
+from constants import PROBE_WORKERS
+from core.media_probe import MediaProbe
+import os
+import queue
+import threading
+
+class MetadataLoader(QObject):
+    """
+    Sondea los VideoFile agregados a la cola fuera del hilo de la UI.
+
+    request() retorna de inmediato; hasta `workers` hilos (daemon, creados
+    bajo demanda) leen tamaño y metadatos y emiten metadata_ready, que Qt
+    entrega en el hilo de la UI. Ahí se aplica el resultado al VideoFile,
+    de modo que la UI y los threads de conversión lo leen sin carreras.
+    """
+    
+    metadata_ready = pyqtSignal(object, object, object)  # VideoFile, tamaño, MediaInfo o None
+    
+    # Lo que muestra la cola; la cabecera del contenedor suele bastar
+    FIELDS = ('duration', 'width', 'height', 'video_codec')
+    
+    def __init__(self, workers=PROBE_WORKERS, parent=None):
+        super().__init__(parent)
+        self.workers = max(1, workers)
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+    
+    def request(self, video_file):
+        """Encola un VideoFile para completar sus metadatos"""
+        self._queue.put(video_file)
+        with self._lock:
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='metadata-loader', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+    
+    def _work(self):
+        while True:
+            video_file = self._queue.get()
+            try:
+                size = os.path.getsize(video_file.path)
+            except OSError:
+                size = 0
+            
+            media_info = None
+            if size:
+                try:
+                    media_info = MediaProbe.probe(video_file.path, fields=MetadataLoader.FIELDS)
+                except Exception as e:
+                    print(f"Error leyendo metadatos de {video_file.path}: {e}")
+            
+            self.metadata_ready.emit(video_file, size, media_info)
@@ -2,8 +2,8 @@
 from PyQt6.QtCore import pyqtSignal
 from threads.base_thread import BaseThread
 from core.multi_format_converter import MultiFormatConverter
+from core.process_supervisor import ProcessSupervisor
 from utils.ffmpeg_wrapper import FFmpegWrapper
-import re
 import os
 
 class MultiFormatThread(BaseThread):
@@ -12,11 +12,14 @@ class MultiFormatThread(BaseThread):
     format_progress = pyqtSignal(str, int)  # formato, progreso
     format_finished = pyqtSignal(str, bool, str)  # formato, success, message
     
-    def __init__(self, input_file, output_configs, base_output_name=None):
+    def __init__(self, input_file, output_configs, base_output_name=None, single_decode=True, media_info=None):
         super().__init__()
+        self.media_info = media_info
         self.input_file = input_file
         self.output_configs = output_configs
         self.base_output_name = base_output_name or os.path.splitext(input_file)[0]
+        # single_decode: un solo FFmpeg decodifica una vez y escribe todos los formatos
+        self.single_decode = single_decode
         self.processes = []
     
     def run(self):
@@ -25,71 +28,121 @@ class MultiFormatThread(BaseThread):
             self.emit_log(f"🎬 Iniciando conversión a {len(self.output_configs)} formatos...")
             
             # Obtener duración
-            duration = FFmpegWrapper.get_video_duration(self.input_file)
+            duration = FFmpegWrapper.get_video_duration(self.input_file, self.media_info)
             
-            # Iniciar todas las conversiones
-            self.processes = MultiFormatConverter.convert_to_formats(
-                self.input_file,
-                self.output_configs,
-                self.base_output_name
-            )
-            
-            self.emit_log(f"✅ {len(self.processes)} conversiones iniciadas")
-            
-            # Monitorear progreso de cada proceso
-            active_processes = self.processes.copy()
-            
-            while active_processes and self.is_running:
-                for proc_info in active_processes[:]:
-                    process = proc_info['process']
-                    format_name = proc_info['config']['format']
-                    
-                    # Leer una línea
-                    try:
-                        line = process.stderr.readline()
-                        if line:
-                            # Buscar progreso
-                            time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                            if time_match and duration > 0:
-                                hours = int(time_match.group(1))
-                                minutes = int(time_match.group(2))
-                                seconds = float(time_match.group(3))
-                                current_time = hours * 3600 + minutes * 60 + seconds
-                                
-                                progress_percent = int((current_time / duration) * 100)
-                                self.format_progress.emit(format_name, min(progress_percent, 100))
-                    except:
-                        pass
-                    
-                    # Verificar si terminó
-                    if process.poll() is not None:
-                        if process.returncode == 0:
-                            self.format_progress.emit(format_name, 100)
-                            self.format_finished.emit(format_name, True, f"✅ {format_name.upper()} completado")
-                            self.emit_log(f"✅ Formato {format_name.upper()} completado")
-                        else:
-                            self.format_finished.emit(format_name, False, f"❌ {format_name.upper()} falló")
-                            self.emit_log(f"❌ Formato {format_name.upper()} falló")
-                        
-                        active_processes.remove(proc_info)
+            if self.single_decode and len(self.output_configs) > 1:
+                success = self._run_single(duration)
+            else:
+                success = self._run_separate(self.output_configs, duration)
             
-            if self.is_running:
+            if not self.is_running:
+                self.emit_finished(False, "Conversiones canceladas")
+            elif success:
                 self.emit_progress(100)
                 self.emit_finished(True, "✅ Todas las conversiones completadas")
             else:
-                # Cancelar procesos restantes
-                for proc_info in active_processes:
-                    proc_info['process'].kill()
-                self.emit_finished(False, "Conversiones canceladas")
+                self.emit_finished(False, "❌ Algunas conversiones fallaron")
                 
         except Exception as e:
+            self.stop()
             self.emit_finished(False, f"❌ Error: {str(e)}")
     
+    def _run_single(self, duration):
+        """Todos los formatos en un único proceso: una decodificación y una lectura"""
+        command = MultiFormatConverter.build_single_command(
+            self.input_file,
+            self.output_configs,
+            self.base_output_name
+        )
+        format_names = [output['config']['format'] for output in command['outputs']]
+        
+        def on_progress(percent):
+            # Las salidas avanzan juntas: el mismo cuadro decodificado va a todas
+            for name in format_names:
+                self.format_progress.emit(name, percent)
+            self.emit_progress(percent)
+        
+        self.emit_log("✅ Conversión iniciada (decodificación única para todos los formatos)")
+        process = self._spawn(command['cmd'], duration, on_progress)
+        process.wait()
+        
+        if not self.is_running:
+            return False
+        
+        if process.returncode == 0:
+            for name in format_names:
+                self._on_format_exit(name, 0)
+            return True
+        
+        # Un solo código de salida no indica qué formato falló:
+        # repetir por separado para reportar cada uno
+        self.emit_log("⚠️ La conversión combinada falló, reintentando cada formato por separado...")
+        return self._run_separate(self.output_configs, duration)
+    
+    def _run_separate(self, output_configs, duration):
+        """Un proceso por formato (vigilados en paralelo por el supervisor)"""
+        commands = MultiFormatConverter.build_commands(
+            self.input_file,
+            output_configs,
+            self.base_output_name
+        )
+        
+        # El supervisor lee cada stderr por separado, así un formato lento
+        # no frena a los demás
+        results = {}
+        progress = {command['config']['format']: 0 for command in commands}
+        started = []
+        
+        def on_progress(name, percent):
+            self.format_progress.emit(name, percent)
+            # Barra global: promedio de todos los formatos
+            previous = sum(progress.values()) // len(progress)
+            progress[name] = percent
+            overall = sum(progress.values()) // len(progress)
+            if overall != previous:
+                self.emit_progress(overall)
+        
+        for command in commands:
+            format_name = command['config']['format']
+            
+            def on_exit(returncode, name=format_name):
+                results[name] = returncode == 0
+                self._on_format_exit(name, returncode)
+            
+            started.append(self._spawn(
+                command['cmd'],
+                duration,
+                lambda percent, name=format_name: on_progress(name, percent),
+                on_exit
+            ))
+        
+        self.emit_log(f"✅ {len(started)} conversiones iniciadas")
+        
+        for process in started:
+            process.wait()
+        
+        return bool(results) and all(results.values())
+    
+    def _spawn(self, cmd, duration, on_progress, on_exit=None):
+        process = ProcessSupervisor.default().spawn(cmd, duration, on_progress=on_progress, on_exit=on_exit)
+        self.processes.append(process)
+        # Si se canceló mientras arrancaba, stop() no alcanzó a verlo
+        if not self.is_running:
+            process.kill()
+        return process
+    
+    def _on_format_exit(self, format_name, returncode):
+        """Notifica la finalización de un formato"""
+        if returncode == 0:
+            self.format_progress.emit(format_name, 100)
+            self.format_finished.emit(format_name, True, f"✅ {format_name.upper()} completado")
+            self.emit_log(f"✅ Formato {format_name.upper()} completado")
+        elif self.is_running:
+            self.format_finished.emit(format_name, False, f"❌ {format_name.upper()} falló")
+            self.emit_log(f"❌ Formato {format_name.upper()} falló")
+    
     def stop(self):
         """Detiene todas las conversiones"""
         self.is_running = False
-        for proc_info in self.processes:
-            try:
-                proc_info['process'].kill()
-            except:
-                pass
\ No newline at end of file
+        for process in self.processes:
+            process.kill()
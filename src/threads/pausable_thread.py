@@ -2,21 +2,27 @@
 from PyQt6.QtCore import pyqtSignal
 from threads.base_thread import BaseThread
 from core.pausable_converter import PausableConverter
+from core.progress_parser import ProgressParser
 from utils.ffmpeg_wrapper import FFmpegWrapper
-import re
+import threading
 
 class PausableConversionThread(BaseThread):
     """Thread para conversión con pausa/reanudación"""
     
     status_changed = pyqtSignal(str)  # 'running', 'paused', 'stopped'
     
-    def __init__(self, input_file, output_file, encoder='libx264', preset='medium', crf=23):
+    def __init__(self, input_file, output_file, encoder='libx264', preset='medium', crf=23, resumable=False):
         super().__init__()
-        self.converter = PausableConverter(input_file, output_file, encoder, preset, crf)
+        self.converter = PausableConverter(input_file, output_file, encoder, preset, crf, resumable=resumable)
         self.input_file = input_file
+        self.resume_event = threading.Event()
     
     def run(self):
         """Ejecuta la conversión"""
+        if self.converter.resumable:
+            self._run_resumable()
+            return
+        
         try:
             self.emit_log(f"🎬 Iniciando conversión pausable...")
             
@@ -32,26 +38,19 @@ class PausableConversionThread(BaseThread):
                 return
             
             # Monitorear progreso
-            for line in process.stderr:
-                if not self.is_running:
-                    self.converter.stop()
-                    self.emit_finished(False, "Conversión cancelada")
-                    return
-                
-                # Verificar si está pausado (el proceso sigue pero no avanza)
-                if self.converter.is_paused:
-                    continue
-                
-                # Buscar tiempo actual
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
+            def on_event(event):
+                # Si está pausado el proceso sigue pero no avanza
+                if not self.converter.is_paused and duration > 0:
+                    self.emit_progress(event.percent)
+            
+            completed = ProgressParser.pump(
+                process.stderr, ProgressParser(duration), on_event,
+                should_stop=lambda: not self.is_running
+            )
+            if not completed:
+                self.converter.stop()
+                self.emit_finished(False, "Conversión cancelada")
+                return
             
             process.wait()
             
@@ -67,6 +66,48 @@ class PausableConversionThread(BaseThread):
             self.status_changed.emit('stopped')
             self.emit_finished(False, f"❌ Error: {str(e)}")
     
+    def _run_resumable(self):
+        """Conversión por segmentos: la pausa libera FFmpeg y se reanuda desde el checkpoint"""
+        try:
+            if self.converter.has_checkpoint():
+                self.emit_log("♻️ Reanudando conversión desde el último checkpoint...")
+            else:
+                self.emit_log("🎬 Iniciando conversión reanudable...")
+            
+            while True:
+                self.status_changed.emit('running')
+                success, message = self.converter.run_resumable(self.emit_progress, self.emit_log)
+                
+                if success:
+                    self.emit_progress(100)
+                    self.status_changed.emit('stopped')
+                    self.emit_finished(True, message)
+                    return
+                
+                if not self.is_running:
+                    self.status_changed.emit('stopped')
+                    self.emit_finished(False, "Conversión detenida (se puede reanudar más tarde)")
+                    return
+                
+                # Una reanudación rápida pudo llegar antes de que terminara la pausa
+                if not self.converter.is_paused and not self.resume_event.is_set():
+                    self.status_changed.emit('stopped')
+                    self.emit_finished(False, message)
+                    return
+                
+                # Pausado: sin procesos FFmpeg vivos hasta reanudar o detener
+                self.resume_event.wait()
+                self.resume_event.clear()
+                
+                if not self.is_running:
+                    self.status_changed.emit('stopped')
+                    self.emit_finished(False, "Conversión detenida (se puede reanudar más tarde)")
+                    return
+        
+        except Exception as e:
+            self.status_changed.emit('stopped')
+            self.emit_finished(False, f"❌ Error: {str(e)}")
+    
     def pause_conversion(self):
         """Pausa la conversión"""
         if self.converter.pause():
@@ -80,10 +121,12 @@ class PausableConversionThread(BaseThread):
         if self.converter.resume():
             self.status_changed.emit('running')
             self.emit_log("▶️ Conversión reanudada")
+            self.resume_event.set()
             return True
         return False
     
     def stop(self):
         """Detiene la conversión"""
         self.is_running = False
-        self.converter.stop()
\ No newline at end of file
+        self.converter.stop()
+        self.resume_event.set()
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Agrupador de señales de progreso hacia la UI"""
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from constants import PROGRESS_UPDATE_HZ
+
+class ProgressCoalescer(QObject):
+    """
+    Recibe el progreso de los threads (en el hilo de la UI) y lo reenvía a
+    lo sumo rate_hz veces por segundo: solo el último valor de cada trabajo
+    y todos los cambios en un único lote por tick, para que muchos trabajos
+    simultáneos no saturen el event loop de Qt con repintados.
+    """
+    
+    items_updated = pyqtSignal(dict)  # index -> porcentaje
+    overall_updated = pyqtSignal(int)
+    
+    def __init__(self, rate_hz=PROGRESS_UPDATE_HZ, parent=None):
+        super().__init__(parent)
+        self._pending = {}
+        self._overall = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate_hz)
+    
+    def set_rate(self, rate_hz):
+        """Cambia la frecuencia máxima de actualización"""
+        self._timer.setInterval(max(int(1000 / max(rate_hz, 1)), 1))
+    
+    def push_item(self, index, value):
+        """Registra el último progreso de un trabajo"""
+        self._pending[index] = value
+        self._schedule()
+    
+    def push_overall(self, value):
+        """Registra el último progreso global"""
+        self._overall = value
+        self._schedule()
+    
+    def flush(self):
+        """Envía lo acumulado (y detiene el timer si no hay nada más)"""
+        if not self._pending and self._overall is None:
+            self._timer.stop()
+            return
+        
+        if self._pending:
+            values, self._pending = self._pending, {}
+            self.items_updated.emit(values)
+        if self._overall is not None:
+            overall, self._overall = self._overall, None
+            self.overall_updated.emit(overall)
+    
+    def clear(self):
+        """Descarta lo pendiente (p. ej. al reiniciar la cola)"""
+        self._pending = {}
+        self._overall = None
+        self._timer.stop()
+    
+    def _schedule(self):
+        # El timer solo corre mientras llegan datos
+        if not self._timer.isActive():
+            self._timer.start()
@@ -0,0 +1,33 @@
+"""Thread para planificar la cola antes de lanzarla"""
+from PyQt6.QtCore import pyqtSignal
+from threads.base_thread import BaseThread
+from core.queue_planner import QueuePlanner
+
+class QueuePlanThread(BaseThread):
+    """Ejecuta QueuePlanner fuera de la UI (puede sondear con ffprobe cada archivo)"""
+    
+    plan_ready = pyqtSignal(object, object)  # videos planificados, plan (o None si falló)
+    
+    def __init__(self, video_files, settings):
+        super().__init__()
+        self.video_files = video_files
+        self.settings = settings
+    
+    def run(self):
+        """Simula la cola con la configuración pedida"""
+        try:
+            plan = QueuePlanner.plan(
+                self.video_files,
+                self.settings["output_folder"],
+                self.settings["encoder"],
+                self.settings["preset"],
+                self.settings["crf"],
+                self.settings["format"],
+                self.settings.get("max_workers", 1),
+                stream_copy=self.settings.get("stream_copy", False),
+                auto_crf=self.settings.get("auto_crf", False)
+            )
+        except Exception as e:
+            self.emit_log(f"⚠️ No se pudo planificar la cola: {str(e)}")
+            plan = None
+        self.plan_ready.emit(self.video_files, plan)
@@ -2,18 +2,27 @@
 from PyQt6.QtCore import pyqtSignal
 from threads.base_thread import BaseThread
 from utils.ffmpeg_wrapper import FFmpegWrapper
+from core.media_probe import MediaProbe
+from core.stream_planner import StreamPlanner
+from core.process_supervisor import ProcessSupervisor
+from core.job_history import JobHistory
+import collections
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import os
-import re
 
 class QueueProcessorThread(BaseThread):
     """Thread para procesar cola de videos"""
-    
+
     item_finished = pyqtSignal(int, bool, str)  # index, success, message
     all_finished = pyqtSignal(int, int)  # total, successful
     current_file = pyqtSignal(str)  # nombre del archivo actual
     progress_update = pyqtSignal(int, int) # index, percent
-    
-    def __init__(self, video_files, output_folder, encoder, preset, crf, output_format):
+
+    def __init__(self, video_files, output_folder, encoder, preset, crf, output_format, max_workers=1,
+                 job_store=None, stream_copy=False, auto_crf=False, quality_target=None, order=None):
         super().__init__()
         self.video_files = video_files
         self.output_folder = output_folder
@@ -21,98 +30,283 @@ class QueueProcessorThread(BaseThread):
         self.preset = preset
         self.crf = crf
         self.output_format = output_format
-    
+        self.max_workers = max(1, int(max_workers or 1))
+        # Cola persistente (opcional): estado de cada item en JobStore
+        self.job_store = job_store
+        # Copiar los streams que ya son compatibles en lugar de recodificarlos
+        self.stream_copy = stream_copy
+        # CRF por video buscado con muestras (en lugar del CRF fijo)
+        self.auto_crf = auto_crf
+        self.quality_target = quality_target
+        # Orden de proceso (índices de video_files, p. ej. de QueuePlanner);
+        # las señales siguen usando el índice original de cada archivo
+        self.order = list(order) if order is not None else list(range(len(video_files)))
+
+        # Estado compartido con los callbacks del supervisor
+        self._lock = threading.Lock()
+        self._processes = {}  # index -> SupervisedProcess en ejecución
+        self._runs = {}  # index -> (salida, CRF, inicio) para el historial
+        self._overlapped = set()  # índices que compartieron la máquina con otro elemento
+        self._item_progress = {}  # index -> porcentaje
+        self._last_overall = None
+        self._reserved_outputs = set()
+        self._search_pool = None
+
     def run(self):
         """Procesa toda la cola"""
         total = len(self.video_files)
         successful = 0
-        
+        workers = min(self.max_workers, max(total, 1))
+
         self.emit_log(f"🎬 Iniciando procesamiento de cola: {total} archivos")
+        if workers > 1:
+            self.emit_log(f"   Trabajos simultáneos: {workers}")
+
+        # Los procesos los vigila el supervisor; este hilo solo arranca
+        # trabajos y recibe sus finalizaciones (sin un hilo por trabajo)
+        pending = collections.deque((index, self.video_files[index]) for index in self.order)
+        finished = queue.Queue()
+        active = {}  # index -> (video_file, job)
+        # Búsquedas de CRF: cada una en su propio worker para no frenar la cola
+        self._search_pool = ThreadPoolExecutor(max_workers=workers) if self.auto_crf else None
+
+        while pending or active:
+            while self.is_running and pending and len(active) < workers:
+                index, video_file = pending.popleft()
+                result = self._start_item(index, video_file, total, finished)
+                if result is True:
+                    successful += 1
+                elif result is not False:
+                    active[index] = result
+                    # El tiempo de los que coinciden (búsqueda o conversión) no es su velocidad
+                    if len(active) > 1:
+                        self._overlapped.update(active)
+
+            if not active:
+                if not self.is_running:
+                    break
+                continue
+
+            index, returncode = finished.get()
+            video_file, job = active.pop(index)
+            if self._finish_item(index, video_file, job, returncode):
+                successful += 1
+
+            if workers == 1:
+                with self._lock:
+                    self._last_overall = 0
+                self.emit_progress(0)
+
+        if self._search_pool:
+            self._search_pool.shutdown(wait=True)
+
+        if not self.is_running:
+            self.emit_log("⚠️ Procesamiento de cola cancelado")
+
+        self.all_finished.emit(total, successful)
+        self.emit_log(f"\n{'='*50}")
+        self.emit_log(f"🏁 Procesamiento completado: {successful}/{total} exitosos")
+
+    def _start_item(self, index, video_file, total, finished):
+        """
+        Arranca la conversión de un elemento. Retorna True/False si terminó
+        sin lanzar FFmpeg, o (video_file, job) si quedó en ejecución.
+        """
+        filename = video_file.name
+        job_id = getattr(video_file, 'job_id', None) if self.job_store else None
+        job = self.job_store.get_job(job_id) if job_id is not None else None
         
-        for index, video_file in enumerate(self.video_files):
-            if not self.is_running:
-                self.emit_log("⚠️ Procesamiento de cola cancelado")
-                break
-            
-            filename = video_file.name
-            base_name = os.path.splitext(filename)[0]
-            
-            # Generar nombre de salida único
-            if self.output_folder:
-                output_dir = self.output_folder
+        # Reanudación: no rehacer trabajos ya completados
+        if job and job['status'] == 'completed' and job['output_path'] and os.path.exists(job['output_path']):
+            self.emit_log(f"⏭️ {filename} - Ya completado anteriormente")
+            self._report_progress(index, 100)
+            self.item_finished.emit(index, True, "Exitoso")
+            return True
+        
+        # Reutilizar la salida registrada si el trabajo quedó a medias
+        output_file = self._build_output_path(video_file, job['output_path'] if job else None)
+        output_filename = os.path.basename(output_file)
+        
+        if job:
+            self.job_store.mark_processing(job_id, output_file)
+
+        self.current_file.emit(filename)
+        self.emit_log(f"\n{'='*50}")
+        self.emit_log(f"📹 Procesando [{index+1}/{total}]: {filename} -> {output_filename}")
+
+        try:
+            # Obtener duración
+            if video_file.media_info is None:
+                video_file.media_info = MediaProbe.probe(video_file.path)
+            duration = FFmpegWrapper.get_video_duration(video_file.path, video_file.media_info)
+            if duration > 0:
+                self.emit_log(f"   Duración: {duration:.2f} segundos")
+
+            decisions = None
+            if self.stream_copy:
+                decisions = FFmpegWrapper.plan_streams(
+                    video_file.path, output_file, self.encoder, video_file.media_info, self.crf
+                )
+                if decisions:
+                    if StreamPlanner.is_remux(decisions):
+                        self.emit_log("   Solo cambio de contenedor (sin recodificar)")
+                    self.emit_log(f"   Streams: {StreamPlanner.describe(decisions)}")
+
+            # Si el video se copia tal cual no hay CRF que buscar
+            if self.auto_crf and (decisions is None or StreamPlanner.needs_video_encoder(decisions)):
+                # La búsqueda corre en el worker del elemento; FFmpeg se lanza al terminarla
+                self._search_pool.submit(self._search_and_launch, index, video_file, output_file, duration, finished)
             else:
-                output_dir = video_file.directory
-                
+                self._launch(index, video_file, output_file, self.crf, duration, finished)
+
+            return video_file, job
+
+        except Exception as e:
+            self.emit_log(f"❌ {filename} - Error: {str(e)}")
+            self._finish_job(job, False, f"Error: {str(e)}")
+            self.item_finished.emit(index, False, f"Error: {str(e)}")
+            return False
+
+    def _search_and_launch(self, index, video_file, output_file, duration, finished):
+        """Busca el CRF del elemento y lanza su conversión (en un worker de _search_pool)"""
+        try:
+            crf = self.optimize_crf(
+                video_file.path, self.encoder, self.preset, self.crf,
+                video_file.media_info, self.quality_target
+            )
+            if not self.is_running:
+                finished.put((index, -1))
+                return
+            self._launch(index, video_file, output_file, crf, duration, finished)
+        except Exception as e:
+            self.emit_log(f"❌ {video_file.name} - Error: {str(e)}")
+            finished.put((index, -1))
+
+    def _launch(self, index, video_file, output_file, crf, duration, finished):
+        """Lanza FFmpeg bajo el supervisor; su finalización llega por finished"""
+        cmd = FFmpegWrapper.build_convert_command(
+            video_file.path,
+            output_file,
+            self.encoder,
+            self.preset,
+            crf,
+            video_file.media_info,
+            self.stream_copy
+        )
+        process = ProcessSupervisor.default().spawn(
+            cmd,
+            duration,
+            on_progress=lambda percent: self._report_progress(index, percent),
+            on_exit=lambda returncode: finished.put((index, returncode))
+        )
+        with self._lock:
+            self._processes[index] = process
+            self._runs[index] = (output_file, crf, time.monotonic())
+
+        # Si se canceló mientras arrancaba, stop() no alcanzó a verlo
+        if not self.is_running:
+            process.kill()
+
+    def _finish_item(self, index, video_file, job, returncode):
+        """Registra el resultado de un elemento. Retorna True si tuvo éxito"""
+        filename = video_file.name
+        with self._lock:
+            process = self._processes.pop(index, None)
+            run = self._runs.pop(index, None)
+        overlapped = index in self._overlapped
+        self._overlapped.discard(index)
+
+        if returncode == 0 and self.is_running:
+            self.emit_log(f"✅ {filename} - Conversión exitosa")
+            if run:
+                self._record_history(video_file, *run, overlapped)
+            # Force 100% on success
+            self._report_progress(index, 100)
+            self._finish_job(job, True)
+            self.item_finished.emit(index, True, "Exitoso")
+            return True
+
+        if process and process.error:
+            self.emit_log(f"❌ Error al iniciar conversión de {filename}: {process.error}")
+            self._finish_job(job, False, "Error al iniciar")
+            self.item_finished.emit(index, False, "Error al iniciar")
+            return False
+
+        self.emit_log(f"❌ {filename} - Error en conversión")
+        self._finish_job(job, False, "Error")
+        self.item_finished.emit(index, False, "Error")
+        return False
+
+    def _record_history(self, video_file, output_file, crf, started, overlapped):
+        """Guarda velocidad y bitrate medidos para calibrar ConversionEstimator"""
+        # Si coincidió con otro elemento el tiempo no refleja la velocidad real
+        elapsed = None if overlapped else time.monotonic() - started
+        JobHistory.default().record(
+            video_file.media_info, output_file, self.encoder, self.preset, crf, elapsed, self.stream_copy
+        )
+
+    def _finish_job(self, job, success, message=None):
+        """Persiste el resultado de un item en JobStore"""
+        if not job:
+            return
+        if success:
+            self.job_store.mark_completed(job['id'])
+        elif not self.is_running:
+            # Cancelado: se reanudará en la próxima ejecución
+            self.job_store.mark_cancelled(job['id'])
+        else:
+            self.job_store.mark_failed(job['id'], message)
+
+    def _build_output_path(self, video_file, previous_output=None):
+        """Genera un nombre de salida único (reservado entre trabajos)"""
+        base_name = os.path.splitext(video_file.name)[0]
+        output_dir = self.output_folder if self.output_folder else video_file.directory
+
+        with self._lock:
+            # Un trabajo interrumpido sobrescribe su propia salida parcial
+            if previous_output and previous_output not in self._reserved_outputs:
+                self._reserved_outputs.add(previous_output)
+                return previous_output
+
             output_filename = f"{base_name}_converted.{self.output_format}"
             output_file = os.path.join(output_dir, output_filename)
-            
+
             # Simple uniqueness check
             counter = 1
-            while os.path.exists(output_file):
+            while os.path.exists(output_file) or output_file in self._reserved_outputs:
                 output_filename = f"{base_name}_converted_{counter}.{self.output_format}"
                 output_file = os.path.join(output_dir, output_filename)
                 counter += 1
-            
-            self.current_file.emit(filename)
-            self.emit_log(f"\n{'='*50}")
-            self.emit_log(f"📹 Procesando [{index+1}/{total}]: {filename} -> {output_filename}")
-            
-            try:
-                # Obtener duración
-                duration = FFmpegWrapper.get_video_duration(video_file.path)
-                if duration > 0:
-                    self.emit_log(f"   Duración: {duration:.2f} segundos")
-                
-                # Convertir
-                process = FFmpegWrapper.convert_video(
-                    video_file.path,
-                    output_file,
-                    self.encoder,
-                    self.preset,
-                    self.crf
-                )
-                
-                if not process:
-                    self.emit_log(f"❌ Error al iniciar conversión de {filename}")
-                    self.item_finished.emit(index, False, "Error al iniciar")
-                    continue
-                
-                # Leer progreso
-                for line in process.stderr:
-                    if not self.is_running:
-                        process.kill()
-                        break
-                    
-                    time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                    if time_match and duration > 0:
-                        hours = int(time_match.group(1))
-                        minutes = int(time_match.group(2))
-                        seconds = float(time_match.group(3))
-                        current_time = hours * 3600 + minutes * 60 + seconds
-                        
-                        progress_percent = int((current_time / duration) * 100)
-                        self.emit_progress(min(progress_percent, 100))
-                        self.progress_update.emit(index, min(progress_percent, 100))
-                
-                process.wait()
-                
-                if process.returncode == 0:
-                    self.emit_log(f"✅ {filename} - Conversión exitosa")
-                    # Force 100% on success
-                    self.emit_progress(100)
-                    self.progress_update.emit(index, 100)
-                    self.item_finished.emit(index, True, "Exitoso")
-                    successful += 1
-                else:
-                    self.emit_log(f"❌ {filename} - Error en conversión")
-                    self.item_finished.emit(index, False, "Error")
-                    
-            except Exception as e:
-                self.emit_log(f"❌ {filename} - Error: {str(e)}")
-                self.item_finished.emit(index, False, f"Error: {str(e)}")
-            
-            self.emit_progress(0)
-        
-        self.all_finished.emit(total, successful)
-        self.emit_log(f"\n{'='*50}")
-        self.emit_log(f"🏁 Procesamiento completado: {successful}/{total} exitosos")
\ No newline at end of file
+
+            self._reserved_outputs.add(output_file)
+
+        return output_file
+
+    def _report_progress(self, index, percent):
+        """Emite progreso por item y progreso global (solo si cambiaron)"""
+        with self._lock:
+            if self._item_progress.get(index) == percent:
+                return
+            self._item_progress[index] = percent
+
+            if self.max_workers > 1:
+                # En paralelo la barra global muestra el avance de toda la cola
+                overall = sum(self._item_progress.values()) // max(len(self.video_files), 1)
+            else:
+                overall = percent
+            overall_changed = overall != self._last_overall
+            self._last_overall = overall
+
+        self.progress_update.emit(index, percent)
+        if overall_changed:
+            self.emit_progress(overall)
+
+    def stop(self):
+        """Detiene la cola y todos los procesos FFmpeg en ejecución"""
+        self.is_running = False
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            process.kill()
+        for optimizer in list(self._crf_optimizers):
+            optimizer.cancel()
@@ -2,14 +2,14 @@
 from threads.base_thread import BaseThread
 from utils.ffmpeg_wrapper import FFmpegWrapper
 from core.resolution_changer import ResolutionChanger
-import re
 
 class ResolutionThread(BaseThread):
     """Thread para cambiar resolución sin bloquear UI"""
     
     def __init__(self, input_file, output_file, width, height, encoder='libx264', 
-                 preset='medium', crf=23, maintain_aspect=True):
+                 preset='medium', crf=23, maintain_aspect=True, media_info=None):
         super().__init__()
+        self.media_info = media_info
         self.input_file = input_file
         self.output_file = output_file
         self.width = width
@@ -27,10 +27,10 @@ class ResolutionThread(BaseThread):
             self.emit_log(f"   Mantener aspecto: {'Sí' if self.maintain_aspect else 'No'}")
             
             # Obtener duración
-            duration = FFmpegWrapper.get_video_duration(self.input_file)
+            duration = FFmpegWrapper.get_video_duration(self.input_file, self.media_info)
             
-            # Cambiar resolución
-            process = ResolutionChanger.change_resolution(
+            # Cambiar resolución (el supervisor reporta el progreso)
+            cmd = ResolutionChanger.build_command(
                 self.input_file,
                 self.output_file,
                 self.width,
@@ -40,35 +40,15 @@ class ResolutionThread(BaseThread):
                 self.crf,
                 self.maintain_aspect
             )
+            returncode = self.run_ffmpeg(cmd, duration)
             
-            if not process:
-                self.emit_finished(False, "Error al iniciar cambio de resolución")
-                return
-            
-            # Monitorear progreso
-            for line in process.stderr:
-                if not self.is_running:
-                    process.kill()
-                    self.emit_finished(False, "Cambio de resolución cancelado")
-                    return
-                
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
-            
-            process.wait()
-            
-            if process.returncode == 0:
+            if not self.is_running:
+                self.emit_finished(False, "Cambio de resolución cancelado")
+            elif returncode == 0:
                 self.emit_progress(100)
                 self.emit_finished(True, "✅ Resolución cambiada exitosamente")
             else:
                 self.emit_finished(False, "❌ Error cambiando resolución")
                 
         except Exception as e:
-            self.emit_finished(False, f"❌ Error: {str(e)}")
\ No newline at end of file
+            self.emit_finished(False, f"❌ Error: {str(e)}")
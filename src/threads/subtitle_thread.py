@@ -2,7 +2,7 @@
 from threads.base_thread import BaseThread
 from utils.ffmpeg_wrapper import FFmpegWrapper
 from core.subtitle_handler import SubtitleHandler
-import re
+from core.progress_parser import ProgressParser
 
 class SubtitleThread(BaseThread):
     """Thread para operaciones con subtítulos sin bloquear UI"""
@@ -65,21 +65,15 @@ class SubtitleThread(BaseThread):
             duration = FFmpegWrapper.get_video_duration(self.input_video)
             
             # Monitorear progreso
-            for line in process.stderr:
-                if not self.is_running:
-                    process.kill()
-                    self.emit_finished(False, "Operación cancelada")
-                    return
-                
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match and duration > 0:
-                    hours = int(time_match.group(1))
-                    minutes = int(time_match.group(2))
-                    seconds = float(time_match.group(3))
-                    current_time = hours * 3600 + minutes * 60 + seconds
-                    
-                    progress_percent = int((current_time / duration) * 100)
-                    self.emit_progress(min(progress_percent, 100))
+            completed = ProgressParser.pump(
+                process.stderr, ProgressParser(duration),
+                lambda event: self.emit_progress(event.percent) if duration > 0 else None,
+                should_stop=lambda: not self.is_running
+            )
+            if not completed:
+                process.kill()
+                self.emit_finished(False, "Operación cancelada")
+                return
             
             process.wait()
             
@@ -283,6 +283,13 @@ class QueuePanel(QWidget):
     def remove_row(self, row):
         self.table_queue.removeRow(row)
 
+    def update_info(self, row, text):
+        """Actualiza la columna Info (tamaño, duración, resolución, codec)"""
+        if row < self.table_queue.rowCount():
+            item = self.table_queue.item(row, 3)
+            if item:
+                item.setText(text)
+
     def update_status(self, row, status, color=None):
         if row < self.table_queue.rowCount():
             item = self.table_queue.item(row, 1)
@@ -298,10 +305,17 @@ class QueuePanel(QWidget):
             # setCellWidget no devuelve el widget, hay que usar cellWidget
             progress_bar = self.table_queue.cellWidget(row, 2)
             if isinstance(progress_bar, QProgressBar):
-                progress_bar.setValue(value)
+                if progress_bar.value() != value:
+                    progress_bar.setValue(value)
                 
-                # Opcional: Cambiar color si está completo
-                if value >= 100:
+                # Cambiar color solo al entrar/salir del estado completo:
+                # re-aplicar la hoja de estilo en cada llamada es costoso
+                completed = value >= 100
+                if progress_bar.property("completed") == completed:
+                    return
+                progress_bar.setProperty("completed", completed)
+                
+                if completed:
                     progress_bar.setStyleSheet("QProgressBar::chunk { background-color: #a6e3a1; }")
                 else:
                     # Reset o estilo default
@@ -318,3 +332,12 @@ class QueuePanel(QWidget):
                             border-radius: 3px;
                         }
                      """)
+    
+    def update_progress_batch(self, values):
+        """Actualiza varias filas (row -> valor) con un único repintado"""
+        self.table_queue.setUpdatesEnabled(False)
+        try:
+            for row, value in values.items():
+                self.update_progress(row, value)
+        finally:
+            self.table_queue.setUpdatesEnabled(True)
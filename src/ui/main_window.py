@@ -19,7 +19,12 @@ from ui.tabs.queue_tab import QueueTab
 
 # Logic
 from threads.queue_processor_thread import QueueProcessorThread
+from threads.queue_plan_thread import QueuePlanThread
+from threads.progress_coalescer import ProgressCoalescer
+from threads.metadata_loader import MetadataLoader
 from models.video_file import VideoFile
+from core.job_store import JobStore
+from core.queue_planner import QueuePlanner
 from utils.gpu_detector import detect_nvenc, get_gpu_info
 
 class MainWindow(QMainWindow):
@@ -31,7 +36,16 @@ class MainWindow(QMainWindow):
         self.video_queue = []
         self.queue_panels = []  # Lista de paneles registrados para sincronizar
         self.queue_thread = None
+        self.plan_thread = None
         self.nvenc_available = False
+        self.job_store = JobStore()
+        # Limita y agrupa los repintados de progreso de la cola
+        self.progress_coalescer = ProgressCoalescer()
+        self.progress_coalescer.items_updated.connect(self.apply_queue_progress)
+        self.progress_coalescer.overall_updated.connect(self.update_progress)
+        # Tamaño y metadatos de la cola se leen fuera del hilo de la UI
+        self.metadata_loader = MetadataLoader()
+        self.metadata_loader.metadata_ready.connect(self.on_metadata_ready)
         
         # 2. Initialize Infrastructure
         self.theme_manager = ThemeManager()
@@ -43,6 +57,9 @@ class MainWindow(QMainWindow):
         
         # 4. Apply default theme
         self.theme_manager.set_theme("dark")
+        
+        # 5. Restaurar trabajos pendientes de una sesión anterior
+        self.restore_pending_jobs()
 
     def init_ui(self):
         """Inicializa la interfaz de usuario moderna"""
@@ -160,13 +177,15 @@ class MainWindow(QMainWindow):
         
         # Poblar con datos actuales si hay
         for video in self.video_queue:
-            panel.add_row(video.name, video.get_size_formatted(), "Pendiente", video.path)
+            panel.add_row(video.name, video.get_info_formatted(), "Pendiente", video.path)
         panel.update_count(len(self.video_queue))
 
     def remove_from_queue_index(self, index):
         """Elimina por índice (usado por paneles)"""
         if index >= 0 and index < len(self.video_queue):
             video = self.video_queue.pop(index)
+            if video.job_id is not None:
+                self.job_store.remove_job(video.job_id)
             
             # Sincronizar TODOS los paneles
             for p in self.queue_panels:
@@ -189,45 +208,91 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Procesando", "Ya hay un proceso en curso")
             return
             
+        if self.plan_thread and self.plan_thread.isRunning():
+            return
+        
+        # Simular la cola (duración total, orden y espacio en cada disco de
+        # destino) fuera de la UI: puede lanzar ffprobe por cada archivo
+        self.label_status.setText("📋 Planificando la cola...")
+        self.plan_thread = QueuePlanThread(self.video_queue.copy(), settings)
+        self.plan_thread.log_message.connect(self.log)
+        self.plan_thread.plan_ready.connect(
+            lambda videos, plan: self.confirm_queue_plan(videos, plan, settings)
+        )
+        self.plan_thread.start()
+    
+    def confirm_queue_plan(self, videos, plan, settings):
+        """Muestra el plan de la cola y, si se confirma, la lanza"""
+        self.label_status.setText("")
+        if videos != self.video_queue:
+            QMessageBox.warning(self, "Cola modificada",
+                                "La cola cambió mientras se planificaba. Vuelva a iniciar el proceso.")
+            return
+        
+        if self.queue_thread and self.queue_thread.isRunning():
+            QMessageBox.warning(self, "Procesando", "Ya hay un proceso en curso")
+            return
+        
         encoder = settings["encoder"]
         preset = settings["preset"]
         crf = settings["crf"]
         output_format = settings["format"]
         output_folder = settings["output_folder"]
         
-        reply = QMessageBox.question(
+        fits = plan is None or plan['fits']
+        plan_text = QueuePlanner.describe(plan) if plan else "No se pudo estimar la duración del lote"
+        
+        question = QMessageBox.question if fits else QMessageBox.warning
+        reply = question(
             self, "Confirmar Conversión",
-            f"¿Procesar {len(self.video_queue)} video(s)?\n\n"
+            f"¿Procesar {len(videos)} video(s)?\n\n"
             f"Codificador: {encoder}\n"
             f"Calidad (CRF): {crf}\n"
-            f"Formato: {output_format}",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            f"Formato: {output_format}\n"
+            f"Trabajos simultáneos: {settings.get('max_workers', 1)}\n\n"
+            f"{plan_text}",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            # Si no cabe en disco, la opción por defecto es no lanzarlo
+            QMessageBox.StandardButton.Yes if fits else QMessageBox.StandardButton.No
         )
         
-        if reply == QMessageBox.StandardButton.No:
+        if reply != QMessageBox.StandardButton.Yes:
             return
         
+        self.log(f"📋 Plan de la cola:\n{plan_text}")
+        
         self.btn_cancel.setEnabled(True)
         self.btn_cancel.setVisible(True)
         self.progress_bar.setVisible(True)
         
+        job_ids = [video.job_id for video in videos if video.job_id is not None]
+        # Relanzar la cola convierte de nuevo todo (el salto de completados es para reanudar)
+        self.job_store.requeue_completed(job_ids)
+        self.job_store.set_settings(job_ids, settings)
+        
         self.queue_thread = QueueProcessorThread(
-            self.video_queue.copy(),
+            videos,
             output_folder,
             encoder,
             preset,
             crf,
-            output_format
+            output_format,
+            settings.get("max_workers", 1),
+            job_store=self.job_store,
+            stream_copy=settings.get("stream_copy", False),
+            auto_crf=settings.get("auto_crf", False),
+            order=plan['order'] if plan else None
         )
         
-        self.queue_thread.progress.connect(self.update_progress)
+        self.queue_thread.progress.connect(self.progress_coalescer.push_overall)
         self.queue_thread.log_message.connect(self.log)
         self.queue_thread.item_finished.connect(self.queue_item_finished)
         self.queue_thread.all_finished.connect(self.queue_all_finished)
         self.queue_thread.current_file.connect(self.update_current_file)
         # Connect new detailed progress signal
-        self.queue_thread.progress_update.connect(self.update_queue_progress)
+        self.queue_thread.progress_update.connect(self.progress_coalescer.push_item)
         
+        self.progress_coalescer.clear()
         self.progress_bar.setValue(0)
         self.queue_thread.start()
         
@@ -272,6 +337,9 @@ class MainWindow(QMainWindow):
         self.label_status.setText(message)
     
     def clear_queue(self):
+        self.job_store.remove_jobs(
+            [video.job_id for video in self.video_queue if video.job_id is not None]
+        )
         self.video_queue.clear()
         
         # Clear ALL panels
@@ -306,14 +374,27 @@ class MainWindow(QMainWindow):
             for f in files:
                 self.add_file_to_queue(f)
 
-    def add_file_to_queue(self, file_path):
+    def restore_pending_jobs(self):
+        """Recupera la cola persistida (trabajos sin terminar tras un cierre o caída)"""
+        jobs = self.job_store.recover()
+        for job in jobs:
+            self.add_file_to_queue(job['input_path'], job_id=job['id'])
+        
+        if jobs:
+            self.log(f"♻️ Restaurados {len(jobs)} trabajos pendientes")
+
+    def add_file_to_queue(self, file_path, job_id=None):
         """Agrega un archivo a la cola y actualiza TODOS los paneles"""
         # Checar duplicados
         for video in self.video_queue:
             if video.path == file_path:
+                if job_id is not None:
+                    self.job_store.remove_job(job_id)
                 return
 
-        video = VideoFile(file_path)
+        # Sin E/S en el hilo de la UI: tamaño y metadatos llegan por on_metadata_ready
+        video = VideoFile(file_path, read_size=False)
+        video.job_id = job_id if job_id is not None else self.job_store.add_job(file_path)
         self.video_queue.append(video)
         
         # Actualizar TODOS los paneles
@@ -325,16 +406,34 @@ class MainWindow(QMainWindow):
         self.queue_tab.add_video_to_table(video)
         self.queue_tab.update_count(len(self.video_queue))
         
+        self.metadata_loader.request(video)
+        
         self.log(f"➕ Agregado: {video.name}")
 
+    def on_metadata_ready(self, video, size, media_info):
+        """Completa la fila de un video cuando termina su sondeo en segundo plano"""
+        video.apply_metadata(size, media_info)
+        
+        # La fila puede haberse movido o quitado mientras se sondeaba
+        row = next((i for i, queued in enumerate(self.video_queue) if queued is video), None)
+        if row is None:
+            return
+        
+        for p in self.queue_panels:
+            p.update_info(row, video.get_info_formatted())
+        self.queue_tab.update_video_info(row, video)
+
     def update_progress(self, val):
         self.progress_bar.setValue(val)
 
     def update_queue_progress(self, index, val):
         """Actualiza el progreso de una fila específica (item de cola)"""
-        # Actualizar TODOS los paneles
+        self.apply_queue_progress({index: val})
+
+    def apply_queue_progress(self, values):
+        """Aplica un lote de progreso (index -> valor) a TODOS los paneles"""
         for p in self.queue_panels:
-            p.update_progress(index, val)
+            p.update_progress_batch(values)
 
     def update_current_file(self, filename):
         # Update Status in ALL panels?
@@ -355,6 +454,8 @@ class MainWindow(QMainWindow):
         # self.queue_tab.update_status(file_idx, status_text)
     
     def queue_all_finished(self):
+        # Aplicar los últimos valores antes de ocultar el progreso
+        self.progress_coalescer.flush()
         self.progress_bar.setVisible(False)
         self.btn_cancel.setVisible(False)
         self.label_status.setText("✅ Todos los procesos terminados")
@@ -2,18 +2,31 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QGroupBox, QTextEdit, QFileDialog, QLabel)
 from threads.analysis_thread import AnalysisThread
+from threads.estimate_thread import SampleEstimateThread
 from core.analyzer import VideoAnalyzer
 from core.estimator import ConversionEstimator
+from core.job_history import JobHistory
 
 class AnalysisTab(QWidget):
     """Tab para análisis de videos"""
     
+    # Configuraciones para las que se muestran estimaciones
+    ESTIMATE_CONFIGS = [
+        ("CPU (libx264, medium, CRF 23)", 'libx264', 'medium', 23),
+        ("GPU (h264_nvenc, p5, CRF 23)", 'h264_nvenc', 'p5', 23),
+        ("Alta calidad (libx264, slow, CRF 18)", 'libx264', 'slow', 18),
+    ]
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
         self.analysis_thread = None
+        self.estimate_thread = None
+        self._stopping_threads = set()  # mediciones detenidas que aún no terminaron
         self.current_file = None
         self.current_analysis = None
+        self.current_media_info = None
+        self.measured = {}  # nombre de configuración -> resultado de SampleEstimator
         self.init_ui()
     
     def init_ui(self):
@@ -35,6 +48,14 @@ class AnalysisTab(QWidget):
         self.btn_analyze.setEnabled(False)
         btn_layout.addWidget(self.btn_analyze) 
         
+        self.btn_measure = QPushButton("⏱️ Medir en esta máquina")
+        self.btn_measure.setToolTip("Codifica unos segundos de varias partes del video con cada "
+                                    "configuración para estimar tiempo y tamaño reales")
+        self.btn_measure.clicked.connect(self.measure_estimations)
+        self.btn_measure.setMinimumHeight(40)
+        self.btn_measure.setEnabled(False)
+        btn_layout.addWidget(self.btn_measure)
+        
         file_layout.addLayout(btn_layout)
         
         self.label_file = QLabel("No hay archivo seleccionado")
@@ -73,9 +94,14 @@ class AnalysisTab(QWidget):
             "Videos (*.mp4 *.avi *.mkv *.mov *.flv *.wmv *.webm *.m4v);;Todos (*.*)"
         )
         if file_path:
+            self.stop_measurement()
             self.current_file = file_path
+            self.current_analysis = None
+            self.current_media_info = None
+            self.measured = {}
             self.label_file.setText(f"📄 {file_path}")
             self.btn_analyze.setEnabled(True)
+            self.btn_measure.setEnabled(False)
             if self.parent_window:
                 self.parent_window.log(f"Archivo seleccionado para análisis: {file_path}")
     
@@ -87,9 +113,14 @@ class AnalysisTab(QWidget):
         if self.analysis_thread and self.analysis_thread.isRunning():
             return
         
+        self.stop_measurement()
         self.btn_analyze.setEnabled(False)
+        self.btn_measure.setEnabled(False)
         self.text_analysis.clear()
         self.label_estimations.clear()
+        self.current_analysis = None
+        self.current_media_info = None
+        self.measured = {}
         
         # Crear thread de análisis
         self.analysis_thread = AnalysisThread(self.current_file)
@@ -103,6 +134,7 @@ class AnalysisTab(QWidget):
     def show_analysis(self, analysis):
         """Muestra los resultados del análisis"""
         self.current_analysis = analysis
+        self.current_media_info = self.analysis_thread.media_info
         formatted = VideoAnalyzer.format_analysis(analysis)
         self.text_analysis.setText(formatted)
         
@@ -117,19 +149,32 @@ class AnalysisTab(QWidget):
         duration = analysis['duration']
         video = analysis['video_streams'][0]
         resolution = (video['width'], video['height'])
+        fps = video.get('fps')
         
         # Estimar para diferentes configuraciones
-        text = "📊 ESTIMACIONES DE CONVERSIÓN:\n\n"
-        
-        configs = [
-            ("CPU (libx264, medium, CRF 23)", 'libx264', 'medium', 23),
-            ("GPU (h264_nvenc, p5, CRF 23)", 'h264_nvenc', 'p5', 23),
-            ("Alta calidad (libx264, slow, CRF 18)", 'libx264', 'slow', 18),
-        ]
-        
-        for name, encoder, preset, crf in configs:
-            time_est = ConversionEstimator.estimate_time(duration, encoder, preset)
-            size_est = ConversionEstimator.estimate_size(duration, crf=crf, resolution=resolution)
+        text = "📊 ESTIMACIONES DE CONVERSIÓN:\n"
+        history_count = JobHistory.default().count()
+        if history_count:
+            text += f"(calibradas con {history_count} conversiones anteriores)\n"
+        text += "\n"
+        
+        for name, encoder, preset, crf in AnalysisTab.ESTIMATE_CONFIGS:
+            measured = self.measured.get(name)
+            if measured:
+                fmt_time, fmt_size = ConversionEstimator.format_time, ConversionEstimator.format_size
+                text += f"{name} (medido, {measured['speed']:.2f}x):\n"
+                text += (f"  ⏱️ Tiempo: {fmt_time(measured['time'])} "
+                         f"({fmt_time(measured['time_low'])} - {fmt_time(measured['time_high'])})\n")
+                text += (f"  💾 Tamaño: {fmt_size(measured['size'])} "
+                         f"({fmt_size(measured['size_low'])} - {fmt_size(measured['size_high'])})\n\n")
+                continue
+            
+            time_est = ConversionEstimator.estimate_time(
+                duration, encoder, preset, resolution, fps, video['codec']
+            )
+            size_est = ConversionEstimator.estimate_size(
+                duration, crf=crf, resolution=resolution, encoder=encoder, fps=fps
+            )
             
             text += f"{name}:\n"
             text += f"  ⏱️ Tiempo estimado: {ConversionEstimator.format_time(time_est)}\n"
@@ -140,6 +185,57 @@ class AnalysisTab(QWidget):
     def analysis_finished(self, success, message):
         """Callback cuando termina el análisis"""
         self.btn_analyze.setEnabled(True)
+        self.btn_measure.setEnabled(bool(self.current_analysis and self.current_analysis['video_streams']))
+        if self.parent_window:
+            self.parent_window.log(message)
+    
+    def measure_estimations(self):
+        """Mide tiempo y tamaño codificando muestras con cada configuración"""
+        if not self.current_file or not self.current_analysis:
+            return
+        
+        if self.estimate_thread and self.estimate_thread.isRunning():
+            return
+        
+        self.btn_analyze.setEnabled(False)
+        self.btn_measure.setEnabled(False)
+        
+        self.estimate_thread = SampleEstimateThread(
+            self.current_file, AnalysisTab.ESTIMATE_CONFIGS, media_info=self.current_media_info
+        )
+        self.estimate_thread.progress.connect(self.update_progress)
+        self.estimate_thread.log_message.connect(self.log)
+        self.estimate_thread.estimate_ready.connect(self.show_measurement)
+        self.estimate_thread.finished_signal.connect(self.measure_finished)
+        
+        self.estimate_thread.start()
+    
+    def show_measurement(self, name, result):
+        """Sustituye la estimación de una configuración por la medida"""
+        # Resultados de una medición de otro archivo que ya se detuvo
+        if self.sender() is not self.estimate_thread:
+            return
+        if result:
+            self.measured[name] = result
+            self.show_estimations(self.current_analysis)
+    
+    def stop_measurement(self):
+        """Detiene la medición en curso; sus resultados ya no corresponden al archivo"""
+        if not self.estimate_thread:
+            return
+        thread, self.estimate_thread = self.estimate_thread, None
+        thread.estimate_ready.disconnect(self.show_measurement)
+        thread.finished_signal.disconnect(self.measure_finished)
+        if thread.isRunning():
+            # Mantener la referencia hasta que termine (Qt no admite destruirlo en marcha)
+            self._stopping_threads.add(thread)
+            thread.finished.connect(lambda: self._stopping_threads.discard(thread))
+            thread.stop()
+    
+    def measure_finished(self, success, message):
+        """Callback cuando termina la medición"""
+        self.btn_analyze.setEnabled(True)
+        self.btn_measure.setEnabled(True)
         if self.parent_window:
             self.parent_window.log(message)
     
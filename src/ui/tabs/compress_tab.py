@@ -2,7 +2,7 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QGroupBox, QFileDialog, QLabel, QComboBox,
                                QSpinBox, QRadioButton, QDoubleSpinBox, QFrame,
-                               QMessageBox, QProgressBar)
+                               QMessageBox, QProgressBar, QCheckBox)
 from PyQt6.QtCore import Qt
 from threads.compress_thread import CompressThread
 import os
@@ -127,6 +127,16 @@ class CompressTab(QWidget):
         preset_layout.addWidget(self.combo_preset)
         encoding_layout.addLayout(preset_layout)
         
+        self.check_two_pass = QCheckBox("Dos pasadas (tamaño objetivo más preciso)")
+        self.check_two_pass.setChecked(True)
+        self.check_two_pass.setToolTip(
+            "Una primera pasada rápida analiza el video y la segunda reparte el bitrate; "
+            "si el resultado se aleja del tamaño objetivo se repite solo la codificación final"
+        )
+        encoding_layout.addWidget(self.check_two_pass)
+        # Solo aplica al modo de tamaño objetivo
+        self.radio_target_size.toggled.connect(self.check_two_pass.setEnabled)
+        
         encoding_group.setLayout(encoding_layout)
         card_layout.addWidget(encoding_group)
         
@@ -230,7 +240,8 @@ class CompressTab(QWidget):
             compression_mode,
             target_value,
             encoder,
-            preset
+            preset,
+            two_pass=self.check_two_pass.isChecked()
         )
         
         self.compress_thread.progress.connect(self.update_progress)
@@ -1,6 +1,6 @@
 """Tab de perfiles de dispositivo"""
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                               QGroupBox, QFileDialog, QLabel, QComboBox, QTextEdit)
+                               QGroupBox, QFileDialog, QLabel, QComboBox, QTextEdit, QCheckBox)
 from threads.conversion_thread import ConversionThread
 from models.conversion_job import ConversionJob
 from models.video_file import VideoFile
@@ -58,6 +58,10 @@ class DeviceProfileTab(QWidget):
         self.text_profile_details.setMaximumHeight(150)
         profile_layout.addWidget(self.text_profile_details)
         
+        self.check_auto_crf = QCheckBox("Ajustar el CRF a cada video (prueba muestras antes de convertir)")
+        self.check_auto_crf.setToolTip("Usa el CRF más alto que mantiene la calidad en lugar del CRF fijo del perfil")
+        profile_layout.addWidget(self.check_auto_crf)
+        
         profile_group.setLayout(profile_layout)
         layout.addWidget(profile_group)
         
@@ -155,7 +159,7 @@ class DeviceProfileTab(QWidget):
         )
         
         # Crear thread
-        self.conversion_thread = ConversionThread(job)
+        self.conversion_thread = ConversionThread(job, auto_crf=self.check_auto_crf.isChecked())
         self.conversion_thread.progress.connect(self.update_progress)
         self.conversion_thread.log_message.connect(self.log)
         self.conversion_thread.finished_signal.connect(self.convert_finished)
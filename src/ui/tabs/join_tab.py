@@ -1,7 +1,7 @@
 """Tab para unir múltiples videos"""
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QGroupBox, QFileDialog, QLabel, QComboBox,
-                               QListWidget, QSpinBox, QFrame, QProgressBar)
+                               QListWidget, QSpinBox, QFrame, QProgressBar, QCheckBox)
 from PyQt6.QtCore import Qt
 from threads.join_thread import JoinThread
 import os
@@ -99,8 +99,24 @@ class JoinTab(QWidget):
         self.spin_crf.setValue(23)
         quality_layout.addWidget(self.spin_crf)
         
+        self.check_stream_copy = QCheckBox("Unir sin recodificar cuando sea posible")
+        self.check_stream_copy.setChecked(True)
+        self.check_stream_copy.setToolTip(
+            "Si los videos comparten codec, perfil, formato de píxel, timebase y audio se unen sin recodificar; "
+            "los que difieran se adaptan a la mayoría antes de unir"
+        )
+        
         encoding_layout.addLayout(encoder_layout)
         encoding_layout.addLayout(quality_layout)
+        encoding_layout.addWidget(self.check_stream_copy)
+        
+        self.check_normalize = QCheckBox("Normalizar en paralelo los videos con distinta resolución/FPS")
+        self.check_normalize.setChecked(True)
+        self.check_normalize.setToolTip(
+            "En lugar de cancelar la unión, cada video distinto se adapta a un formato común "
+            "usando todos los núcleos y luego se une sin recodificar"
+        )
+        encoding_layout.addWidget(self.check_normalize)
         
         encoding_group.setLayout(encoding_layout)
         card_layout.addWidget(encoding_group)
@@ -229,7 +245,9 @@ class JoinTab(QWidget):
             output_file,
             encoder,
             'medium',
-            crf
+            crf,
+            stream_copy=self.check_stream_copy.isChecked(),
+            normalize=self.check_normalize.isChecked()
         )
         
         self.join_thread.progress.connect(self.update_progress)
@@ -78,6 +78,12 @@ class MultiFormatTab(QWidget):
             self.table_formats.setItem(row, 3, QTableWidgetItem("Pendiente"))
         
         format_layout.addWidget(self.table_formats)
+        
+        # Un solo proceso: el video se lee y decodifica una vez para todos los formatos
+        self.check_single_decode = QCheckBox("Decodificar una sola vez (más rápido con varios formatos)")
+        self.check_single_decode.setChecked(True)
+        format_layout.addWidget(self.check_single_decode)
+        
         format_group.setLayout(format_layout)
         layout.addWidget(format_group)
         
@@ -145,7 +151,8 @@ class MultiFormatTab(QWidget):
         # Crear thread
         self.multi_thread = MultiFormatThread(
             self.current_file,
-            output_configs
+            output_configs,
+            single_decode=self.check_single_decode.isChecked()
         )
         
         self.multi_thread.progress.connect(self.update_progress)
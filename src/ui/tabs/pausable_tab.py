@@ -1,6 +1,6 @@
 """Tab para conversión pausable"""
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                               QGroupBox, QFileDialog, QLabel, QComboBox, QSpinBox)
+                               QGroupBox, QFileDialog, QLabel, QComboBox, QSpinBox, QCheckBox)
 from threads.pausable_thread import PausableConversionThread
 import os
 
@@ -53,6 +53,11 @@ class PausableTab(QWidget):
         quality_layout.addWidget(self.spin_crf)
         encoding_layout.addLayout(quality_layout)
         
+        self.check_resumable = QCheckBox("Pausa real (libera recursos y se puede reanudar tras reiniciar)")
+        self.check_resumable.setToolTip("Codifica por segmentos con checkpoint en disco")
+        self.check_resumable.setChecked(True)
+        encoding_layout.addWidget(self.check_resumable)
+        
         encoding_group.setLayout(encoding_layout)
         layout.addWidget(encoding_group)
         
@@ -170,7 +175,8 @@ class PausableTab(QWidget):
             output_file,
             encoder,
             'medium',
-            crf
+            crf,
+            resumable=self.check_resumable.isChecked()
         )
         
         self.pausable_thread.progress.connect(self.update_progress)
@@ -18,12 +18,13 @@ class QueueTab(QWidget):
         queue_layout = QVBoxLayout()
         
         self.table_queue = QTableWidget()
-        self.table_queue.setColumnCount(4)
-        self.table_queue.setHorizontalHeaderLabels(["Archivo", "Tamaño", "Estado", "Ruta Completa"])
+        self.table_queue.setColumnCount(5)
+        self.table_queue.setHorizontalHeaderLabels(["Archivo", "Tamaño", "Estado", "Ruta Completa", "Info"])
         self.table_queue.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.table_queue.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
         self.table_queue.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
         self.table_queue.setColumnHidden(3, True)
+        self.table_queue.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
         queue_layout.addWidget(self.table_queue)
         
         # Botones
@@ -73,4 +74,16 @@ class QueueTab(QWidget):
         self.table_queue.setItem(row, 0, QTableWidgetItem(video.name))
         self.table_queue.setItem(row, 1, QTableWidgetItem(video.get_size_formatted()))
         self.table_queue.setItem(row, 2, QTableWidgetItem("Pendiente"))
-        self.table_queue.setItem(row, 3, QTableWidgetItem(video.path))
\ No newline at end of file
+        self.table_queue.setItem(row, 3, QTableWidgetItem(video.path))
+        self.table_queue.setItem(row, 4, QTableWidgetItem(""))
+
+    def update_video_info(self, row, video):
+        """Rellena tamaño y metadatos cuando llegan del sondeo en segundo plano"""
+        from PyQt6.QtWidgets import QTableWidgetItem
+        
+        if row >= self.table_queue.rowCount():
+            return
+        self.table_queue.setItem(row, 1, QTableWidgetItem(video.get_size_formatted()))
+        details = [video.get_duration_formatted()] if video.duration else []
+        details += [value for value in (video.resolution, video.codec) if value]
+        self.table_queue.setItem(row, 4, QTableWidgetItem(" · ".join(details)))
\ No newline at end of file
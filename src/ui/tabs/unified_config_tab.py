@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QRadioButton, QLineEdit, QFileDialog, QSpinBox, QFrame, QScrollArea)
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QIcon
+import os
 
 class UnifiedConfigTab(QWidget):
     """
@@ -164,12 +165,40 @@ class UnifiedConfigTab(QWidget):
         
         advanced_layout.addLayout(manual_row)
         
+        # Trabajos simultáneos (cola en paralelo)
+        workers_row = QHBoxLayout()
+        workers_row.addWidget(QLabel("Trabajos simultáneos:"))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, max(os.cpu_count() or 1, 1))
+        self.spin_workers.setValue(1)
+        self.spin_workers.setToolTip("Número de videos de la cola que se convierten al mismo tiempo")
+        workers_row.addWidget(self.spin_workers)
+        workers_row.addStretch()
+        advanced_layout.addLayout(workers_row)
+        
         # Opciones de Reparación
         advanced_layout.addWidget(QLabel("--- Opciones Extra ---"))
         self.check_fix = QCheckBox("Intentar reparar timestamps corruptos")
         self.check_fix.setChecked(True)
         advanced_layout.addWidget(self.check_fix)
         
+        self.check_stream_copy = QCheckBox("Copiar sin recodificar los streams ya compatibles")
+        self.check_stream_copy.setChecked(False)
+        self.check_stream_copy.setToolTip(
+            "Si el video ya usa el codec elegido con un bitrate no mayor que el del CRF pedido, y el "
+            "audio/subtítulos caben en el formato de salida, se copian tal cual (un cambio de "
+            "contenedor termina a velocidad de disco)"
+        )
+        advanced_layout.addWidget(self.check_stream_copy)
+        
+        self.check_auto_crf = QCheckBox("CRF automático por video (prueba muestras antes de convertir)")
+        self.check_auto_crf.setChecked(False)
+        self.check_auto_crf.setToolTip(
+            "Codifica unos segundos de varias partes del video con distintos CRF y usa el más alto "
+            "que mantiene la calidad (SSIM): menos espacio en contenido sencillo sin perder calidad en el difícil"
+        )
+        advanced_layout.addWidget(self.check_auto_crf)
+        
         config_layout.addWidget(self.advanced_frame)
         config_group.setLayout(config_layout)
         main_layout.addWidget(config_group)
@@ -348,7 +377,11 @@ class UnifiedConfigTab(QWidget):
             "encoder": encoder,
             "preset": preset,
             "crf": crf,
-            "repair": self.check_fix.isChecked()
+            "repair": self.check_fix.isChecked(),
+            # Opción avanzada: en modo simple siempre se recodifica
+            "stream_copy": is_advanced and self.check_stream_copy.isChecked(),
+            "auto_crf": self.check_auto_crf.isChecked(),
+            "max_workers": self.spin_workers.value() if is_advanced else 1
         }
         
     def start_process(self):
@@ -1,31 +1,20 @@
 import subprocess
 import os
 import re
+from core.media_probe import MediaProbe
+from core.stream_planner import StreamPlanner
 
 class FFmpegWrapper:
     """Wrapper para ejecutar comandos de FFmpeg"""
     
+    # Bitrate del audio recodificado (-b:a 192k), en bits/s
+    AUDIO_BITRATE = 192_000
+    
     @staticmethod
-    def get_video_duration(input_file):
-        """Obtiene la duración del video en segundos"""
+    def get_video_duration(input_file, media_info=None):
+        """Obtiene la duración del video en segundos (sin sondear si se pasa media_info)"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                input_file
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            duration = float(result.stdout.strip())
-            return duration
+            return MediaProbe.duration(input_file, media_info)
         except Exception as e:
             print(f"Error obteniendo duración: {e}")
             return 0
@@ -52,52 +41,129 @@ class FFmpegWrapper:
             return f"Error: {str(e)}"
     
     @staticmethod
-    def convert_video(input_file, output_file, encoder='libx264', preset='medium', crf=23):
-        """Convierte video usando FFmpeg con progreso"""
-        try:
-            cmd = [
-                'ffmpeg',
-                '-i', input_file,
-                '-c:v', encoder,
-            ]
-            
-            # Manejo específico par VP9 vs x264/nvenc
-            if 'libvpx' in encoder:
-                # VP9 usa -deadline en lugar de -preset
-                deadline = 'good'
-                if preset in ['ultrafast', 'superfast', 'veryfast']:
-                    deadline = 'realtime'
-                elif preset in ['slow', 'slower', 'veryslow']:
-                    deadline = 'best'
-                
-                cmd.extend(['-deadline', deadline])
-                cmd.extend(['-crf', str(crf)])
-                cmd.extend(['-b:v', '0']) # Necesario para CRF en VP9
-            else:
-                # x264/hevc standard parameters
-                cmd.extend(['-preset', preset])
-                cmd.extend(['-crf', str(crf)])
+    def build_video_args(encoder='libx264', preset='medium', crf=23):
+        """Construye los parámetros de video (-c:v, preset/deadline, crf)"""
+        args = ['-c:v', encoder]
+        
+        # Manejo específico par VP9 vs x264/nvenc
+        if 'libvpx' in encoder:
+            # VP9 usa -deadline en lugar de -preset
+            deadline = 'good'
+            if preset in ['ultrafast', 'superfast', 'veryfast']:
+                deadline = 'realtime'
+            elif preset in ['slow', 'slower', 'veryslow']:
+                deadline = 'best'
             
+            args.extend(['-deadline', deadline])
+            args.extend(['-crf', str(crf)])
+            args.extend(['-b:v', '0']) # Necesario para CRF en VP9
+        else:
+            # x264/hevc standard parameters
+            args.extend(['-preset', preset])
+            args.extend(['-crf', str(crf)])
+        
+        return args
+    
+    @staticmethod
+    def get_audio_codec(output_file):
+        """Codec de audio según el contenedor de salida"""
+        # WebM prefiere Vorbis/Opus. MP4 usa AAC.
+        if output_file.lower().endswith('.webm'):
+            return 'libvorbis'
+        return 'aac'
+    
+    @staticmethod
+    def build_convert_command(input_file, output_file, encoder='libx264', preset='medium', crf=23,
+                              media_info=None, stream_copy=False):
+        """
+        Construye el comando FFmpeg de conversión. Con stream_copy=True se
+        copian los streams que ya son compatibles con el destino y solo se
+        recodifica el resto (ver StreamPlanner).
+        """
+        if stream_copy:
+            cmd = FFmpegWrapper.build_planned_command(input_file, output_file, encoder, preset, crf, media_info)
+            if cmd:
+                return cmd
 
-            
-            # Parametros de audio
-            # WebM prefiere Vorbis/Opus. MP4 usa AAC.
-            audio_codec = 'aac'
-            if output_file.lower().endswith('.webm'):
-                audio_codec = 'libvorbis'
-            
-            cmd.extend([
-                '-c:a', audio_codec,
-                '-b:a', '192k',
-                '-progress', 'pipe:2',  # Enviar progreso a stderr
-                output_file,
-                '-y'
-            ])
-            
-            # Si es NVENC, agregar aceleración por hardware
-            if 'nvenc' in encoder:
-                cmd.insert(1, '-hwaccel')
-                cmd.insert(2, 'cuda')
+        cmd = [
+            'ffmpeg',
+            '-i', input_file,
+        ]
+        cmd.extend(FFmpegWrapper.build_video_args(encoder, preset, crf))
+        
+        # Parametros de audio
+        audio_codec = FFmpegWrapper.get_audio_codec(output_file)
+        
+        cmd.extend([
+            '-c:a', audio_codec,
+            '-b:a', '192k',
+            '-progress', 'pipe:2',  # Enviar progreso a stderr
+            output_file,
+            '-y'
+        ])
+        
+        # Si es NVENC, agregar aceleración por hardware
+        if 'nvenc' in encoder:
+            cmd.insert(1, '-hwaccel')
+            cmd.insert(2, 'cuda')
+        
+        return cmd
+    
+    @staticmethod
+    def plan_streams(input_file, output_file, encoder='libx264', media_info=None, crf=None):
+        """
+        Plan por stream (copiar/recodificar/descartar) o None si no se pudo
+        sondear. Con crf, el video y el audio solo se copian si su bitrate no
+        supera el que darían el CRF pedido y los 192k de audio.
+        """
+        info = MediaProbe.ensure(input_file, media_info, ('probe_data',))
+        if info is None or not info.probe_data:
+            return None
+        output_format = os.path.splitext(output_file)[1]
+        if crf is None:
+            return StreamPlanner.plan(info.probe_data, output_format, encoder)
+
+        # Importación diferida: core.estimator depende de este módulo
+        from core.estimator import ConversionEstimator
+        resolution = (info.width, info.height) if info.width and info.height else None
+        return StreamPlanner.plan(
+            info.probe_data, output_format, encoder,
+            max_video_bitrate=ConversionEstimator.expected_video_bitrate(encoder, crf, resolution, info.fps),
+            max_audio_bitrate=FFmpegWrapper.AUDIO_BITRATE
+        )
+    
+    @staticmethod
+    def build_planned_command(input_file, output_file, encoder='libx264', preset='medium', crf=23, media_info=None):
+        """Comando con mapeo explícito de todos los streams según el plan"""
+        decisions = FFmpegWrapper.plan_streams(input_file, output_file, encoder, media_info, crf)
+        if not decisions:
+            return None
+
+        cmd = ['ffmpeg']
+        if 'nvenc' in encoder and StreamPlanner.needs_video_encoder(decisions):
+            cmd.extend(['-hwaccel', 'cuda'])
+        cmd.extend(['-i', input_file])
+        cmd.extend(StreamPlanner.build_args(
+            decisions,
+            os.path.splitext(output_file)[1],
+            FFmpegWrapper.build_video_args(encoder, preset, crf),
+            '192k'
+        ))
+        cmd.extend([
+            '-progress', 'pipe:2',
+            output_file,
+            '-y'
+        ])
+        return cmd
+    
+    @staticmethod
+    def convert_video(input_file, output_file, encoder='libx264', preset='medium', crf=23,
+                      media_info=None, stream_copy=False):
+        """Convierte video usando FFmpeg con progreso"""
+        try:
+            cmd = FFmpegWrapper.build_convert_command(
+                input_file, output_file, encoder, preset, crf, media_info, stream_copy
+            )
             
             print(f"Comando FFmpeg: {' '.join(cmd)}")
             